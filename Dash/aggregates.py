@@ -0,0 +1,199 @@
+'''
+
+Incrementally maintained aggregates for daily appends.
+
+geo_data (press conference counts, tweet totals and peak doses per state) and
+the pearson correlation matrix are kept up to date from the new rows alone:
+counts and sums are added, maxima compared, and the correlation matrix is
+derived from running sums and cross-products instead of re-running
+`groupby` and `corr` over the whole history.
+
+Appended rows are also kept in ./data/store/rows.feather, so a store rebuilt
+from the merged CSV (`python store.py`) still holds them.
+
+'''
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import sentiment
+import store
+
+
+class PairwiseMoments:
+
+    '''
+    Running sums for a pairwise-complete pearson correlation matrix.
+
+    For every pair of columns (i, j) the sums only cover rows where both values
+    are present, which is what `DataFrame.corr` does. Values are shifted by the
+    mean of the first batch to keep the sums well conditioned.
+    '''
+
+    def __init__(self, columns):
+
+        k = len(columns)
+        self.columns = list(columns)
+        self.shift = None
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def update(self, frame, sign=1.0):
+
+        return self.update_values(frame[self.columns].to_numpy(dtype=float), sign)
+
+    def update_values(self, values, sign=1.0):
+
+        # as update, for an (rows, k) array already in column order
+        if len(values) == 0:
+            return self
+
+        if self.shift is None:
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+
+        present = ~np.isnan(values)
+        x = np.where(present, values - self.shift, 0.0)
+        m = present.astype(float)
+
+        # sx[i, j] is the sum of column i over the rows where column j is also present
+        self.n += sign * (m.T @ m)
+        self.sx += sign * (x.T @ m)
+        self.sxx += sign * ((x * x).T @ m)
+        self.sxy += sign * (x.T @ x)
+
+        return self
+
+    def remove(self, frame):
+
+        # takes back rows added before, e.g. the old values of a replaced row
+        return self.update(frame, sign=-1.0)
+
+    def corr(self):
+
+        return pd.DataFrame(
+            pearson(self.n, self.sx, self.sxx, self.sxy),
+            index=self.columns,
+            columns=self.columns
+        )
+
+def pearson(n, sx, sxx, sxy):
+
+    # correlation matrices from pairwise sums, over any leading (e.g. date) axes
+    sx_t = np.swapaxes(sx, -1, -2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sxy - sx * sx_t
+        var_x = n * sxx - sx ** 2
+        var_y = np.swapaxes(var_x, -1, -2)
+        r = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+
+    # a constant column has no correlation; when the sums are differences of
+    # running totals its variance is only zero up to rounding
+    constant = var_x <= 1e-10 * n * sxx
+    r[(n < 2) | constant | np.swapaxes(constant, -1, -2)] = np.nan
+
+    return r
+
+
+class DashboardAggregates:
+
+    '''
+    geo_data and data_corr, updated from appended rows.
+    '''
+
+    def __init__(self, data, geo_data, data_corr):
+
+        self.geo_data = geo_data.copy()
+        self.moments = PairwiseMoments(data_corr.columns).update(data)
+
+    def append(self, raw_rows, prepared_rows):
+
+        # press conferences are counted before back filling, like build_geo_data
+        transcripts = raw_rows[
+            ['transcript_sentiment_positive', 'transcript_sentiment_neutral', 'transcript_sentiment_negative']
+        ].notna().any(axis='columns')
+
+        by_state = pd.DataFrame({
+            'state': raw_rows['state'].astype(str),
+            'count_press': (transcripts & raw_rows['date'].notna()).astype(int),
+            'count_tweets': raw_rows['tweet_total'],
+            'total_doses': raw_rows['total_doses']
+        }).groupby('state').agg({
+            'count_press': 'sum',
+            'count_tweets': 'sum',
+            'total_doses': 'max'
+        })
+
+        new_states = by_state.index.difference(self.geo_data.index)
+        if len(new_states) > 0:
+            cities = pd.read_csv(store.CITIES_CSV, index_col='State')
+            self.geo_data = pd.concat([
+                self.geo_data,
+                pd.DataFrame(
+                    {'count_press': 0, 'count_tweets': 0.0, 'total_doses': np.nan},
+                    index=new_states
+                ).merge(
+                    cities[['Population','Lat','Long','GeoMap']],
+                    how='left',
+                    left_index=True,
+                    right_index=True
+                )
+            ])
+
+        states = by_state.index
+        self.geo_data.loc[states, 'count_press'] += by_state['count_press']
+        self.geo_data.loc[states, 'count_tweets'] += by_state['count_tweets']
+        self.geo_data.loc[states, 'total_doses'] = np.fmax(
+            self.geo_data.loc[states, 'total_doses'],
+            by_state['total_doses']
+        )
+
+        self.moments.update(prepared_rows)
+
+        return self.geo_data, self.moments.corr()
+
+#region Append
+
+def prepare_rows(raw_rows):
+
+    # the new rows are back filled among themselves; earlier history is left as loaded
+    return sentiment.add_sentiment_features(raw_rows.bfill(axis = 0))
+
+def append(data, aggregates, raw_rows):
+
+    raw_rows = raw_rows.assign(
+        date = store.parse_dates(raw_rows['date'])
+    )
+    prepared_rows = prepare_rows(raw_rows)
+
+    geo_data, data_corr = aggregates.append(raw_rows, prepared_rows)
+
+    data = store.StatePartitions(data).append(prepared_rows).data
+
+    return data, geo_data, data_corr
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Append new daily rows to the dashboard data store.')
+    parser.add_argument('rows', help='csv file with new rows in the merged_aug_updated.csv layout')
+    args = parser.parse_args()
+
+    rows = pd.read_csv(args.rows)
+
+    data, geo_data, data_corr = store.read_store()
+    data, geo_data, data_corr = append(
+        data,
+        DashboardAggregates(data, geo_data, data_corr),
+        rows
+    )
+    # kept with the sources too, so rebuilding the store keeps them
+    store.append_rows(rows)
+    store.write_store(data, geo_data, data_corr)
+
+    print('Appended {0} row(s) to {1}'.format(len(rows), store.STORE_DIR))
@@ -1,139 +1,78 @@
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-import dash_table
-from dash.dependencies import Input, Output
-import pandas as pd
-import pathlib
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from flask import Flask
-import statsmodels.api as sm
-import geojson
-from geojson_rewind import rewind
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
+
+# imported on first use by the callbacks that draw figures (see lazy.py)
+import lazy
+px = lazy.module('plotly.express')
+go = lazy.module('plotly.graph_objects')
+make_subplots = lazy.function('plotly.subplots', 'make_subplots')
+
+import aggregates
+from callback_cache import result_cache, WARM_CACHE
+from clientside import CLIENTSIDE, STORE_ID
+import clientside
+import correlation
+import density
+import downsample
+import figures
+import geometry
+from pages import page_cache
+import regression
+import responses
+import store
+import webgl
 
 
 #region Load & Process Data
 
-# reading in data and converting date to time
-cities = pd.read_csv(".\\data\\australian_cities.csv",index_col='State')
-data = pd.read_csv(".\\data\\merged_aug_updated.csv")
-data.date = pd.to_datetime(data.date, infer_datetime_format=True, dayfirst=True )
-
-# Load geojson
-
-with open(".\\data\\australia_states_simple_final.geojson") as file:
-    geojson_states = geojson.load(file)
-
-geojson_states = rewind(geojson_states, rfc7946=False) # Dear lord, the frustration...
-
-# Build geo data set
-geo_data = pd.DataFrame().assign(
-    count_press = data.query('transcript_sentiment_positive.isnull() == False | transcript_sentiment_neutral.isnull()  == False | transcript_sentiment_negative.isnull()  == False',
-    engine='python'
-    ).groupby(
-        'state'
-    ).agg(
-        {
-            'date': 'count'
-        }
-    ).rename(
-        columns={
-            'date': 'count_press'
-        }
-    ),
-    count_tweets = data.groupby(
-        'state'
-    ).agg(
-        {
-            'tweet_total': 'sum'
-        }
-    ).rename(
-        columns={
-            'tweet_total': 'count_tweets'
-        }
-    ),
-    total_doses = data.groupby(
-        'state'
-    ).agg(
-        {
-            'total_doses': 'max'
-        }
-    )
-).merge(
-    cities[['Population','Lat','Long','GeoMap']],
-    how='left',
-    left_index=True,
-    right_index=True
-)
+# reading the prepared frames from the data store (see store.py)
+data, geo_data, data_corr = store.load()
 
-# filtering data for chosen states and time frame (removing negative daily doses also)
-#data.query("state == 'NSW' or state == 'VIC' or state == 'QLD' or state == 'TAS'", inplace=True)
-#data.query("date <= '2021-08-31'", inplace =True)
-#data.query("daily_doses > 0", inplace =True)
-
-#back filling missing values
-data.bfill(axis = 0, inplace = True)
-
-# Add net transcript and net twitter sentiment columns, along with colours
-data = data.assign(
-    net_transcript_sentiment = data[
-        ['transcript_sentiment_positive','transcript_sentiment_neutral','transcript_sentiment_negative']
-    ].idxmax(
-        axis='columns'
-    ).map(
-        {
-            'transcript_sentiment_positive': 'Positive',
-            'transcript_sentiment_neutral': 'Neutral',
-            'transcript_sentiment_negative': 'Negative'
-        }
-    ),
-    net_transcript_sentiment_colour = data[
-        ['transcript_sentiment_positive','transcript_sentiment_neutral','transcript_sentiment_negative']
-    ].idxmax(
-        axis='columns'
-    ).map(
-        {
-            'transcript_sentiment_positive': 'blue',
-            'transcript_sentiment_neutral': 'yellow',
-            'transcript_sentiment_negative': 'red'
-        }
-    ),
-    net_twitter_sentiment = data[
-        ['avr_positive_tweet_sentiment','avr_neutral_tweet_sentiment','avr_negative_tweet_sentiment']
-    ].idxmax(
-        axis='columns'
-    ).map(
-        {
-            'avr_positive_tweet_sentiment': 'Positive',
-            'avr_neutral_tweet_sentiment': 'Neutral',
-            'avr_negative_tweet_sentiment': 'Negative'
-        }
-    ),
-    net_twitter_sentiment_colour = data[
-        ['avr_positive_tweet_sentiment','avr_neutral_tweet_sentiment','avr_negative_tweet_sentiment']
-    ].idxmax(
-        axis='columns'
-    ).map(
-        {
-            'avr_positive_tweet_sentiment': 'blue',
-            'avr_neutral_tweet_sentiment': 'yellow',
-            'avr_negative_tweet_sentiment': 'red'
-        }
-    )
-)
+# contiguous per-state blocks, used by the callbacks instead of boolean masks
+state_partitions = store.StatePartitions(data)
+data = state_partitions.data
+
+# binned KDE grids for the contour plots, filled on first use
+density_grids = density.DensityGrids(state_partitions)
+
+# OLS trendlines of the sentiment scatter plots (see regression.py)
+regressions = regression.Regressions(state_partitions)
 
-# Correlations
-data_corr = data.corr(method='pearson')
+# Per-state and trailing window correlation matrices (see correlation.py)
+correlations = correlation.CorrelationEngine(state_partitions, data_corr.columns)
 
 #endregion
 
 #region Start Dash
 
-app = dash.Dash(__name__)
+# compression is set up with the cache validation below instead of by Dash
+app = dash.Dash(__name__, compress=False)
 app.title = 'Dashboard'
 
+# Flask server for WSGI servers (see gunicorn.conf.py)
+server = app.server
+
+# brotli/gzip, ETags and cache headers (see responses.py)
+responses.configure(server, app.config.routes_pathname_prefix)
+
+# Prebuilt, cacheable state geometry, referenced by its asset url (see geometry.py)
+geojson_states = geometry.url(asset_url=app.get_asset_url)
+
+# Prebuilt static figures, loaded when a page first embeds them (see figures.py)
+def figure_frames():
+
+    return {
+        'data': data,
+        'geo_data': geo_data,
+        'data_corr': data_corr,
+        'geojson': geojson_states
+    }
+
+static_figures = figures.StaticFigures(figure_frames())
+
 #endregion
 
 #region Navbar
@@ -162,6 +101,50 @@ navbar = html.Nav(
 
 #endregion
 
+#region Dropdown Options
+
+state_options = [
+    {'label' : "Victoria", "value" : 'VIC'},
+    {'label' : "Queensland", "value" : 'QLD'},
+    {'label' : "New South Wales", "value" : 'NSW'}#,
+    #{'label' : "Tasmania", "value" : 'TAS'}
+]
+
+transcript_sentiment_options = [
+    {'label' : "Negative", "value" : 'transcript_sentiment_negative'},
+    {'label' : "Neutral", "value" : 'transcript_sentiment_neutral'},
+    {'label' : "Positive", "value" : 'transcript_sentiment_positive'}
+]
+
+twitter_sentiment_options = [
+    {'label' : "Negative", "value" : 'avr_negative_tweet_sentiment'},
+    {'label' : "Neutral", "value" : 'avr_neutral_tweet_sentiment'},
+    {'label' : "Positive", "value" : 'avr_positive_tweet_sentiment'}
+]
+
+metric_options = [
+    {'label' : "Daily Cases", "value" : 'daily_newcase'},
+    {'label' : "Daily Doses", "value" : 'daily_doses'},
+    {'label' : "Total Doses", "value" : 'total_doses'},
+    {'label' : "Daily Tweets", "value" : 'tweet_total'}
+]
+
+ALL_STATES = 'ALL'
+
+correlation_state_options = [{'label' : "All States", "value" : ALL_STATES}] + state_options
+
+# 0 is the whole history
+correlation_window_options = [{'label' : "All Days", "value" : 0}] + [
+    {'label' : "Last {0} Days".format(window), "value" : window}
+    for window in correlation.WINDOWS
+]
+
+def option_values(options):
+
+    return [option['value'] for option in options]
+
+#endregion
+
 #region Sidebar
 
 sidebar = html.Div(
@@ -182,12 +165,7 @@ sidebar = html.Div(
         dcc.Dropdown(
             id = "states-dropdown",
             className='item-dropdown',
-            options = [
-                {'label' : "Victoria", "value" : 'VIC'},
-                {'label' : "Queensland", "value" : 'QLD'},
-                {'label' : "New South Wales", "value" : 'NSW'}#,
-                #{'label' : "Tasmania", "value" : 'TAS'}
-            ],
+            options = state_options,
             value = "VIC"
         ),
         html.Label(
@@ -197,11 +175,7 @@ sidebar = html.Div(
         dcc.Dropdown(
             id = "transcript-sentiment-dropdown",
             className='item-dropdown',
-            options = [
-                {'label' : "Negative", "value" : 'transcript_sentiment_negative'},
-                {'label' : "Neutral", "value" : 'transcript_sentiment_neutral'},
-                {'label' : "Positive", "value" : 'transcript_sentiment_positive'}
-            ],
+            options = transcript_sentiment_options,
             value = "transcript_sentiment_negative"
         ),
         html.Label(
@@ -211,10 +185,7 @@ sidebar = html.Div(
         dcc.Dropdown(
             id = "twitter-sentiment-dropdown",
             className='item-dropdown',
-            options = [
-                {'label' : "Negative", "value" : 'avr_negative_tweet_sentiment'},
-                {'label' : "Neutral", "value" : 'avr_neutral_tweet_sentiment'},
-                {'label' : "Positive", "value" : 'avr_positive_tweet_sentiment'}],
+            options = twitter_sentiment_options,
             value = "avr_negative_tweet_sentiment"
         ),
         html.Label(
@@ -224,14 +195,29 @@ sidebar = html.Div(
         dcc.Dropdown(
             id = "metric-dropdown",
             className='item-dropdown',
-            options = [
-                {'label' : "Daily Cases", "value" : 'daily_newcase'},
-                {'label' : "Daily Doses", "value" : 'daily_doses'},
-                {'label' : "Total Doses", "value" : 'total_doses'},
-                {'label' : "Daily Tweets", "value" : 'tweet_total'}
-            ],
+            options = metric_options,
             value = "daily_doses"
         ),
+        html.Label(
+            className='item-sidebar',
+            children='Correlation State:'
+        ),
+        dcc.Dropdown(
+            id = "correlation-states-dropdown",
+            className='item-dropdown',
+            options = correlation_state_options,
+            value = ALL_STATES
+        ),
+        html.Label(
+            className='item-sidebar',
+            children='Correlation Window:'
+        ),
+        dcc.Dropdown(
+            id = "correlation-window-dropdown",
+            className='item-dropdown',
+            options = correlation_window_options,
+            value = 0
+        ),
     ]
 )
 
@@ -262,627 +248,593 @@ app.layout = html.Div(
 
 #region Pages
 
-page_home = html.Div(
-    className='page-container',
-    children=[
-        # First Row
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='column-container',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                            # This is the home page!
-                            Consider a brief introduction to the project.
-
-                            - Who is the audience?
-                            - What are the benefits?
-                            - How is it NOVEL?
-
-                            '''
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Choropleth Maps
-        html.Div(
-            className='row-container',
-            children=[
-                html.Div(
-                    className='column-card',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                            # Scope of Analysis
-                            These plots graphically graphically show the data included in the final presentation of this dashboard.
-                            Over a 6-week period, 10,000 tweets and 80 press conferences were collected and analysed from the capital cities of Victoria New South Wales and Queensland.
-                            This data was combined with daily vaccinations and cases.
-                            '''
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-container-66',
-                    children=[
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure=px.choropleth(
-                                        geo_data,
-                                        geojson=geojson_states,
-                                        featureidkey = "properties.STE_NAME21",
-                                        locations='GeoMap',
-                                        color='count_press',
-                                        range_color=(0,max(geo_data['count_press'])),
-                                        color_continuous_scale="Blues",
-                                        basemap_visible=False,
-                                        fitbounds='locations',
-                                        title='Number of Press Conferences'
-                                    ).update_traces(
-                                        marker_line_color='white'
+@page_cache.route('/', figures=[
+    'home_press_choropleth',
+    'home_tweets_choropleth'
+])
+def page_home():
+
+    return html.Div(
+        className='page-container',
+        children=[
+            # First Row
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='column-container',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                # This is the home page!
+                                Consider a brief introduction to the project.
+
+                                - Who is the audience?
+                                - What are the benefits?
+                                - How is it NOVEL?
+
+                                '''
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Choropleth Maps
+            html.Div(
+                className='row-container',
+                children=[
+                    html.Div(
+                        className='column-card',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                # Scope of Analysis
+                                These plots graphically graphically show the data included in the final presentation of this dashboard.
+                                Over a 6-week period, 10,000 tweets and 80 press conferences were collected and analysed from the capital cities of Victoria New South Wales and Queensland.
+                                This data was combined with daily vaccinations and cases.
+                                '''
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-container-66',
+                        children=[
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['home_press_choropleth']
                                     )
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure=px.choropleth(
-                                        geo_data,
-                                        geojson=geojson_states,
-                                        featureidkey = "properties.STE_NAME21",
-                                        locations='GeoMap',
-                                        color='count_tweets',
-                                        range_color=(0,max(geo_data['count_tweets'])),
-                                        color_continuous_scale="Purples",
-                                        basemap_visible=False,
-                                        fitbounds='locations',
-                                        title='Number of Tweets'
-                                    ).update_traces(
-                                        marker_line_color='white'
+                                ]
+                            ),
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['home_tweets_choropleth']
                                     )
-                                )
-                            ]
-                        ),
-                        #html.Div(
-                        #    className='column-card',
-                        #    children=[
-                        #        dcc.Graph(
-                        #            className='item-plot',
-                        #            figure=px.choropleth(
-                        #                geo_data,
-                        #                geojson=geojson_states,
-                        #                featureidkey = "properties.STE_NAME21",
-                        #                locations='GeoMap',
-                        #                color='total_doses',
-                        #                range_color=(0,max(geo_data['total_doses'])),
-                        #                color_continuous_scale="Reds",
-                        #                basemap_visible=False,
-                        #                fitbounds='locations',
-                        #                title='Total Vaccine Doses'
-                        #            ).update_traces(
-                        #                marker_line_color='white'
-                        #            )
-                        #        )
-                        #    ]
-                        #)     
-                    ]
-                )
-            ]
-        ),
-        # Correlation Heatmap
-        html.Div(
-            className='row-container',
-            children=[
-                html.Div(
-                    className='column-card-66',
-                    children=[
-                        dcc.Graph(
-                            className='item-plot',
-                            figure= px.imshow(
-                                data_corr,
-                                color_continuous_scale='RdBu_r',
-                                height=800
+                                ]
+                            ),
+                            #html.Div(
+                            #    className='column-card',
+                            #    children=[
+                            #        dcc.Graph(
+                            #            className='item-plot',
+                            #            figure=px.choropleth(
+                            #                geo_data,
+                            #                geojson=geojson_states,
+                            #                featureidkey = "properties.STE_NAME21",
+                            #                locations='GeoMap',
+                            #                color='total_doses',
+                            #                range_color=(0,max(geo_data['total_doses'])),
+                            #                color_continuous_scale="Reds",
+                            #                basemap_visible=False,
+                            #                fitbounds='locations',
+                            #                title='Total Vaccine Doses'
+                            #            ).update_traces(
+                            #                marker_line_color='white'
+                            #            )
+                            #        )
+                            #    ]
+                            #)     
+                        ]
+                    )
+                ]
+            ),
+            # Correlation Heatmap
+            html.Div(
+                className='row-container',
+                children=[
+                    html.Div(
+                        className='column-card-66',
+                        children=[
+                            # drawn by its callback for the selected states and window
+                            dcc.Graph(
+                                id='correlation-heatmap',
+                                className='item-plot'
+                            ),
+                        ]
+                    ),
+                    html.Div(
+                        className='column-card',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                # Correlation Map
+                                This plot shows the correlation between different metrics in all states or a single state,
+                                over all days or over the trailing window chosen in the filters
+                                '''
                             )
-                        ),
-                    ]
-                ),
-                html.Div(
-                    className='column-card',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                            # Correlation Map
-                            This plot shows the correlation between different metrics overall
-                            '''
-                        )
-                    ]
-                )
-            ]
-        )
-    ]
-)
-
-page_press_conferences = html.Div(
-    className='page-container',
-    children=[
-        # First Row
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='column-container',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                            # Press Conferences from State Governments
-                            This section provides an analysis on the overall sentiment from the state press conferences.
-                            The comparisons made are between press conference sentiment between states (ie. in what sentiment are press conferences delivered by each state). We also look at how case numbers may affect the press conference sentiment. 
+                        ]
+                    )
+                ]
+            )
+        ]
+    )
 
-                            '''
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Transcript Sentiment Over Time
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='column-container-66',
-                    children=[
-                        dcc.Graph(
-                            id='transcript-sentiment-over-time-line-plot',
-                            className='item-plot'
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-container',
-                    children=[
-                        dcc.Markdown(
-                            id='transcript-sentiment-over-time-markdown',
-                            className="item-markdown",
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Metric & Transcript Sentiment Over Time
-        html.Div(
-            className='row-container',
-            children=[
-                html.Div(
-                    className='column-card',
-                    children=[
-                        dcc.Markdown(
-                            id='metric-and-transcript-sentiment-over-time-markdown',
-                            className="item-markdown"
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-card-66',
-                    children=[
-                        dcc.Graph(
-                            id='metric-and-transcript-sentiment-over-time-line-plot',
-                            className='item-plot'
-                        ),
-                        dcc.Graph(
-                            id='metric-and-transcript-sentiment-over-time-bar-plot',
-                            className='item-plot'
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Transcript Sentiment vs Twitter Sentiment
-        html.Div(
-            className='row-container',
-            children=[
-                html.Div(
-                    className='column-card-66',
-                    children=[
-                        dcc.Graph(
-                            id='transcript-sentiment-vs-twitter-sentiment-plot',
-                            className='item-plot'
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-card',
-                    children=[
-                        dcc.Markdown(
-                            id='transcript-sentiment-vs-twitter-sentiment-markdown',
-                            className="item-markdown"
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Transcript Sentiment Analysis
-        html.Div(
-            className='column-container',
-            children=[
-                html.Div(
-                    className='row-card',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                                # Transcript Sentiment Analysis
-                                These bubble charts shows the negative vs positive sentiment of press conferences per state.
-                                The size of the bubble indicates number of daily covid cases.
-                                This analysis tried to determine the ‘clarity’ of press conference messaging to the public.
-                                Either high negative or high positive scores are ‘good’ as they indicate clarity in sentiment and overall message delivery.
-                                The area is the middle indicates neutral sentiment and could be perceived as unclear messaging. 
-                            '''
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='row-container',
-                    children=[
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure= px.scatter(
-                                        data,
-                                        x = "transcript_sentiment_positive",
-                                        y = 'transcript_sentiment_negative', 
-                                        color = "state",
-                                        size = "daily_newcase",
-                                        size_max = 50,
-                                        range_x=[0.1, 1.0],
-                                        range_y=[0.1, 1.0],
-                                        title = "Transcript Sentiment by state",
-                                        orientation='h'
-                                    ).update_layout(
-                                        template = "simple_white"
+@page_cache.route('/press-conferences', figures=[
+    'transcript_bubble_positive_negative',
+    'transcript_bubble_neutral_negative',
+    'transcript_bubble_neutral_positive'
+])
+def page_press_conferences():
+
+    return html.Div(
+        className='page-container',
+        children=[
+            # First Row
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='column-container',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                # Press Conferences from State Governments
+                                This section provides an analysis on the overall sentiment from the state press conferences.
+                                The comparisons made are between press conference sentiment between states (ie. in what sentiment are press conferences delivered by each state). We also look at how case numbers may affect the press conference sentiment. 
+
+                                '''
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Transcript Sentiment Over Time
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='column-container-66',
+                        children=[
+                            dcc.Graph(
+                                id='transcript-sentiment-over-time-line-plot',
+                                className='item-plot'
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-container',
+                        children=[
+                            dcc.Markdown(
+                                id='transcript-sentiment-over-time-markdown',
+                                className="item-markdown",
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Metric & Transcript Sentiment Over Time
+            html.Div(
+                className='row-container',
+                children=[
+                    html.Div(
+                        className='column-card',
+                        children=[
+                            dcc.Markdown(
+                                id='metric-and-transcript-sentiment-over-time-markdown',
+                                className="item-markdown"
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-card-66',
+                        children=[
+                            dcc.Graph(
+                                id='metric-and-transcript-sentiment-over-time-line-plot',
+                                className='item-plot'
+                            ),
+                            dcc.Graph(
+                                id='metric-and-transcript-sentiment-over-time-bar-plot',
+                                className='item-plot'
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Transcript Sentiment vs Twitter Sentiment
+            html.Div(
+                className='row-container',
+                children=[
+                    html.Div(
+                        className='column-card-66',
+                        children=[
+                            dcc.Graph(
+                                id='transcript-sentiment-vs-twitter-sentiment-plot',
+                                className='item-plot'
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-card',
+                        children=[
+                            dcc.Markdown(
+                                id='transcript-sentiment-vs-twitter-sentiment-markdown',
+                                className="item-markdown"
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Transcript Sentiment Analysis
+            html.Div(
+                className='column-container',
+                children=[
+                    html.Div(
+                        className='row-card',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                    # Transcript Sentiment Analysis
+                                    These bubble charts shows the negative vs positive sentiment of press conferences per state.
+                                    The size of the bubble indicates number of daily covid cases.
+                                    This analysis tried to determine the ‘clarity’ of press conference messaging to the public.
+                                    Either high negative or high positive scores are ‘good’ as they indicate clarity in sentiment and overall message delivery.
+                                    The area is the middle indicates neutral sentiment and could be perceived as unclear messaging. 
+                                '''
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='row-container',
+                        children=[
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['transcript_bubble_positive_negative']
                                     )
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure= px.scatter(
-                                        data,
-                                        x = "transcript_sentiment_neutral",
-                                        y = 'transcript_sentiment_negative', 
-                                        color = "state",
-                                        size = "daily_newcase",
-                                        size_max = 50,
-                                        range_x=[0.0, 0.3],
-                                        range_y=[0.0, 1.0],
-                                        title = "Transcript Sentiment by state (neutral vs negative)"
-                                    ).update_layout(
-                                        template = "simple_white"
+                                ]
+                            ),
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['transcript_bubble_neutral_negative']
                                     )
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure= px.scatter(
-                                        data,
-                                        x = "transcript_sentiment_neutral",
-                                        y = 'transcript_sentiment_positive', 
-                                        color = "state",
-                                        size = "daily_newcase",
-                                        size_max = 50,
-                                        range_x=[0.0, 0.3],
-                                        range_y=[0.0, 1.0],
-                                        title = "Transcript Sentiment by state (neutral vs positive)"
-                                    ).update_layout(
-                                        template = "simple_white"
+                                ]
+                            ),
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['transcript_bubble_neutral_positive']
                                     )
-                                )
-                            ]
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Metric vs Transcript Sentiment
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='row-container',
-                    children=[
-                        html.Div(
-                            className='column-container',
-                            children=[
-                                dcc.Markdown(
-                                    id='metric-vs-transcript-sentiment-markdown',
-                                    className="item-markdown"
-                                ),
-                                dcc.Graph(
-                                    id='metric-vs-transcript-sentiment-scatter-plot',
-                                    className='item-plot'
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-container',
-                            children=[
-                                dcc.Graph(
-                                    id='metric-vs-transcript-sentiment-contour-plot',
-                                    className='item-plot'
-                                )
-                            ]
-                        )
-                    ]
-                ),
-            ]
-        )
-    ]
-)
+                                ]
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Metric vs Transcript Sentiment
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='row-container',
+                        children=[
+                            html.Div(
+                                className='column-container',
+                                children=[
+                                    dcc.Markdown(
+                                        id='metric-vs-transcript-sentiment-markdown',
+                                        className="item-markdown"
+                                    ),
+                                    dcc.Graph(
+                                        id='metric-vs-transcript-sentiment-scatter-plot',
+                                        className='item-plot'
+                                    )
+                                ]
+                            ),
+                            html.Div(
+                                className='column-container',
+                                children=[
+                                    dcc.Graph(
+                                        id='metric-vs-transcript-sentiment-contour-plot',
+                                        className='item-plot'
+                                    )
+                                ]
+                            )
+                        ]
+                    ),
+                ]
+            )
+        ]
+    )
 
-page_twitter = html.Div(
-    className='page-container',
-    children=[
-        # First Row
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='column-container',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                            # This is for twitter focussed analysis
-                            This section provides an analysis on the overall sentiment from Twitter. The Twitter data included was based on the combination of one covid related keyword (covid, corona, coronavirus, covid-19, covid19) and one vaccine related keyword (vaccine, vaccination, vaccinated, vaccinate, astrazeneca, pfizer, moderna).
-                            '''
-                        )
-                    ]
-                )
-            ]         
-        ),
-        # Twitter Sentiment Over Time
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='column-container-66',
-                    children=[
-                        dcc.Graph(
-                            id='twitter-sentiment-over-time-line-plot',
-                            className='item-plot'
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-container',
-                    children=[
-                        dcc.Markdown(
-                            id='twitter-sentiment-over-time-markdown',
-                            className="item-markdown",
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Metric & Twitter Sentiment Over Time
-        html.Div(
-            className='row-container',
-            children=[
-                html.Div(
-                    className='column-card',
-                    children=[
-                        dcc.Markdown(
-                            id='metric-and-twitter-sentiment-over-time-markdown',
-                            className="item-markdown"
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-card-66',
-                    children=[
-                        dcc.Graph(
-                            id='metric-and-twitter-sentiment-over-time-line-plot',
-                            className='item-plot'
-                        ),
-                        dcc.Graph(
-                            id='metric-and-twitter-sentiment-over-time-bar-plot',
-                            className='item-plot'
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Twitter Sentiment vs Transcript Sentiment
-        html.Div(
-            className='row-container',
-            children=[
-                html.Div(
-                    className='column-card-66',
-                    children=[
-                        dcc.Graph(
-                            id='twitter-sentiment-vs-transcript-sentiment-plot',
-                            className='item-plot'
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='column-card',
-                    children=[
-                        dcc.Markdown(
-                            id='twitter-sentiment-vs-transcript-sentiment-markdown',
-                            className="item-markdown"
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Twitter Sentiment Analysis
-        html.Div(
-            className='column-container',
-            children=[
-                html.Div(
-                    className='row-card',
-                    children=[
-                        dcc.Markdown(
-                            className="item-markdown",
-                            children='''
-                                # Twitter Sentiment Analysis
-                                These bubble charts shows the negative vs positive sentiment of press conferences per state.
-                                The size of the bubble indicates number of daily covid cases.
-                                This analysis tried to determine the ‘clarity’ of press conference messaging to the public.
-                                Either high negative or high positive scores are ‘good’ as they indicate clarity in sentiment and overall message delivery.
-                                The area is the middle indicates neutral sentiment and could be perceived as unclear messaging. 
-                            '''
-                        )
-                    ]
-                ),
-                html.Div(
-                    className='row-container',
-                    children=[
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure= px.scatter(
-                                        data,
-                                        x = "avr_positive_tweet_sentiment",
-                                        y = 'avr_negative_tweet_sentiment', 
-                                        color = "state",
-                                        size = "daily_newcase",
-                                        size_max = 50,
-                                        range_x=[0.1, 1.0],
-                                        range_y=[0.1, 1.0],
-                                        title = "Twitter Sentiment by state",
-                                        orientation='h'
-                                    ).update_layout(
-                                        template = "simple_white"
+@page_cache.route('/twitter', figures=[
+    'twitter_bubble_positive_negative',
+    'twitter_bubble_neutral_negative',
+    'twitter_bubble_neutral_positive'
+])
+def page_twitter():
+
+    return html.Div(
+        className='page-container',
+        children=[
+            # First Row
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='column-container',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                # This is for twitter focussed analysis
+                                This section provides an analysis on the overall sentiment from Twitter. The Twitter data included was based on the combination of one covid related keyword (covid, corona, coronavirus, covid-19, covid19) and one vaccine related keyword (vaccine, vaccination, vaccinated, vaccinate, astrazeneca, pfizer, moderna).
+                                '''
+                            )
+                        ]
+                    )
+                ]         
+            ),
+            # Twitter Sentiment Over Time
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='column-container-66',
+                        children=[
+                            dcc.Graph(
+                                id='twitter-sentiment-over-time-line-plot',
+                                className='item-plot'
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-container',
+                        children=[
+                            dcc.Markdown(
+                                id='twitter-sentiment-over-time-markdown',
+                                className="item-markdown",
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Metric & Twitter Sentiment Over Time
+            html.Div(
+                className='row-container',
+                children=[
+                    html.Div(
+                        className='column-card',
+                        children=[
+                            dcc.Markdown(
+                                id='metric-and-twitter-sentiment-over-time-markdown',
+                                className="item-markdown"
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-card-66',
+                        children=[
+                            dcc.Graph(
+                                id='metric-and-twitter-sentiment-over-time-line-plot',
+                                className='item-plot'
+                            ),
+                            dcc.Graph(
+                                id='metric-and-twitter-sentiment-over-time-bar-plot',
+                                className='item-plot'
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Twitter Sentiment vs Transcript Sentiment
+            html.Div(
+                className='row-container',
+                children=[
+                    html.Div(
+                        className='column-card-66',
+                        children=[
+                            dcc.Graph(
+                                id='twitter-sentiment-vs-transcript-sentiment-plot',
+                                className='item-plot'
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='column-card',
+                        children=[
+                            dcc.Markdown(
+                                id='twitter-sentiment-vs-transcript-sentiment-markdown',
+                                className="item-markdown"
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Twitter Sentiment Analysis
+            html.Div(
+                className='column-container',
+                children=[
+                    html.Div(
+                        className='row-card',
+                        children=[
+                            dcc.Markdown(
+                                className="item-markdown",
+                                children='''
+                                    # Twitter Sentiment Analysis
+                                    These bubble charts shows the negative vs positive sentiment of press conferences per state.
+                                    The size of the bubble indicates number of daily covid cases.
+                                    This analysis tried to determine the ‘clarity’ of press conference messaging to the public.
+                                    Either high negative or high positive scores are ‘good’ as they indicate clarity in sentiment and overall message delivery.
+                                    The area is the middle indicates neutral sentiment and could be perceived as unclear messaging. 
+                                '''
+                            )
+                        ]
+                    ),
+                    html.Div(
+                        className='row-container',
+                        children=[
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['twitter_bubble_positive_negative']
                                     )
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure= px.scatter(
-                                        data,
-                                        x = "avr_neutral_tweet_sentiment",
-                                        y = 'avr_negative_tweet_sentiment', 
-                                        color = "state",
-                                        size = "daily_newcase",
-                                        size_max = 50,
-                                        range_x=[0.0, 0.3],
-                                        range_y=[0.0, 1.0],
-                                        title = "Twitter Sentiment by state (neutral vs negative)"
-                                    ).update_layout(
-                                        template = "simple_white"
+                                ]
+                            ),
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['twitter_bubble_neutral_negative']
                                     )
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-card',
-                            children=[
-                                dcc.Graph(
-                                    className='item-plot',
-                                    figure= px.scatter(
-                                        data,
-                                        x = "avr_neutral_tweet_sentiment",
-                                        y = 'avr_positive_tweet_sentiment', 
-                                        color = "state",
-                                        size = "daily_newcase",
-                                        size_max = 50,
-                                        range_x=[0.0, 0.3],
-                                        range_y=[0.0, 1.0],
-                                        title = "Twitter Sentiment by state (neutral vs positive)"
-                                    ).update_layout(
-                                        template = "simple_white"
+                                ]
+                            ),
+                            html.Div(
+                                className='column-card',
+                                children=[
+                                    dcc.Graph(
+                                        className='item-plot',
+                                        figure=static_figures['twitter_bubble_neutral_positive']
                                     )
-                                )
-                            ]
-                        )
-                    ]
-                )
-            ]
-        ),
-        # Metric vs Twitter Sentiment
-        html.Div(
-            className='row-card',
-            children=[
-                html.Div(
-                    className='row-container',
-                    children=[
-                        html.Div(
-                            className='column-container',
-                            children=[
-                                dcc.Markdown(
-                                    id='metric-vs-twitter-sentiment-markdown',
-                                    className="item-markdown"
-                                ),
-                                dcc.Graph(
-                                    id='metric-vs-twitter-sentiment-scatter-plot',
-                                    className='item-plot'
-                                )
-                            ]
-                        ),
-                        html.Div(
-                            className='column-container',
-                            children=[
-                                dcc.Graph(
-                                    id='metric-vs-twitter-sentiment-contour-plot',
-                                    className='item-plot'
-                                )
-                            ]
-                        )
-                    ]
-                ),
-            ]
-        )
-    ]
-)
+                                ]
+                            )
+                        ]
+                    )
+                ]
+            ),
+            # Metric vs Twitter Sentiment
+            html.Div(
+                className='row-card',
+                children=[
+                    html.Div(
+                        className='row-container',
+                        children=[
+                            html.Div(
+                                className='column-container',
+                                children=[
+                                    dcc.Markdown(
+                                        id='metric-vs-twitter-sentiment-markdown',
+                                        className="item-markdown"
+                                    ),
+                                    dcc.Graph(
+                                        id='metric-vs-twitter-sentiment-scatter-plot',
+                                        className='item-plot'
+                                    )
+                                ]
+                            ),
+                            html.Div(
+                                className='column-container',
+                                children=[
+                                    dcc.Graph(
+                                        id='metric-vs-twitter-sentiment-contour-plot',
+                                        className='item-plot'
+                                    )
+                                ]
+                            )
+                        ]
+                    ),
+                ]
+            )
+        ]
+    )
 
-page_404 = html.Div(
-    className='page-container',
-    children=[
-        # First Row
-        html.Div(
-            className='row-card',
-            children=[
-                dcc.Markdown(
-                    className='item-markdown',
-                    children=[
-                        '''
-                        # 404: Oops! Looks like this page doesn't exist...
-                        Please return to one of the pages linked in the navigation bar.
-                        '''
-                    ]
-                )
-            ]
-        )
-    ]
-)
+@page_cache.route(None)
+def page_404():
+
+    return html.Div(
+        className='page-container',
+        children=[
+            # First Row
+            html.Div(
+                className='row-card',
+                children=[
+                    dcc.Markdown(
+                        className='item-markdown',
+                        children=[
+                            '''
+                            # 404: Oops! Looks like this page doesn't exist...
+                            Please return to one of the pages linked in the navigation bar.
+                            '''
+                        ]
+                    )
+                ]
+            )
+        ]
+    )
+
+#endregion
+
+#region Markdown Templates
+
+# shared by the server callbacks and the clientside payload
+
+transcript_over_time_markdown = '''
+        # {0}
+        This graph shows the change in sentiment from August 1 to August 31 for Vicotria, Queensland and New South Wales. 
+        NSW is consistantly more negative than other states, whilst QLD and VIC are more positive. 
+        All states show a relatively low proportion of neutral sentiment, indicating that states are decisive in the message that
+        they are delivering, either positive or negative. The more positive messaging from Victoria and Queensland may be in an
+        effort to increase vaccination rates due to noted public hesitation, or may be driven by increases in daily doses 
+        with more positive remarks being made as a result. It may also be worth considering the differences in messaging as a result of
+        state government party alignment on the political spectrum, 
+        as Queensland and Victoria are Labor governments compared to the Liberal government in New South Wales.
+    '''
+
+metric_and_transcript_over_time_markdown = '''
+        # {0}
+        These graphs shows the change in goverment press conference sentiment and the daily doses of covid-19 vaccine administered.
+        The top portion shows the number of doses in thousands, bottom portion shows the sentiment proportion of transcript for each
+        date. The most notable observation from daily vaccination doses is the reoccurence of large drops in numbers, these seemingly 
+        coincide with the Sunday of every week, rather than any influence from the press conference sentiment. From the Victorian doses,
+        there is a sequence of days from the 13-17 August that get increasingly negative, interestingly the daily doses peaks at its
+        highest point up until August 17. From this point, the number of doses seems to mirror trend in negative sentiment. 
+        Queensland shows the strongest weekly cycle in doses of any state and seems to behave independantly of transcript sentiment.
+        New South Wales shows a slight increase in the number of daily doses from 23-29 August which coincides with more positive
+        messaging in transcripts, possibly reflecting a shift in messaging to elevate vaccine uptake. 
+    '''
+
+twitter_over_time_markdown = '''
+        # {0}
+        This graph shows the change in sentiment from August 1 to August 31 for Vicotria, Queensland and New South Wales. 
+        NSW is consistantly more negative than other states, whilst QLD and VIC are more positive. 
+        All states show a relatively low proportion of neutral sentiment.
+    '''
+
+metric_and_twitter_over_time_markdown = '''
+        # {0}
+        This graph shows the change in goverment press conference sentiment and the daily doses of covid-19 vaccine administered.
+        The top portion shows the number of doses in thousands, bottom portion shows the sentiment proportion of twitter for each
+        date. 
+    '''
 
 #endregion
 
@@ -938,42 +890,146 @@ def get_metric_text(selected_metric):
 
 #endregion
 
+#region Clientside Mode
+
+if CLIENTSIDE:
+    app.layout.children.append(dcc.Store(
+        id=STORE_ID,
+        data=clientside.build_payload(
+            state_partitions,
+            option_values(transcript_sentiment_options) + option_values(twitter_sentiment_options) + option_values(metric_options),
+            {
+                'transcript': {value: get_transcript_sentiment_text(value) for value in option_values(transcript_sentiment_options)},
+                'twitter': {value: get_twitter_sentiment_text(value) for value in option_values(twitter_sentiment_options)},
+                'states': {state: get_state_text(state) for state in state_partitions.slices},
+                'metrics': {value: get_metric_text(value) for value in option_values(metric_options)}
+            },
+            {
+                'transcript_over_time': transcript_over_time_markdown,
+                'metric_and_transcript_over_time': metric_and_transcript_over_time_markdown,
+                'twitter_over_time': twitter_over_time_markdown,
+                'metric_and_twitter_over_time': metric_and_twitter_over_time_markdown
+            }
+        )
+    ))
+
+# Figure callbacks given a clientside_function run in the browser when the
+# clientside mode is enabled, and on the server otherwise
+def figure_callback(outputs, inputs, clientside_function=None):
+
+    if CLIENTSIDE and clientside_function is not None:
+        # the browser holds every row, so the zoom (relayoutData) inputs of the
+        # server side downsampling are not needed there
+        inputs = [item for item in inputs if item.component_property != 'relayoutData']
+        def register(func):
+            app.clientside_callback(
+                ClientsideFunction(
+                    namespace='dashboard',
+                    function_name=clientside_function
+                ),
+                outputs,
+                inputs,
+                [State(STORE_ID, 'data')]
+            )
+            return func
+        return register
+
+    return app.callback(outputs, inputs)
+
+# Warm-up grid of a figure drawn by a clientside_function: in the clientside
+# mode the server never renders it, so there is nothing to pre-compute
+def server_grid(grid):
+
+    return None if CLIENTSIDE else grid
+
+#endregion
+
+#region Downsampling
+
+# The per-state blocks, one trace each in the over-time line plots
+def state_frames():
+
+    return [state_partitions.get(state) for state in state_partitions.slices]
+
+# The x window of the graph whose zoom triggered the callback, None when a
+# dropdown changed or the zoom was reset (see downsample.py)
+def zoom_window():
+
+    for trigger in dash.callback_context.triggered:
+        if trigger['prop_id'].endswith('.relayoutData'):
+            changed, window = downsample.x_window(trigger['value'])
+            if not changed:
+                raise PreventUpdate
+            return window
+
+    return None
+
+# Keeps the user's zoom while the figure is replaced for the same selection
+def zoomed(fig, window, revision):
+
+    fig.update_layout(uirevision=revision)
+    if window is not None:
+        fig.update_xaxes(range=list(window))
+
+    return fig
+
+#endregion
+
 #region Callbacks
 
-#region Press Conference Page
+#region Home Page
 
-# Transcript Sentiment Over Time
+# Correlation Heatmap
 @app.callback(
+    Output('correlation-heatmap', 'figure'),
     [
-        Output('transcript-sentiment-over-time-line-plot', 'figure'),
-        Output('transcript-sentiment-over-time-markdown', 'children')
-    ],
-    [
-        Input('transcript-sentiment-dropdown', 'value')
+        Input('correlation-states-dropdown', 'value'),
+        Input('correlation-window-dropdown', 'value')
     ]
 )
-def render(selected_transcript_sentiment):
+@result_cache.memoize(
+    'correlation-heatmap',
+    grid=[option_values(correlation_state_options), option_values(correlation_window_options)]
+)
+def render(selected_state, selected_window):
+
+    # None is every state together, the matrix of the whole data
+    if selected_state == ALL_STATES:
+        selected_state = None
+
+    state_text = get_state_text(selected_state) if selected_state else 'All States'
+    window_text = 'Last {0} Days'.format(selected_window) if selected_window else 'All Days'
+
+    return figures.build_heatmap(
+        correlations.matrix(selected_state, selected_window or None)
+    ).update_layout(
+        title='Correlations in {0}, {1}'.format(state_text, window_text)
+    )
+
+#endregion
+
+#region Press Conference Page
+
+# Transcript Sentiment Over Time
+@result_cache.memoize(
+    'transcript-sentiment-over-time',
+    grid=server_grid([option_values(transcript_sentiment_options), [None]])
+)
+def render_transcript_over_time(selected_transcript_sentiment, window):
 
     transcript_sentiment_text = get_transcript_sentiment_text(selected_transcript_sentiment)
     fig_title = '{0} Over Time'.format(transcript_sentiment_text)
 
-    markdown = '''
-        # {0}
-        This graph shows the change in sentiment from August 1 to August 31 for Vicotria, Queensland and New South Wales. 
-        NSW is consistantly more negative than other states, whilst QLD and VIC are more positive. 
-        All states show a relatively low proportion of neutral sentiment, indicating that states are decisive in the message that
-        they are delivering, either positive or negative. The more positive messaging from Victoria and Queensland may be in an
-        effort to increase vaccination rates due to noted public hesitation, or may be driven by increases in daily doses 
-        with more positive remarks being made as a result. It may also be worth considering the differences in messaging as a result of
-        state government party alignment on the political spectrum, 
-        as Queensland and Victoria are Labor governments compared to the Liberal government in New South Wales.
-    '''.format(fig_title)
+    markdown = transcript_over_time_markdown.format(fig_title)
+
+    linedf = downsample.downsample_groups(state_frames(), 'date', selected_transcript_sentiment, window)
 
     fig = px.line(
-        data,
+        linedf,
         x = "date",
         y =selected_transcript_sentiment ,
         color = "state",
+        render_mode = webgl.render_mode(len(linedf)),
         template = "simple_white"
     ).update_layout(
         title=fig_title,
@@ -981,45 +1037,55 @@ def render(selected_transcript_sentiment):
         yaxis_title=transcript_sentiment_text
     )
 
-    return [fig, markdown]
+    return [zoomed(fig, window, selected_transcript_sentiment), markdown]
 
-# Metric & Transcript Sentiment Over Time
-@app.callback(
+@figure_callback(
     [
-        Output('metric-and-transcript-sentiment-over-time-line-plot', 'figure'),
-        Output('metric-and-transcript-sentiment-over-time-bar-plot', 'figure'),
-        Output('metric-and-transcript-sentiment-over-time-markdown', 'children')
+        Output('transcript-sentiment-over-time-line-plot', 'figure'),
+        Output('transcript-sentiment-over-time-markdown', 'children')
     ],
     [
-        Input('states-dropdown', 'value'),
         Input('transcript-sentiment-dropdown', 'value'),
-        Input('metric-dropdown', 'value')
-    ]
+        Input('transcript-sentiment-over-time-line-plot', 'relayoutData')
+    ],
+    clientside_function='transcript_over_time'
+)
+def render(selected_transcript_sentiment, relayout_data):
+
+    return render_transcript_over_time(selected_transcript_sentiment, zoom_window())
+
+# Metric & Transcript Sentiment Over Time
+@result_cache.memoize(
+    'metric-and-transcript-sentiment-over-time',
+    grid=server_grid([option_values(state_options), option_values(transcript_sentiment_options), option_values(metric_options), [None]])
 )
-def render(selected_state, selected_transcript_sentiment, selected_metric):
+def render_metric_and_transcript_over_time(selected_state, selected_transcript_sentiment, selected_metric, window):
 
     transcript_sentiment_text = get_transcript_sentiment_text(selected_transcript_sentiment)
     state_text = get_state_text(selected_state)
     metric_text = get_metric_text(selected_metric)
     fig_title = "Number of {0} and {1} Over Time in {2}".format(metric_text,transcript_sentiment_text, state_text)
 
-    filtdf= data[data["state"] == selected_state]
+    filtdf= state_partitions.get(selected_state)
+    linedf = downsample.downsample(filtdf, 'date', [selected_metric, selected_transcript_sentiment], window)
+    bardf = downsample.downsample(filtdf, 'date', ['transcript_sentiment_negative', 'transcript_sentiment_neutral', 'transcript_sentiment_positive'], window)
 
     fig = make_subplots(
         rows = 2,
         shared_xaxes = True,
         vertical_spacing = 0.15
     ).add_trace(
-        go.Scatter(
-            x=filtdf["date"],
-            y=filtdf[selected_metric],
+        webgl.scatter(
+            len(linedf),
+            x=linedf["date"],
+            y=linedf[selected_metric],
             name=metric_text
         ),
         row = 1, col =1
     ).add_trace(
         go.Bar(
-            x=filtdf["date"],
-            y=filtdf[selected_transcript_sentiment],
+            x=linedf["date"],
+            y=linedf[selected_transcript_sentiment],
             name="Proportion of {0}".format(transcript_sentiment_text)
         ),
         row = 2, col = 1
@@ -1043,7 +1109,7 @@ def render(selected_state, selected_transcript_sentiment, selected_metric):
     fig_bar_title = 'Sentiment Proportion Over Time for {0}'.format(state_text)
 
     fig_bar = px.bar(
-        data_frame=filtdf,
+        data_frame=bardf,
         x='date',
         y=['transcript_sentiment_negative','transcript_sentiment_neutral','transcript_sentiment_positive']
     ).update_layout(
@@ -1052,20 +1118,31 @@ def render(selected_state, selected_transcript_sentiment, selected_metric):
         yaxis_title="Sentiment Proportion"
     )
 
-    markdown = '''
-        # {0}
-        These graphs shows the change in goverment press conference sentiment and the daily doses of covid-19 vaccine administered.
-        The top portion shows the number of doses in thousands, bottom portion shows the sentiment proportion of transcript for each
-        date. The most notable observation from daily vaccination doses is the reoccurence of large drops in numbers, these seemingly 
-        coincide with the Sunday of every week, rather than any influence from the press conference sentiment. From the Victorian doses,
-        there is a sequence of days from the 13-17 August that get increasingly negative, interestingly the daily doses peaks at its
-        highest point up until August 17. From this point, the number of doses seems to mirror trend in negative sentiment. 
-        Queensland shows the strongest weekly cycle in doses of any state and seems to behave independantly of transcript sentiment.
-        New South Wales shows a slight increase in the number of daily doses from 23-29 August which coincides with more positive
-        messaging in transcripts, possibly reflecting a shift in messaging to elevate vaccine uptake. 
-    '''.format(fig_title)
+    markdown = metric_and_transcript_over_time_markdown.format(fig_title)
+
+    revision = [selected_state, selected_transcript_sentiment, selected_metric]
+
+    return [zoomed(fig, window, revision), zoomed(fig_bar, window, revision), markdown]
+
+# both graphs follow the window of the one that was zoomed
+@figure_callback(
+    [
+        Output('metric-and-transcript-sentiment-over-time-line-plot', 'figure'),
+        Output('metric-and-transcript-sentiment-over-time-bar-plot', 'figure'),
+        Output('metric-and-transcript-sentiment-over-time-markdown', 'children')
+    ],
+    [
+        Input('states-dropdown', 'value'),
+        Input('transcript-sentiment-dropdown', 'value'),
+        Input('metric-dropdown', 'value'),
+        Input('metric-and-transcript-sentiment-over-time-line-plot', 'relayoutData'),
+        Input('metric-and-transcript-sentiment-over-time-bar-plot', 'relayoutData')
+    ],
+    clientside_function='metric_and_transcript_over_time'
+)
+def render(selected_state, selected_transcript_sentiment, selected_metric, line_relayout_data, bar_relayout_data):
 
-    return [fig, fig_bar, markdown]
+    return render_metric_and_transcript_over_time(selected_state, selected_transcript_sentiment, selected_metric, zoom_window())
 
 # Transcript Sentiment vs Twitter Sentiment
 @app.callback(
@@ -1079,6 +1156,10 @@ def render(selected_state, selected_transcript_sentiment, selected_metric):
         Input('twitter-sentiment-dropdown','value')
     ]
 )
+@result_cache.memoize(
+    'transcript-sentiment-vs-twitter-sentiment',
+    grid=[option_values(state_options), option_values(transcript_sentiment_options), option_values(twitter_sentiment_options)]
+)
 def render(selected_state, selected_transcript_sentiment,selected_twitter_sentiment ):
 
     transcript_sentiment_text = get_transcript_sentiment_text(selected_transcript_sentiment)
@@ -1087,13 +1168,13 @@ def render(selected_state, selected_transcript_sentiment,selected_twitter_sentim
     fig_title = "{0} vs. {1} in {2}".format(transcript_sentiment_text, twitter_sentiment_text, state_text)
 
 
-    filt = data[data["state"] == selected_state]
+    filt = state_partitions.get(selected_state)
 
     fig = px.scatter(
         filt,
         x = selected_transcript_sentiment,
         y = selected_twitter_sentiment,
-        trendline="ols"
+        render_mode = webgl.render_mode(len(filt))
     ).update_layout(
         xaxis_title=transcript_sentiment_text,
         yaxis_title=twitter_sentiment_text,
@@ -1101,6 +1182,8 @@ def render(selected_state, selected_transcript_sentiment,selected_twitter_sentim
         template = "simple_white"
     )
 
+    regression.add_trendline(fig, regressions.get(selected_state, selected_transcript_sentiment, selected_twitter_sentiment))
+
     markdown = '''
         # {0}
         This scatterplot allows users to compare transcript and twitter sentiment for selected state. 
@@ -1141,6 +1224,10 @@ def render(selected_state, selected_transcript_sentiment,selected_twitter_sentim
         )
     ]
 )
+@result_cache.memoize(
+    'metric-vs-transcript-sentiment',
+    grid=[option_values(transcript_sentiment_options), option_values(metric_options)]
+)
 def render_plot(selected_transcript_sentiment,selected_metric):
 
     transcript_sentiment_text = get_transcript_sentiment_text(selected_transcript_sentiment)
@@ -1155,27 +1242,20 @@ def render_plot(selected_transcript_sentiment,selected_metric):
         size='total_doses',
         size_max = 50,
         range_y=[0.0, 1.0],
-        title = fig_title
+        title = fig_title,
+        render_mode = webgl.render_mode(len(data))
     ).update_layout(
         template = "simple_white",
         xaxis_title=metric_text,
         yaxis_title=transcript_sentiment_text
     )
 
-    fig_contour = px.density_contour(
-        data_frame=data,
-        x=selected_metric,
-        y=selected_transcript_sentiment,
-        #facet_col='state',
-        marginal_x='histogram',
-        marginal_y='histogram',
-        color='state',
-        title=fig_title,
-        height=800
-    ).update_layout(
-        template = "simple_white",
-        xaxis_title=metric_text,
-        yaxis_title=transcript_sentiment_text
+    # contours and marginals from the cached per-state density grids (see density.py)
+    fig_contour = density.contour_figure(
+        density_grids.states(selected_metric, selected_transcript_sentiment),
+        metric_text,
+        transcript_sentiment_text,
+        fig_title
     )
 
     markdown = '''
@@ -1190,32 +1270,25 @@ def render_plot(selected_transcript_sentiment,selected_metric):
 #region Twitter Page
 
 # Twitter Sentiment Over Time
-@app.callback(
-    [
-        Output('twitter-sentiment-over-time-line-plot', 'figure'),
-        Output('twitter-sentiment-over-time-markdown', 'children')
-    ],
-    [
-        Input('twitter-sentiment-dropdown', 'value')
-    ]
+@result_cache.memoize(
+    'twitter-sentiment-over-time',
+    grid=server_grid([option_values(twitter_sentiment_options), [None]])
 )
-def render(selected_twitter_sentiment):
+def render_twitter_over_time(selected_twitter_sentiment, window):
 
     twitter_sentiment_text = get_twitter_sentiment_text(selected_twitter_sentiment)
     fig_title = '{0} Over Time'.format(twitter_sentiment_text)
 
-    markdown = '''
-        # {0}
-        This graph shows the change in sentiment from August 1 to August 31 for Vicotria, Queensland and New South Wales. 
-        NSW is consistantly more negative than other states, whilst QLD and VIC are more positive. 
-        All states show a relatively low proportion of neutral sentiment.
-    '''.format(fig_title)
+    markdown = twitter_over_time_markdown.format(fig_title)
+
+    linedf = downsample.downsample_groups(state_frames(), 'date', selected_twitter_sentiment, window)
 
     fig = px.line(
-        data,
+        linedf,
         x = "date",
         y =selected_twitter_sentiment ,
         color = "state",
+        render_mode = webgl.render_mode(len(linedf)),
         template = "simple_white"
     ).update_layout(
         title=fig_title,
@@ -1223,45 +1296,55 @@ def render(selected_twitter_sentiment):
         yaxis_title=twitter_sentiment_text
     )
 
-    return [fig, markdown]
+    return [zoomed(fig, window, selected_twitter_sentiment), markdown]
 
-# Metric & Twitter Sentiment Over Time
-@app.callback(
+@figure_callback(
     [
-        Output('metric-and-twitter-sentiment-over-time-line-plot', 'figure'),
-        Output('metric-and-twitter-sentiment-over-time-bar-plot', 'figure'),
-        Output('metric-and-twitter-sentiment-over-time-markdown', 'children')
+        Output('twitter-sentiment-over-time-line-plot', 'figure'),
+        Output('twitter-sentiment-over-time-markdown', 'children')
     ],
     [
-        Input('states-dropdown', 'value'),
         Input('twitter-sentiment-dropdown', 'value'),
-        Input('metric-dropdown', 'value')
-    ]
+        Input('twitter-sentiment-over-time-line-plot', 'relayoutData')
+    ],
+    clientside_function='twitter_over_time'
+)
+def render(selected_twitter_sentiment, relayout_data):
+
+    return render_twitter_over_time(selected_twitter_sentiment, zoom_window())
+
+# Metric & Twitter Sentiment Over Time
+@result_cache.memoize(
+    'metric-and-twitter-sentiment-over-time',
+    grid=server_grid([option_values(state_options), option_values(twitter_sentiment_options), option_values(metric_options), [None]])
 )
-def render(selected_state, selected_twitter_sentiment, selected_metric):
+def render_metric_and_twitter_over_time(selected_state, selected_twitter_sentiment, selected_metric, window):
 
     twitter_sentiment_text = get_twitter_sentiment_text(selected_twitter_sentiment)
     state_text = get_state_text(selected_state)
     metric_text = get_metric_text(selected_metric)
     fig_title = "Number of {0} and {1} Over Time in {2}".format(metric_text,twitter_sentiment_text, state_text)
 
-    filtdf= data[data["state"] == selected_state]
+    filtdf= state_partitions.get(selected_state)
+    linedf = downsample.downsample(filtdf, 'date', [selected_metric, selected_twitter_sentiment], window)
+    bardf = downsample.downsample(filtdf, 'date', ['avr_negative_tweet_sentiment', 'avr_neutral_tweet_sentiment', 'avr_positive_tweet_sentiment'], window)
 
     fig = make_subplots(
         rows = 2,
         shared_xaxes = True,
         vertical_spacing = 0.15
     ).add_trace(
-        go.Scatter(
-            x=filtdf["date"],
-            y=filtdf[selected_metric],
+        webgl.scatter(
+            len(linedf),
+            x=linedf["date"],
+            y=linedf[selected_metric],
             name=metric_text
         ),
         row = 1, col =1
     ).add_trace(
         go.Bar(
-            x=filtdf["date"],
-            y=filtdf[selected_twitter_sentiment],
+            x=linedf["date"],
+            y=linedf[selected_twitter_sentiment],
             name="Proportion of {0}".format(twitter_sentiment_text)
         ),
         row = 2, col = 1
@@ -1285,7 +1368,7 @@ def render(selected_state, selected_twitter_sentiment, selected_metric):
     fig_bar_title = 'Sentiment Proportion Over Time for {0}'.format(state_text)
 
     fig_bar = px.bar(
-        data_frame=filtdf,
+        data_frame=bardf,
         x='date',
         y=['avr_negative_tweet_sentiment','avr_neutral_tweet_sentiment','avr_positive_tweet_sentiment']
     ).update_layout(
@@ -1294,14 +1377,31 @@ def render(selected_state, selected_twitter_sentiment, selected_metric):
         yaxis_title="Sentiment Proportion"
     )
 
-    markdown = '''
-        # {0}
-        This graph shows the change in goverment press conference sentiment and the daily doses of covid-19 vaccine administered.
-        The top portion shows the number of doses in thousands, bottom portion shows the sentiment proportion of twitter for each
-        date. 
-    '''.format(fig_title)
+    markdown = metric_and_twitter_over_time_markdown.format(fig_title)
+
+    revision = [selected_state, selected_twitter_sentiment, selected_metric]
+
+    return [zoomed(fig, window, revision), zoomed(fig_bar, window, revision), markdown]
+
+# both graphs follow the window of the one that was zoomed
+@figure_callback(
+    [
+        Output('metric-and-twitter-sentiment-over-time-line-plot', 'figure'),
+        Output('metric-and-twitter-sentiment-over-time-bar-plot', 'figure'),
+        Output('metric-and-twitter-sentiment-over-time-markdown', 'children')
+    ],
+    [
+        Input('states-dropdown', 'value'),
+        Input('twitter-sentiment-dropdown', 'value'),
+        Input('metric-dropdown', 'value'),
+        Input('metric-and-twitter-sentiment-over-time-line-plot', 'relayoutData'),
+        Input('metric-and-twitter-sentiment-over-time-bar-plot', 'relayoutData')
+    ],
+    clientside_function='metric_and_twitter_over_time'
+)
+def render(selected_state, selected_twitter_sentiment, selected_metric, line_relayout_data, bar_relayout_data):
 
-    return [fig, fig_bar, markdown]
+    return render_metric_and_twitter_over_time(selected_state, selected_twitter_sentiment, selected_metric, zoom_window())
 
 # Twitter Sentiment vs Transcript Sentiment
 @app.callback(
@@ -1315,6 +1415,10 @@ def render(selected_state, selected_twitter_sentiment, selected_metric):
         Input('transcript-sentiment-dropdown','value')
     ]
 )
+@result_cache.memoize(
+    'twitter-sentiment-vs-transcript-sentiment',
+    grid=[option_values(state_options), option_values(twitter_sentiment_options), option_values(transcript_sentiment_options)]
+)
 def render(selected_state, selected_twitter_sentiment, selected_transcript_sentiment ):
 
     twitter_sentiment_text = get_twitter_sentiment_text(selected_twitter_sentiment)
@@ -1323,13 +1427,13 @@ def render(selected_state, selected_twitter_sentiment, selected_transcript_senti
     fig_title = "{0} vs. {1} in {2}".format(twitter_sentiment_text, transcript_sentiment_text, state_text)
 
 
-    filt = data[data["state"] == selected_state]
+    filt = state_partitions.get(selected_state)
 
     fig = px.scatter(
         filt,
         x = selected_twitter_sentiment,
         y = selected_transcript_sentiment,
-        trendline="ols"
+        render_mode = webgl.render_mode(len(filt))
     ).update_layout(
         xaxis_title=twitter_sentiment_text,
         yaxis_title=transcript_sentiment_text,
@@ -1337,6 +1441,8 @@ def render(selected_state, selected_twitter_sentiment, selected_transcript_senti
         template = "simple_white"
     )
 
+    regression.add_trendline(fig, regressions.get(selected_state, selected_twitter_sentiment, selected_transcript_sentiment))
+
     markdown = '''
         # {0}
         This scatterplot allows users to compare twitter and transcript sentiment for selected state. 
@@ -1374,6 +1480,10 @@ def render(selected_state, selected_twitter_sentiment, selected_transcript_senti
         )
     ]
 )
+@result_cache.memoize(
+    'metric-vs-twitter-sentiment',
+    grid=[option_values(twitter_sentiment_options), option_values(metric_options)]
+)
 def render_plot(selected_twitter_sentiment,selected_metric):
 
     twitter_sentiment_text = get_twitter_sentiment_text(selected_twitter_sentiment)
@@ -1388,27 +1498,20 @@ def render_plot(selected_twitter_sentiment,selected_metric):
         size='total_doses',
         size_max = 50,
         range_y=[0.0, 1.0],
-        title = fig_title
+        title = fig_title,
+        render_mode = webgl.render_mode(len(data))
     ).update_layout(
         template = "simple_white",
         xaxis_title=metric_text,
         yaxis_title=twitter_sentiment_text
     )
 
-    fig_contour = px.density_contour(
-        data_frame=data,
-        x=selected_metric,
-        y=selected_twitter_sentiment,
-        #facet_col='state',
-        marginal_x='histogram',
-        marginal_y='histogram',
-        color='state',
-        title=fig_title,
-        height=800
-    ).update_layout(
-        template = "simple_white",
-        xaxis_title=metric_text,
-        yaxis_title=twitter_sentiment_text
+    # contours and marginals from the cached per-state density grids (see density.py)
+    fig_contour = density.contour_figure(
+        density_grids.states(selected_metric, selected_twitter_sentiment),
+        metric_text,
+        twitter_sentiment_text,
+        fig_title
     )
 
     markdown = '''
@@ -1426,14 +1529,51 @@ def render_plot(selected_twitter_sentiment,selected_metric):
     [Input("url", "pathname")]
 )
 def render_page_content(pathname):
-    if pathname == "/":
-        return page_home
-    elif pathname == "/press-conferences":
-        return page_press_conferences
-    elif pathname == "/twitter":
-        return page_twitter
-    # If the user tries to reach a different page, return a 404 message
-    return page_404
+    # built on the first request to the route, unknown routes get the 404 page (see pages.py)
+    return page_cache.get(pathname)
+
+#endregion
+
+#region Data Refresh
+
+dashboard_aggregates = None
+
+# Append new daily rows (merged_aug_updated.csv layout) to the loaded data.
+# geo_data and data_corr are updated from the new rows only (see aggregates.py),
+# and the per-state grids, fits and matrices only for the states that got rows
+def append_rows(rows, persist=False):
+
+    global data, geo_data, data_corr, state_partitions, dashboard_aggregates
+
+    if dashboard_aggregates is None:
+        dashboard_aggregates = aggregates.DashboardAggregates(data, geo_data, data_corr)
+
+    raw_rows = rows.assign(date = store.parse_dates(rows['date']))
+    prepared_rows = aggregates.prepare_rows(raw_rows)
+    geo_data, data_corr = dashboard_aggregates.append(raw_rows, prepared_rows)
+
+    state_partitions = state_partitions.append(prepared_rows)
+    data = state_partitions.data
+    density_grids.refresh(state_partitions, prepared_rows)
+    regressions.append(prepared_rows)
+    correlations.refresh(state_partitions, prepared_rows['state'].astype(str).unique())
+
+    result_cache.clear()
+
+    # only the pages embedding a changed static figure are rebuilt
+    page_cache.invalidate(static_figures.refresh(figure_frames()))
+
+    if persist:
+        store.append_rows(rows)
+        store.write_store(data, geo_data, data_corr)
+
+#endregion
+
+#region Cache Warm Up
+
+if WARM_CACHE:
+    result_cache.warm()
+    page_cache.warm()
 
 #endregion
 
@@ -0,0 +1,139 @@
+/*
+ * Clientside versions of the over-time callbacks (see clientside.py).
+ * The payload in the clientside-data store holds the per-state columns,
+ * the dropdown labels, the markdown templates and the plotly templates.
+ */
+
+(function () {
+
+    // Python's str.title()
+    function title(text) {
+        return text.replace(/[A-Za-z]+/g, function (word) {
+            return word.charAt(0).toUpperCase() + word.slice(1).toLowerCase();
+        });
+    }
+
+    function format(template, value) {
+        return template.split('{0}').join(value);
+    }
+
+    function copy(value) {
+        return JSON.parse(JSON.stringify(value));
+    }
+
+    // px.line(data, x="date", y=column, color="state", template="simple_white")
+    function overTime(source) {
+        return function (selected_sentiment, payload) {
+            var sentiment_text = payload.labels[source][selected_sentiment];
+            var fig_title = format('{0} Over Time', sentiment_text);
+
+            var traces = Object.keys(payload.states).map(function (state) {
+                var columns = payload.states[state];
+                return {
+                    type: 'scatter',
+                    mode: 'lines',
+                    x: columns.date,
+                    y: columns[selected_sentiment],
+                    name: state,
+                    legendgroup: state,
+                    showlegend: true,
+                    hovertemplate: 'state=' + state + '<br>date=%{x}<br>' + selected_sentiment + '=%{y}<extra></extra>'
+                };
+            });
+
+            var figure = {
+                data: traces,
+                layout: {
+                    template: payload.templates.simple_white,
+                    legend: {title: {text: 'state'}, tracegroupgap: 0},
+                    title: {text: fig_title},
+                    xaxis: {title: {text: 'Date'}},
+                    yaxis: {title: {text: sentiment_text}}
+                }
+            };
+
+            return [figure, format(payload.markdown[source + '_over_time'], fig_title)];
+        };
+    }
+
+    // make_subplots line + bar, and the stacked px.bar of the three sentiment columns
+    function metricOverTime(source, sentiment_columns) {
+        return function (selected_state, selected_sentiment, selected_metric, payload) {
+            var columns = payload.states[selected_state];
+            var sentiment_text = payload.labels[source][selected_sentiment];
+            var state_text = payload.labels.states[selected_state];
+            var metric_text = payload.labels.metrics[selected_metric];
+            var fig_title = 'Number of ' + metric_text + ' and ' + sentiment_text + ' Over Time in ' + state_text;
+
+            var layout = copy(payload.subplots);
+            layout.template = payload.templates.simple_white;
+            layout.title = {text: title(fig_title)};
+            layout.yaxis.title = {text: title('Number of ' + metric_text), font: {size: 10}, standoff: 30};
+            layout.yaxis2.title = {text: title('Proportion of ' + sentiment_text), font: {size: 10}, standoff: 30};
+
+            var figure = {
+                data: [
+                    {
+                        type: 'scatter',
+                        x: columns.date,
+                        y: columns[selected_metric],
+                        name: metric_text,
+                        xaxis: 'x',
+                        yaxis: 'y'
+                    },
+                    {
+                        type: 'bar',
+                        x: columns.date,
+                        y: columns[selected_sentiment],
+                        name: 'Proportion of ' + sentiment_text,
+                        xaxis: 'x2',
+                        yaxis: 'y2'
+                    }
+                ],
+                layout: layout
+            };
+
+            var figure_bar = {
+                data: sentiment_columns.map(function (column) {
+                    return {
+                        type: 'bar',
+                        x: columns.date,
+                        y: columns[column],
+                        name: column,
+                        legendgroup: column,
+                        showlegend: true,
+                        hovertemplate: 'variable=' + column + '<br>date=%{x}<br>value=%{y}<extra></extra>'
+                    };
+                }),
+                layout: {
+                    template: payload.templates.plotly,
+                    barmode: 'relative',
+                    legend: {title: {text: 'variable'}, tracegroupgap: 0},
+                    title: {text: 'Sentiment Proportion Over Time for ' + state_text},
+                    xaxis: {title: {text: 'Date'}},
+                    yaxis: {title: {text: 'Sentiment Proportion'}}
+                }
+            };
+
+            return [figure, figure_bar, format(payload.markdown['metric_and_' + source + '_over_time'], fig_title)];
+        };
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        dashboard: {
+            transcript_over_time: overTime('transcript'),
+            twitter_over_time: overTime('twitter'),
+            metric_and_transcript_over_time: metricOverTime('transcript', [
+                'transcript_sentiment_negative',
+                'transcript_sentiment_neutral',
+                'transcript_sentiment_positive'
+            ]),
+            metric_and_twitter_over_time: metricOverTime('twitter', [
+                'avr_negative_tweet_sentiment',
+                'avr_neutral_tweet_sentiment',
+                'avr_positive_tweet_sentiment'
+            ])
+        }
+    });
+
+})();
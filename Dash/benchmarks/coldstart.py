@@ -0,0 +1,148 @@
+'''
+
+Cold start profile and budget check for app.py.
+
+Imports the app in fresh processes under `python -X importtime` and reports:
+
+    boot_s          wall time of `import app` (median over --repeat runs)
+    modules         the slowest imports by cumulative time (median per module)
+    eager           heavy modules that were imported at startup although they
+                    should load on first use (see lazy.py)
+
+The run fails (exit status 1) when the median boot time is over the budget or
+a heavy module was imported eagerly (unless DASH_LAZY_IMPORTS=0), so it can
+guard startup in CI. The cache warm up is off while measuring, as it renders
+figures and so imports the plotting modules on purpose.
+
+Usage:
+    python benchmarks/coldstart.py
+    python benchmarks/coldstart.py --repeat 5 --top 30 --budget 2.5
+
+Settings (environment):
+    DASH_COLDSTART_BUDGET   cold start budget in seconds (default 3.0)
+
+'''
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+
+COLDSTART_BUDGET = float(os.environ.get('DASH_COLDSTART_BUDGET', 3.0))
+
+# modules only some figures need, which must not be imported at startup
+HEAVY_MODULES = ['scipy', 'statsmodels', 'plotly.express', 'plotly.subplots', 'geojson_rewind']
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import app
+boot = time.perf_counter() - start
+print(json.dumps({{'boot_s': boot, 'loaded': sorted(name for name in {0!r} if name in sys.modules)}}))
+'''
+
+#region Profile
+
+def parse_importtime(stderr):
+
+    # "import time: self [us] | cumulative | imported package" lines, in microseconds
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us) / 1e6, int(cumulative_us) / 1e6)
+
+    return modules
+
+def run_once():
+
+    env = dict(os.environ, DASH_WARM_CACHE='0')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-W', 'ignore', '-c', PROBE.format(HEAVY_MODULES)],
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True
+    )
+
+    # the app may print while loading, the result is the last line
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['modules'] = parse_importtime(completed.stderr)
+
+    return result
+
+def profile(repeat):
+
+    runs = [run_once() for _ in range(repeat)]
+
+    names = set().union(*[run['modules'] for run in runs])
+    modules = {
+        name: {
+            'self_s': statistics.median(run['modules'][name][0] for run in runs if name in run['modules']),
+            'cumulative_s': statistics.median(run['modules'][name][1] for run in runs if name in run['modules'])
+        }
+        for name in names
+    }
+
+    return {
+        'boot_s': statistics.median(run['boot_s'] for run in runs),
+        'boot_max_s': max(run['boot_s'] for run in runs),
+        'eager': sorted(set().union(*[run['loaded'] for run in runs])),
+        'modules': modules
+    }
+
+#endregion
+
+#region Report
+
+def report(result, top, budget):
+
+    lines = ['{0:<60} {1:>10} {2:>12}'.format('module', 'self_ms', 'cumulative_ms')]
+    slowest = sorted(result['modules'].items(), key=lambda item: -item[1]['cumulative_s'])[:top]
+    for name, module in slowest:
+        lines.append('{0:<60} {1:>10.1f} {2:>12.1f}'.format(name, module['self_s'] * 1000, module['cumulative_s'] * 1000))
+
+    lines.append('')
+    lines.append('import app: {0:.3f}s median, {1:.3f}s max (budget {2:.3f}s)'.format(result['boot_s'], result['boot_max_s'], budget))
+    lines.append('Heavy modules imported at startup: {0}'.format(', '.join(result['eager']) or '-'))
+
+    return '\n'.join(lines)
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Profile the cold start of the dashboard and check it against a budget.')
+    parser.add_argument('--repeat', type=int, default=3, help='fresh processes to time')
+    parser.add_argument('--top', type=int, default=20, help='slowest imports to list')
+    parser.add_argument('--budget', type=float, default=COLDSTART_BUDGET, help='cold start budget in seconds')
+    parser.add_argument('--json', action='store_true', help='print the full profile as json')
+    args = parser.parse_args()
+
+    result = profile(args.repeat)
+
+    if args.json:
+        print(json.dumps(result, indent=4))
+    else:
+        print(report(result, args.top, args.budget))
+
+    failures = []
+    if result['boot_s'] > args.budget:
+        failures.append('cold start {0:.3f}s is over the {1:.3f}s budget'.format(result['boot_s'], args.budget))
+    # DASH_LAZY_IMPORTS=0 imports them at startup on purpose
+    if result['eager'] and os.environ.get('DASH_LAZY_IMPORTS', '1') == '1':
+        failures.append('imported eagerly: {0}'.format(', '.join(result['eager'])))
+
+    if failures:
+        print('FAIL: ' + '; '.join(failures))
+        sys.exit(1)
+
+    print('OK')
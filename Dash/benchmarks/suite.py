@@ -0,0 +1,221 @@
+'''
+
+Benchmark suite on synthetic scaled data.
+
+For every scale a synthetic data directory is written (see synthetic.py) and
+the app is measured against it in fresh processes:
+
+    boot_csv_s          import time of app.py with no store (parses the CSVs)
+    build_s             python store.py && python figures.py
+    boot_store_s        import time of app.py from the store
+    peak_rss_mb         peak resident memory of the process after the callbacks ran
+    callbacks           per callback: uncached latency (median and max over a
+                        sample of its input grid, after one untimed call) and
+                        serialized figure size
+
+Results are saved to ./benchmarks/results/<time>.json and compared with the
+previous results file (or the one given with --compare).
+
+Usage:
+    python benchmarks/suite.py                      scales 1, 10 and 100
+    python benchmarks/suite.py --scales 1 10 100 1000 --samples 3
+    python benchmarks/suite.py --compare benchmarks/results/baseline.json
+
+'''
+
+import argparse
+import glob
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCHMARK_DIR)
+WORK_DIR = os.path.join(BENCHMARK_DIR, 'work')
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, 'results')
+
+sys.path.insert(0, APP_DIR)
+
+import synthetic
+
+#region Measure (runs inside the app process)
+
+def sample(grid, samples):
+
+    # evenly spaced combinations of the input grid
+    import itertools
+
+    combinations = list(itertools.product(*grid))
+    step = max(1, len(combinations) // samples)
+
+    return combinations[::step][:samples]
+
+def payload_size(result):
+
+    import plotly
+
+    return len(json.dumps(result, cls=plotly.utils.PlotlyJSONEncoder))
+
+def measure(samples):
+
+    start = time.perf_counter()
+    import app
+    boot = time.perf_counter() - start
+
+    callbacks = {}
+    for name, (wrapper, grid) in app.result_cache.callbacks.items():
+        # the undecorated function, so every call is a miss
+        func = wrapper.__wrapped__
+        latencies, sizes = [], []
+        combinations = sample(grid, samples)
+        # one untimed pass, so the deferred imports (see lazy.py) and plotly's
+        # first figure setup are not timed as part of the first callback
+        func(*combinations[0])
+        for args in combinations:
+            start = time.perf_counter()
+            result = func(*args)
+            latencies.append(time.perf_counter() - start)
+            sizes.append(payload_size(result))
+        callbacks[name] = {
+            'latency_ms': statistics.median(latencies) * 1000,
+            'latency_max_ms': max(latencies) * 1000,
+            'payload_bytes': max(sizes)
+        }
+
+    return {
+        'boot_s': boot,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'callbacks': callbacks
+    }
+
+#endregion
+
+#region Run
+
+def run_app_process(data_dir, *args):
+
+    env = dict(os.environ, DASH_DATA_DIR=data_dir, DASH_WARM_CACHE='0')
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-W', 'ignore'] + list(args),
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+        universal_newlines=True
+    )
+
+    return completed.stdout, time.perf_counter() - start
+
+def measure_in_process(data_dir, samples):
+
+    stdout, _ = run_app_process(data_dir, os.path.abspath(__file__), '--measure', '--samples', str(samples))
+
+    # the app may print while loading, the result is the last line
+    return json.loads(stdout.strip().splitlines()[-1])
+
+def run_scale(scale, samples):
+
+    states, days = synthetic.SCALES[scale]
+    data_dir = os.path.join(WORK_DIR, '{0}x'.format(scale))
+    rows = synthetic.write_data_dir(data_dir, states, days)
+
+    # built outputs of an earlier run would turn the csv boot into a store boot
+    for built in ['store', 'figures']:
+        shutil.rmtree(os.path.join(data_dir, built), ignore_errors=True)
+
+    csv = measure_in_process(data_dir, 1)
+
+    _, build = run_app_process(data_dir, '-c', 'import store, figures; store.build(); figures.build(figures.load_frames())')
+
+    stored = measure_in_process(data_dir, samples)
+
+    return {
+        'states': states,
+        'days': days,
+        'rows': rows,
+        'boot_csv_s': csv['boot_s'],
+        'build_s': build,
+        'boot_store_s': stored['boot_s'],
+        'peak_rss_mb': stored['peak_rss_mb'],
+        'callbacks': stored['callbacks']
+    }
+
+#endregion
+
+#region Compare
+
+def flatten(results):
+
+    values = {}
+    for scale, result in results['scales'].items():
+        for key in ['boot_csv_s', 'build_s', 'boot_store_s', 'peak_rss_mb']:
+            values[(scale, key)] = result[key]
+        for name, callback in result['callbacks'].items():
+            for key, value in callback.items():
+                values[(scale, '{0}.{1}'.format(name, key))] = value
+
+    return values
+
+def compare(previous, current):
+
+    before = flatten(previous)
+    after = flatten(current)
+
+    lines = ['{0:>6}  {1:<60} {2:>12} {3:>12} {4:>8}'.format('scale', 'metric', 'previous', 'current', 'change')]
+    for key in sorted(after, key=lambda key: (int(key[0]), key[1])):
+        if key not in before:
+            continue
+        change = (after[key] - before[key]) / before[key] * 100 if before[key] else float('nan')
+        lines.append('{0:>5}x  {1:<60} {2:>12.2f} {3:>12.2f} {4:>+7.1f}%'.format(key[0], key[1], before[key], after[key], change))
+
+    return '\n'.join(lines)
+
+def latest_results():
+
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, '*.json')))
+
+    return paths[-1] if paths else None
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard on synthetic scaled data.')
+    parser.add_argument('--scales', type=int, nargs='+', choices=sorted(synthetic.SCALES), default=[1, 10, 100])
+    parser.add_argument('--samples', type=int, default=5, help='input combinations timed per callback')
+    parser.add_argument('--compare', help='results file to compare with (default: the latest one)')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.samples)))
+        sys.exit()
+
+    previous = args.compare or latest_results()
+
+    results = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'environment': {key: value for key, value in os.environ.items() if key.startswith('DASH_')},
+        'scales': {}
+    }
+    for scale in args.scales:
+        print('Measuring {0}x ...'.format(scale), flush=True)
+        results['scales'][str(scale)] = run_scale(scale, args.samples)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, '{0}.json'.format(time.strftime('%Y%m%d-%H%M%S')))
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=4)
+    print('Saved {0}'.format(path))
+
+    if previous:
+        with open(previous) as file:
+            print('Compared with {0}'.format(previous))
+            print(compare(json.load(file), results))
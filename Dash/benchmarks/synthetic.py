@@ -0,0 +1,131 @@
+'''
+
+Synthetic, scaled versions of merged_aug_updated.csv.
+
+The real file covers 3 states over 36 days. A scale multiplies states x days
+(1x is the real shape) and fills them with values drawn like the real ones:
+sentiment triples that sum to one, press conference days with gaps, tweet
+counts with missing days and cumulative doses. States beyond the eight real
+ones are copies of a real state (same city row and map shape) with a numbered
+code, so every page, choropleth included, still renders.
+
+Usage:
+    python benchmarks/synthetic.py ./benchmarks/work/10x --scale 10
+    python benchmarks/synthetic.py ./benchmarks/work/custom --states 12 --days 400
+
+'''
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import store
+
+# states x days for each named scale
+SCALES = {
+    1: (3, 36),
+    10: (6, 180),
+    100: (24, 450),
+    1000: (48, 2250)
+}
+
+START_DATE = '2021-08-01'
+
+# share of days without a press conference / without tweets, as in the real file
+PRESS_GAP = 0.33
+TWEET_GAP = 0.13
+
+def state_codes(count):
+
+    cities = pd.read_csv(store.CITIES_CSV)
+    real = list(cities['State'])
+
+    return [
+        real[i % len(real)] + ('' if i < len(real) else str(i // len(real) + 1))
+        for i in range(count)
+    ]
+
+def sentiment_triples(rng, rows, concentration):
+
+    return rng.dirichlet(concentration, size=rows)
+
+def generate(states, days, seed=0):
+
+    rng = np.random.default_rng(seed)
+    codes = state_codes(states)
+    rows = states * days
+
+    dates = pd.date_range(START_DATE, periods=days, freq='D')
+
+    transcript = sentiment_triples(rng, rows, [9.0, 1.0, 9.0])
+    transcript[rng.random(rows) < PRESS_GAP] = np.nan
+
+    tweets = sentiment_triples(rng, rows, [2.0, 3.0, 5.0])
+    tweet_total = rng.poisson(60, size=rows).astype(float)
+    no_tweets = rng.random(rows) < TWEET_GAP
+    tweets[no_tweets] = np.nan
+    tweet_total[no_tweets] = np.nan
+
+    daily_doses = rng.gamma(4.0, 16000.0, size=(days, states)).round()
+    total_doses = 2000000 + daily_doses.cumsum(axis=0)
+
+    # day major, state minor, the order of the real file
+    data = pd.DataFrame({
+        'state': np.tile(codes, days),
+        'date': np.repeat(dates.strftime('%Y-%m-%d'), states),
+        'daily_newcase': rng.negative_binomial(2, 0.008, size=rows),
+        'transcript_sentiment_positive': transcript[:, 0],
+        'transcript_sentiment_neutral': transcript[:, 1],
+        'transcript_sentiment_negative': transcript[:, 2],
+        'avr_positive_tweet_sentiment': tweets[:, 0],
+        'avr_neutral_tweet_sentiment': tweets[:, 1],
+        'avr_negative_tweet_sentiment': tweets[:, 2],
+        'tweet_total': tweet_total,
+        'total_doses': total_doses.ravel().astype(int),
+        'daily_doses': daily_doses.ravel().astype(int)
+    })
+
+    return data
+
+def synthetic_cities(codes):
+
+    cities = pd.read_csv(store.CITIES_CSV)
+    real = cities.set_index('State')
+
+    return pd.DataFrame([
+        dict(real.loc[code.rstrip('0123456789')], State=code)
+        for code in codes
+    ])[list(cities.columns)]
+
+def write_data_dir(path, states, days, seed=0):
+
+    # a directory laid out like ./data, for use as DASH_DATA_DIR
+    os.makedirs(path, exist_ok=True)
+
+    data = generate(states, days, seed)
+    data.to_csv(os.path.join(path, os.path.basename(store.MERGED_CSV)), index=False)
+    synthetic_cities(data['state'].unique()).to_csv(os.path.join(path, os.path.basename(store.CITIES_CSV)), index=False)
+    shutil.copyfile(store.STATES_GEOJSON, os.path.join(path, os.path.basename(store.STATES_GEOJSON)))
+
+    return len(data)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Write a synthetic, scaled dashboard data directory.')
+    parser.add_argument('path', help='directory to write (used as DASH_DATA_DIR)')
+    parser.add_argument('--scale', type=int, choices=sorted(SCALES), default=1)
+    parser.add_argument('--states', type=int, help='override the number of states')
+    parser.add_argument('--days', type=int, help='override the number of days')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    states, days = SCALES[args.scale]
+    rows = write_data_dir(args.path, args.states or states, args.days or days, args.seed)
+
+    print('Wrote {0} row(s) to {1}'.format(rows, args.path))
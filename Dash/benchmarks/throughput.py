@@ -0,0 +1,126 @@
+'''
+
+Throughput test against a running dashboard.
+
+Fires the dashboard's own callback requests (discovered from
+/_dash-dependencies) at a server from a pool of client threads and reports
+requests per second and latency percentiles.
+
+Usage:
+    python benchmarks/throughput.py --url http://127.0.0.1:8050 --concurrency 8 --duration 20
+
+'''
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+# dropdown values used for every request
+INPUT_VALUES = {
+    'states-dropdown': 'VIC',
+    'transcript-sentiment-dropdown': 'transcript_sentiment_negative',
+    'twitter-sentiment-dropdown': 'avr_negative_tweet_sentiment',
+    'metric-dropdown': 'daily_doses',
+    'url': '/'
+}
+
+def get_json(url):
+
+    with urllib.request.urlopen(url) as response:
+        return json.load(response)
+
+def callback_body(dependency):
+
+    output = dependency['output']
+    if output.startswith('..'):
+        outputs = [
+            {'id': item.split('.')[0], 'property': item.split('.')[1]}
+            for item in output.strip('.').split('...')
+        ]
+    else:
+        outputs = {'id': output.split('.')[0], 'property': output.split('.')[1]}
+
+    inputs = [
+        dict(item, value=INPUT_VALUES.get(item['id']))
+        for item in dependency['inputs']
+    ]
+    state = [
+        dict(item, value=INPUT_VALUES.get(item['id']))
+        for item in dependency.get('state', [])
+    ]
+
+    return {
+        'output': output,
+        'outputs': outputs,
+        'inputs': inputs,
+        'state': state,
+        'changedPropIds': ['{0}.{1}'.format(inputs[0]['id'], inputs[0]['property'])]
+    }
+
+def request_bodies(url, match=None):
+
+    return [
+        json.dumps(callback_body(dependency)).encode()
+        for dependency in get_json(url + '/_dash-dependencies')
+        if not dependency.get('clientside_function')
+        and (match is None or match in dependency['output'])
+    ]
+
+def run(url, bodies, concurrency, duration):
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            request = urllib.request.Request(
+                url + '/_dash-update-component',
+                data=bodies[index % len(bodies)],
+                headers={'Content-Type': 'application/json'}
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+            index += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float('nan')
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_second': len(latencies) / duration,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99)
+    }
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Measure dashboard callback throughput.')
+    parser.add_argument('--url', default='http://127.0.0.1:8050')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--duration', type=float, default=20, help='seconds to run')
+    parser.add_argument('--match', help='only send callbacks whose output contains this text')
+    args = parser.parse_args()
+
+    result = run(args.url.rstrip('/'), request_bodies(args.url.rstrip('/'), args.match), args.concurrency, args.duration)
+
+    print(json.dumps(result, indent=4))
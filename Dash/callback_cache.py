@@ -0,0 +1,98 @@
+'''
+
+Memoizing result cache for the dashboard callbacks.
+
+Every figure callback is a pure function of its dropdown values, and the
+dropdowns only offer a handful of options. Results are kept in one bounded LRU
+keyed on the callback name and its input tuple, so a repeated selection is a
+dictionary lookup. Callbacks registered with a grid of their input options can
+be pre-computed for every combination with `warm()`.
+
+Settings (environment):
+    DASH_CACHE_SIZE     maximum number of cached results (default 256)
+    DASH_WARM_CACHE     set to 1 to fill the whole grid at boot
+
+'''
+
+from collections import OrderedDict
+import functools
+import itertools
+import os
+import threading
+
+CACHE_SIZE = int(os.environ.get('DASH_CACHE_SIZE', 256))
+WARM_CACHE = os.environ.get('DASH_WARM_CACHE', '0') == '1'
+
+
+class ResultCache:
+
+    def __init__(self, maxsize=CACHE_SIZE):
+
+        self.maxsize = maxsize
+        self.results = OrderedDict()
+        self.callbacks = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def memoize(self, name, grid=None):
+
+        def decorator(func):
+
+            @functools.wraps(func)
+            def wrapper(*args):
+
+                key = (name,) + args
+
+                with self.lock:
+                    if key in self.results:
+                        self.results.move_to_end(key)
+                        self.hits += 1
+                        return self.results[key]
+                    self.misses += 1
+
+                # computed outside the lock so slow figures do not block lookups
+                result = func(*args)
+
+                with self.lock:
+                    self.results[key] = result
+                    self.results.move_to_end(key)
+                    while len(self.results) > self.maxsize:
+                        self.results.popitem(last=False)
+
+                return result
+
+            self.callbacks[name] = (wrapper, grid)
+            return wrapper
+
+        return decorator
+
+    def warm(self):
+
+        count = 0
+        for wrapper, grid in self.callbacks.values():
+            if grid is None:
+                continue
+            for args in itertools.product(*grid):
+                wrapper(*args)
+                count += 1
+
+        return count
+
+    def clear(self):
+
+        with self.lock:
+            self.results.clear()
+
+    def info(self):
+
+        with self.lock:
+            return {
+                'size': len(self.results),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,56 @@
+'''
+
+Clientside rendering mode.
+
+The over-time callbacks only change which column is drawn, so in this mode the
+per-state columns are shipped once in a dcc.Store and the figures are rebuilt
+in the browser by the functions in assets/clientside.js. Dropdown changes for
+those plots never reach the server.
+
+Settings (environment):
+    DASH_CLIENTSIDE     set to 1 to enable the clientside callbacks
+
+'''
+
+import os
+
+CLIENTSIDE = os.environ.get('DASH_CLIENTSIDE', '0') == '1'
+
+STORE_ID = 'clientside-data'
+
+# json wants null rather than NaN, and ISO dates are all plotly.js needs
+def column_values(series):
+
+    if series.dtype.kind == 'M':
+        return series.dt.strftime('%Y-%m-%d').tolist()
+
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def build_payload(partitions, columns, labels, markdown):
+
+    import plotly.io as pio
+    from plotly.subplots import make_subplots
+
+    subplots = make_subplots(
+        rows = 2,
+        shared_xaxes = True,
+        vertical_spacing = 0.15
+    ).layout.to_plotly_json()
+    subplots.pop('template', None)
+
+    return {
+        'states': {
+            state: {
+                column: column_values(partitions.get(state)[column])
+                for column in ['date'] + columns
+            }
+            for state in partitions.slices
+        },
+        'labels': labels,
+        'markdown': markdown,
+        'templates': {
+            name: pio.templates[name].to_plotly_json()
+            for name in ['plotly', 'simple_white']
+        },
+        'subplots': subplots
+    }
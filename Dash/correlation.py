@@ -0,0 +1,132 @@
+'''
+
+Per-state and rolling window correlation matrices.
+
+A matrix of a state over its whole history or a trailing 7/14/28 day window
+comes from the pairwise sums (counts, sums, squares and cross-products over
+rows where both values are present) of those rows alone, with
+aggregates.PairwiseMoments, on first request. For a rolling series the sums
+are accumulated along the date axis, so the sums of any window are the
+difference of two cumulative rows and one pass gives the matrix of every end
+date.
+
+'''
+
+import threading
+
+import numpy as np
+
+from aggregates import PairwiseMoments, pearson
+
+# trailing windows, in days, offered for every state
+WINDOWS = [7, 14, 28]
+
+def cumulative_sums(values):
+
+    '''
+    Cumulative pairwise sums (n, sx, sxx, sxy) of an (rows, k) array, each of
+    shape (rows + 1, k, k) with a leading row of zeros. Values are shifted by
+    their column means to keep the sums well conditioned.
+    '''
+
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    shift = np.where(counts > 0, np.where(present, values, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+
+    x = np.where(present, values - shift, 0.0)
+    m = present.astype(float)
+
+    terms = [
+        m[:, :, None] * m[:, None, :],
+        x[:, :, None] * m[:, None, :],
+        (x * x)[:, :, None] * m[:, None, :],
+        x[:, :, None] * x[:, None, :]
+    ]
+
+    k = values.shape[1]
+    return [
+        np.concatenate([np.zeros((1, k, k)), np.cumsum(term, axis=0)])
+        for term in terms
+    ]
+
+def window_starts(dates, ends, window):
+
+    # first row inside the `window` days ending at each of the end rows
+    return np.searchsorted(dates, dates[ends] - np.timedelta64(window - 1, 'D'), side='left')
+
+
+class CorrelationEngine:
+
+    '''
+    Correlation matrices of the given columns per state, and for state None
+    of all states together: over the whole history and over the trailing
+    windows ending at the last date. Matrices are computed on first request
+    and kept until the state receives new rows.
+    '''
+
+    def __init__(self, partitions, columns):
+
+        self.partitions = partitions
+        self.columns = list(columns)
+        self.matrices = {}
+        self.lock = threading.Lock()
+
+    def rows(self, state):
+
+        if state is None:
+            return self.partitions.data
+
+        return self.partitions.get(state)
+
+    def latest(self, state, window):
+
+        # the pairwise sums of the window rows alone, as DataFrame.corr would
+        frame = self.rows(state)
+        if window is not None and len(frame) > 0:
+            dates = frame['date'].to_numpy(dtype='datetime64[ns]')
+            frame = frame[dates >= dates.max() - np.timedelta64(window - 1, 'D')]
+
+        return PairwiseMoments(self.columns).update(frame).corr()
+
+    def matrix(self, state, window=None):
+
+        key = (state, window)
+        with self.lock:
+            if key in self.matrices:
+                return self.matrices[key]
+
+        matrix = self.latest(state, window)
+
+        with self.lock:
+            return self.matrices.setdefault(key, matrix)
+
+    def refresh(self, partitions, states):
+
+        '''
+        Switches to new partitions and drops the matrices of the states that
+        received rows, and those of all states together.
+        '''
+
+        states = set(states) | {None}
+        with self.lock:
+            self.partitions = partitions
+            for key in [key for key in self.matrices if key[0] in states]:
+                del self.matrices[key]
+
+    def rolling(self, state, window):
+
+        '''
+        The dates of a state and, for each, the (k, k) matrix of the `window`
+        days ending there. The cumulative sums are built for the call only.
+        '''
+
+        frame = self.rows(state)
+        if state is None:
+            frame = frame.sort_values('date', kind='mergesort')
+
+        dates = frame['date'].to_numpy(dtype='datetime64[ns]')
+        sums = cumulative_sums(frame[self.columns].to_numpy(dtype=float))
+        ends = np.arange(len(dates))
+        starts = window_starts(dates, ends, window)
+
+        return dates, pearson(*[total[ends + 1] - total[starts] for total in sums])
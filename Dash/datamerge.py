@@ -0,0 +1,216 @@
+'''
+
+Merge stage for the dashboard data.
+
+The merged dataset used to be built by the R notebooks in Data Merge
+(datamerge.Rmd and Twitter Merge/twittermerge.Rmd): left joins on the date,
+%d/%m/%Y strings parsed and states upper-cased after the join, then a CSV
+handed to the Python side. This stage reads the sources directly:
+
+    cases           state, date, daily_newcase, total_doses, daily_doses
+                    (e.g. Data Merge/state_doses_cases_sentiment.csv)
+    transcripts     transcript scores per state and date: segment scores with
+                    positive, neutral and negative columns (Data Merge/
+                    transcript_daily_results.csv, averaged per day as the R
+                    summary did) or the daily transcript_sentiment_* columns
+                    of transcripts.py
+    tweets          scored tweets (twitter_sentiment_* or positive, neutral and
+                    negative columns), averaged and counted per day, or daily
+                    avr_*_tweet_sentiment and tweet_total columns
+
+States are upper-cased and dates parsed (dd/mm/yyyy or yyyy-mm-dd) before
+joining. Each source is reduced to one row per (state, date), sorted, and
+aligned to the sorted keys of the cases in one reindex per source, which is
+the left join of the notebooks. Press conferences are sparse: with
+--press-tolerance N a day without one takes the scores of the latest press
+conference of its state up to N days earlier (an as-of join), 0 keeps the
+exact join. The as-of join adds a press_date column, the day the scores of
+each row come from, so the store only counts the press conferences
+themselves.
+
+The result, in the merged_aug_updated.csv layout, is saved as
+data/store/merged.feather, which store.py reads in place of the CSV from then
+on, and the data store is built from it.
+
+Usage:
+    python datamerge.py --cases "../Data Merge/state_doses_cases_sentiment.csv" \\
+        --transcripts "../Data Merge/transcript_daily_results.csv" --tweets tweetresult.csv
+    python datamerge.py ... --states NSW VIC QLD --start 2021-08-01 --end 2021-09-05
+
+'''
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import sentiment
+import store
+
+#region Layout
+
+KEYS = ['state', 'date']
+
+CASES_COLUMNS = ['daily_newcase', 'total_doses', 'daily_doses']
+TRANSCRIPT_COLUMNS = sentiment.SOURCES['transcript']
+TWITTER_COLUMNS = sentiment.SOURCES['twitter']
+
+# the column order of merged_aug_updated.csv
+MERGED_COLUMNS = KEYS + ['daily_newcase'] + TRANSCRIPT_COLUMNS + TWITTER_COLUMNS + ['tweet_total', 'total_doses', 'daily_doses']
+
+LABELS = ['positive', 'neutral', 'negative']
+
+#endregion
+
+#region Sources
+
+def read_source(path):
+
+    frame = pd.read_csv(path)
+
+    # column names as in the notebooks, without the row names R writes
+    frame.columns = frame.columns.str.strip().str.lower()
+    frame = frame.drop(columns=[column for column in frame.columns if column == '' or column.startswith('unnamed')])
+
+    return frame.assign(
+        state=frame['state'].astype(str).str.strip().str.upper(),
+        date=store.parse_dates(frame['date'].astype(str).str.strip())
+    )
+
+def by_day(frame, columns):
+
+    # the mean of the columns per (state, date), sorted by the keys
+    return frame.groupby(KEYS, sort=True)[columns].mean()
+
+def cases_daily(frame):
+
+    # a repeated day keeps its last row
+    return frame.groupby(KEYS, sort=True)[CASES_COLUMNS].last()
+
+def transcripts_daily(frame):
+
+    if all(column in frame for column in TRANSCRIPT_COLUMNS):
+        return by_day(frame, TRANSCRIPT_COLUMNS)
+
+    return by_day(frame, LABELS).set_axis(TRANSCRIPT_COLUMNS, axis=1)
+
+def tweets_daily(frame):
+
+    if all(column in frame for column in TWITTER_COLUMNS + ['tweet_total']):
+        grouped = frame.groupby(KEYS, sort=True)
+        # a day without tweets stays empty rather than 0
+        return grouped[TWITTER_COLUMNS].mean().assign(
+            tweet_total=grouped['tweet_total'].sum(min_count=1)
+        )
+
+    scores = ['twitter_sentiment_' + label for label in LABELS]
+    if not all(column in frame for column in scores):
+        scores = LABELS
+
+    grouped = frame.groupby(KEYS, sort=True)
+
+    return grouped[scores].mean().set_axis(TWITTER_COLUMNS, axis=1).assign(
+        tweet_total=grouped.size().astype(float)
+    )
+
+#endregion
+
+#region Merge
+
+def as_of(keys, daily, tolerance):
+
+    '''
+    The rows of daily for the keys, each from the latest date of its state at
+    most `tolerance` days before (or on) the key date, which is kept as
+    press_date.
+    '''
+
+    left = keys.to_frame(index=False).sort_values('date', kind='mergesort')
+    right = daily.reset_index().sort_values('date', kind='mergesort')
+    right['press_date'] = right['date']
+
+    joined = pd.merge_asof(
+        left,
+        right,
+        on='date',
+        by='state',
+        tolerance=pd.Timedelta(days=tolerance),
+        direction='backward'
+    )
+
+    return joined.set_index(KEYS).reindex(keys)
+
+def merge(cases, transcripts=None, tweets=None, press_tolerance=0):
+
+    '''
+    The daily sources joined on the sorted (state, date) keys of the cases,
+    in the merged_aug_updated.csv layout (and press_date, for an as-of join
+    of the transcripts).
+    '''
+
+    keys = cases.index
+    parts = [cases]
+
+    if transcripts is not None:
+        parts.append(as_of(keys, transcripts, press_tolerance) if press_tolerance else transcripts.reindex(keys))
+
+    if tweets is not None:
+        parts.append(tweets.reindex(keys))
+
+    merged = pd.concat(parts, axis=1).reset_index()
+
+    # a missing source leaves its columns empty, as the left joins did
+    for column in MERGED_COLUMNS:
+        if column not in merged:
+            merged[column] = np.nan
+
+    return merged[MERGED_COLUMNS + (['press_date'] if 'press_date' in merged else [])]
+
+def select(merged, states=None, start=None, end=None):
+
+    keep = pd.Series(True, index=merged.index)
+    if states:
+        keep &= merged['state'].isin([state.upper() for state in states])
+    if start:
+        keep &= merged['date'] >= pd.Timestamp(start)
+    if end:
+        keep &= merged['date'] <= pd.Timestamp(end)
+
+    return merged[keep].reset_index(drop=True)
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Merge the dashboard sources into the data store.')
+    parser.add_argument('--cases', required=True, help='csv of daily cases and doses per state')
+    parser.add_argument('--transcripts', help='csv of transcript scores per state and date')
+    parser.add_argument('--tweets', help='csv of scored tweets, or of daily tweet averages')
+    parser.add_argument('--press-tolerance', type=int, default=0, help='days a press conference carries forward (default 0, exact days)')
+    parser.add_argument('--states', nargs='+', help='states to keep')
+    parser.add_argument('--start', help='first date to keep (yyyy-mm-dd)')
+    parser.add_argument('--end', help='last date to keep (yyyy-mm-dd)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    merged = select(
+        merge(
+            cases_daily(read_source(args.cases)),
+            transcripts_daily(read_source(args.transcripts)) if args.transcripts else None,
+            tweets_daily(read_source(args.tweets)) if args.tweets else None,
+            args.press_tolerance
+        ),
+        args.states,
+        args.start,
+        args.end
+    )
+    merged_s = time.perf_counter() - start
+
+    # the merged rows first, so the store is the newer of the two and is not rebuilt from them
+    store.write_merged(merged)
+    store.build()
+
+    print('Merged {0} row(s) of {1} state(s) in {2:.3f}s and wrote the data store to {3}'.format(
+        len(merged), merged['state'].nunique(), merged_s, store.STORE_DIR
+    ))
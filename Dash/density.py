@@ -0,0 +1,262 @@
+'''
+
+Server side density grids for the metric vs sentiment contour plots.
+
+`px.density_contour` with marginal histograms ships every row to the browser
+and bins it there. Here the rows of each state are binned once onto a fixed
+grid and smoothed with a gaussian kernel by FFT convolution (a binned KDE), and
+the marginal histograms are sums of the same bins. Grids are cached per
+(metric, sentiment, state), so a figure costs the same however many rows the
+states hold.
+
+Settings (environment):
+    DASH_KDE_GRID   bins per axis (default 40)
+
+'''
+
+import os
+import threading
+
+import numpy as np
+
+import lazy
+
+fftconvolve = lazy.function('scipy.signal', 'fftconvolve')
+
+KDE_GRID = int(os.environ.get('DASH_KDE_GRID', 40))
+
+#region KDE
+
+def extent(values):
+
+    # the value range, padded by 5% so the contours are not cut at the edges
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return 0.0, 1.0
+
+    low, high = float(values.min()), float(values.max())
+    pad = (high - low) * 0.05 or 0.5
+
+    return low - pad, high + pad
+
+def scott_bandwidth(values, bin_width):
+
+    # Scott's rule for two dimensions, at least one bin wide
+    if len(values) < 2:
+        return bin_width
+
+    return max(float(np.std(values, ddof=1)) * len(values) ** (-1.0 / 6.0), bin_width)
+
+def gaussian_kernel(bandwidths, bin_widths):
+
+    # sampled over +-4 bandwidths, normalised to sum to one
+    axes = []
+    for bandwidth, bin_width in zip(bandwidths, bin_widths):
+        half = int(np.ceil(4 * bandwidth / bin_width))
+        offsets = np.arange(-half, half + 1) * bin_width
+        axes.append(np.exp(-0.5 * (offsets / bandwidth) ** 2))
+
+    kernel = np.outer(axes[0], axes[1])
+
+    return kernel / kernel.sum()
+
+def binned_kde(x, y, x_extent, y_extent, bins=KDE_GRID):
+
+    '''
+    Smoothed counts of (x, y) on a bins x bins grid over the extents, with the
+    marginal counts of each axis. Rows with a missing value are dropped.
+    '''
+
+    present = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[present], y[present]
+
+    x_edges = np.linspace(x_extent[0], x_extent[1], bins + 1)
+    y_edges = np.linspace(y_extent[0], y_extent[1], bins + 1)
+    counts, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges])
+
+    bin_widths = (x_edges[1] - x_edges[0], y_edges[1] - y_edges[0])
+    bandwidths = (scott_bandwidth(x, bin_widths[0]), scott_bandwidth(y, bin_widths[1]))
+
+    # counts are indexed [x, y]; the contour trace wants z[y][x]. Rounded, as
+    # the figure json writes every digit and the contours need only a few
+    density = fftconvolve(counts, gaussian_kernel(bandwidths, bin_widths), mode='same')
+    density = np.round(np.clip(density, 0.0, None), 3)
+
+    return {
+        'x': (x_edges[:-1] + x_edges[1:]) / 2,
+        'y': (y_edges[:-1] + y_edges[1:]) / 2,
+        'z': density.T,
+        'x_counts': counts.sum(axis=1),
+        'y_counts': counts.sum(axis=0),
+        'rows': int(present.sum())
+    }
+
+#endregion
+
+#region Cache
+
+class DensityGrids:
+
+    '''
+    Binned KDE grids per (x column, y column, state), over an extent shared by
+    all states so their contours and marginals line up.
+    '''
+
+    def __init__(self, partitions, bins=KDE_GRID):
+
+        self.partitions = partitions
+        self.bins = bins
+        self.grids = {}
+        self.extents = {}
+        self.lock = threading.Lock()
+
+    def extent(self, column):
+
+        if column not in self.extents:
+            self.extents[column] = extent(self.partitions.data[column].to_numpy(dtype=float))
+
+        return self.extents[column]
+
+    def get(self, x, y, state):
+
+        key = (x, y, state)
+        with self.lock:
+            if key in self.grids:
+                return self.grids[key]
+
+        frame = self.partitions.get(state)
+        grid = binned_kde(
+            frame[x].to_numpy(dtype=float),
+            frame[y].to_numpy(dtype=float),
+            self.extent(x),
+            self.extent(y),
+            self.bins
+        )
+
+        with self.lock:
+            self.grids[key] = grid
+
+        return grid
+
+    def refresh(self, partitions, rows):
+
+        '''
+        Switches to new partitions and drops the grids of the states that
+        received rows. An extent is kept while the new rows fall inside it;
+        otherwise it is computed again along with every grid binned over it.
+        '''
+
+        states = set(rows['state'].astype(str))
+        with self.lock:
+            self.partitions = partitions
+
+            stale = set()
+            for column, (low, high) in list(self.extents.items()):
+                values = rows[column].to_numpy(dtype=float)
+                values = values[~np.isnan(values)]
+                if len(values) > 0 and (values.min() < low or values.max() > high):
+                    del self.extents[column]
+                    stale.add(column)
+
+            for key in [key for key in self.grids if key[2] in states or key[0] in stale or key[1] in stale]:
+                del self.grids[key]
+
+    def states(self, x, y):
+
+        return {state: self.get(x, y, state) for state in self.partitions.slices}
+
+#endregion
+
+#region Figure
+
+def contour_figure(grids, x_title, y_title, title, height=800):
+
+    '''
+    Contour lines per state with marginal histograms on top and to the right,
+    laid out like px.density_contour with marginal_x/marginal_y='histogram'.
+    '''
+
+    import plotly.express as px
+    from plotly.subplots import make_subplots
+    import plotly.graph_objects as go
+
+    fig = make_subplots(
+        rows=2,
+        cols=2,
+        shared_xaxes=True,
+        shared_yaxes=True,
+        column_widths=[0.8, 0.2],
+        row_heights=[0.2, 0.8],
+        specs=[[{}, None], [{}, {}]],
+        horizontal_spacing=0.01,
+        vertical_spacing=0.01
+    )
+
+    colours = px.colors.qualitative.Plotly
+    for i, (state, grid) in enumerate(grids.items()):
+        colour = colours[i % len(colours)]
+        if grid['rows'] == 0:
+            continue
+
+        fig.add_trace(
+            go.Contour(
+                x=grid['x'],
+                y=grid['y'],
+                z=grid['z'],
+                name=state,
+                legendgroup=state,
+                showlegend=True,
+                showscale=False,
+                contours_coloring='lines',
+                colorscale=[[0, colour], [1, colour]],
+                line_width=1.5,
+                hovertemplate='state=' + state + '<br>x=%{x}<br>y=%{y}<br>density=%{z:.3g}<extra></extra>'
+            ),
+            row=2, col=1
+        ).add_trace(
+            go.Bar(
+                x=grid['x'],
+                y=grid['x_counts'],
+                name=state,
+                legendgroup=state,
+                showlegend=False,
+                marker_color=colour,
+                opacity=0.5
+            ),
+            row=1, col=1
+        ).add_trace(
+            go.Bar(
+                x=grid['y_counts'],
+                y=grid['y'],
+                orientation='h',
+                name=state,
+                legendgroup=state,
+                showlegend=False,
+                marker_color=colour,
+                opacity=0.5
+            ),
+            row=2, col=2
+        )
+
+    return fig.update_layout(
+        title=title,
+        height=height,
+        barmode='overlay',
+        bargap=0,
+        legend_title_text='state',
+        template='simple_white'
+    ).update_xaxes(
+        title_text=x_title,
+        row=2, col=1
+    ).update_yaxes(
+        title_text=y_title,
+        row=2, col=1
+    ).update_xaxes(
+        showticklabels=False,
+        row=2, col=2
+    ).update_yaxes(
+        showticklabels=False,
+        row=1, col=1
+    )
+
+#endregion
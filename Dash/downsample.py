@@ -0,0 +1,149 @@
+'''
+
+Server side downsampling for the over-time plots.
+
+Figures are reduced to a point budget with largest triangle three buckets
+(LTTB), which keeps the peaks and troughs a plain stride would drop. When a
+graph is zoomed, its callback receives the visible x window from relayoutData
+and only the rows in that window are sent, at full resolution when they fit in
+the budget.
+
+Settings (environment):
+    DASH_POINT_BUDGET   points per figure (default 2000)
+
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+
+POINT_BUDGET = int(os.environ.get('DASH_POINT_BUDGET', 2000))
+
+# floor for each trace when a figure's budget is shared by many traces
+MIN_TRACE_POINTS = 100
+
+#region LTTB
+
+def lttb(x, y, threshold):
+
+    '''
+    Positions of the `threshold` points of (x, y) picked by LTTB. The first and
+    last points are always kept; missing y values are only picked when a whole
+    bucket is missing.
+    '''
+
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # threshold - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    with np.errstate(invalid='ignore'):
+        for i in range(threshold - 2):
+            start, end = edges[i], edges[i + 1]
+
+            # average of the next bucket (the last point for the last bucket)
+            if i + 2 < len(edges):
+                next_x = x[end:edges[i + 2]].mean()
+                next_y = y[end:edges[i + 2]]
+                next_y = next_y[~np.isnan(next_y)].mean() if (~np.isnan(next_y)).any() else np.nan
+            else:
+                next_x, next_y = x[-1], y[-1]
+
+            area = np.abs(
+                (x[a] - next_x) * (y[start:end] - y[a])
+                - (x[a] - x[start:end]) * (next_y - y[a])
+            )
+            a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+            selected[i + 1] = a
+
+    return selected
+
+#endregion
+
+#region Frames
+
+def window_slice(x, window):
+
+    # the rows inside the window plus one either side, so the lines reach the edges
+    if window is None:
+        return slice(0, len(x))
+
+    start = max(int(x.searchsorted(window[0], side='left')) - 1, 0)
+    end = min(int(x.searchsorted(window[1], side='right')) + 1, len(x))
+
+    return slice(start, end)
+
+def downsample(frame, x, y, window=None, budget=POINT_BUDGET):
+
+    '''
+    The rows of a frame sorted by `x` to plot column(s) `y` against it, cut to
+    the window and reduced to about `budget` points. With several columns the
+    budget is shared and the points picked for each are kept.
+    '''
+
+    columns = [y] if isinstance(y, str) else list(y)
+
+    frame = frame.iloc[window_slice(pd.Index(frame[x]), window)]
+    if len(frame) <= budget:
+        return frame
+
+    x_values = frame[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype('datetime64[ns]').astype(np.int64)
+
+    keep = np.unique(np.concatenate([
+        lttb(x_values, frame[column].to_numpy(dtype=float), max(budget // len(columns), 3))
+        for column in columns
+    ]))
+
+    return frame.iloc[keep]
+
+def downsample_groups(frames, x, y, window=None, budget=POINT_BUDGET):
+
+    # one trace per frame, e.g. the per-state blocks of a px.line with color
+    share = max(budget // max(len(frames), 1), MIN_TRACE_POINTS)
+
+    return pd.concat([
+        downsample(frame, x, y, window, share)
+        for frame in frames
+    ])
+
+#endregion
+
+#region Zoom
+
+def x_window(relayout_data):
+
+    '''
+    Reads a graph's relayoutData. Returns (changed, window): window is a
+    (start, end) pair of timestamps, or None when the x axis was reset;
+    changed is False when the event did not touch the x axis.
+    '''
+
+    if not relayout_data:
+        return False, None
+
+    for key, value in relayout_data.items():
+        if not key.startswith('xaxis'):
+            continue
+        if key.endswith('.autorange'):
+            return True, None
+        if key.endswith('.range'):
+            return True, (pd.Timestamp(value[0]), pd.Timestamp(value[1]))
+        if key.endswith('.range[0]'):
+            return True, (pd.Timestamp(value), pd.Timestamp(relayout_data[key[:-3] + '[1]']))
+
+    return False, None
+
+#endregion
@@ -0,0 +1,272 @@
+'''
+
+Prebuilt static figures for the dashboard pages.
+
+The choropleths and sentiment bubble charts do not depend on any dropdown, so
+they are rendered once to figure json in ./data/figures.
+Each figure records a fingerprint of its inputs and builder code in the
+manifest, and a rebuild only re-renders the figures whose fingerprint changed.
+
+Usage:
+    python figures.py               rebuild stale figures
+    python figures.py --force       rebuild every figure
+
+'''
+
+import argparse
+import json
+import os
+import threading
+
+from fingerprint import fingerprint
+import geometry
+import store
+import webgl
+
+#region Paths
+
+FIGURE_DIR = os.path.join(store.DATA_DIR, 'figures')
+MANIFEST = os.path.join(FIGURE_DIR, 'manifest.json')
+
+#endregion
+
+#region Builders
+
+def build_choropleth(geo_data, geojson_states, color, color_continuous_scale, title):
+
+    import plotly.express as px
+
+    return px.choropleth(
+        geo_data,
+        geojson=geojson_states,
+        featureidkey = "properties.STE_NAME21",
+        locations='GeoMap',
+        color=color,
+        range_color=(0,max(geo_data[color])),
+        color_continuous_scale=color_continuous_scale,
+        basemap_visible=False,
+        fitbounds='locations',
+        title=title
+    ).update_traces(
+        marker_line_color='white'
+    )
+
+def build_heatmap(data_corr):
+
+    import plotly.express as px
+
+    return px.imshow(
+        data_corr,
+        color_continuous_scale='RdBu_r',
+        height=800
+    )
+
+def build_bubble_chart(data, x, y, range_x, range_y, title, **kwargs):
+
+    import plotly.express as px
+
+    return px.scatter(
+        data,
+        x = x,
+        y = y,
+        color = "state",
+        size = "daily_newcase",
+        size_max = 50,
+        range_x=range_x,
+        range_y=range_y,
+        title = title,
+        render_mode = webgl.render_mode(len(data)),
+        **kwargs
+    ).update_layout(
+        template = "simple_white"
+    )
+
+def bubble_chart(x, y, range_x, range_y, title, **kwargs):
+
+    return {
+        'inputs': lambda frames: [frames['data'][['state', x, y, 'daily_newcase']]],
+        'build': lambda data: build_bubble_chart(data, x, y, range_x, range_y, title, **kwargs),
+        'code': [build_bubble_chart, webgl.render_mode],
+        'args': [x, y, range_x, range_y, title, kwargs, webgl.WEBGL_THRESHOLD]
+    }
+
+# Each entry names the frames a figure reads and how to render it from them
+FIGURES = {
+    'home_press_choropleth': {
+        'inputs': lambda frames: [frames['geo_data'], frames['geojson']],
+        'build': lambda geo_data, geojson_states: build_choropleth(geo_data, geojson_states, 'count_press', 'Blues', 'Number of Press Conferences'),
+        'code': build_choropleth,
+        'args': ['count_press', 'Blues', 'Number of Press Conferences']
+    },
+    'home_tweets_choropleth': {
+        'inputs': lambda frames: [frames['geo_data'], frames['geojson']],
+        'build': lambda geo_data, geojson_states: build_choropleth(geo_data, geojson_states, 'count_tweets', 'Purples', 'Number of Tweets'),
+        'code': build_choropleth,
+        'args': ['count_tweets', 'Purples', 'Number of Tweets']
+    },
+    'transcript_bubble_positive_negative': bubble_chart(
+        "transcript_sentiment_positive", 'transcript_sentiment_negative', [0.1, 1.0], [0.1, 1.0],
+        "Transcript Sentiment by state", orientation='h'
+    ),
+    'transcript_bubble_neutral_negative': bubble_chart(
+        "transcript_sentiment_neutral", 'transcript_sentiment_negative', [0.0, 0.3], [0.0, 1.0],
+        "Transcript Sentiment by state (neutral vs negative)"
+    ),
+    'transcript_bubble_neutral_positive': bubble_chart(
+        "transcript_sentiment_neutral", 'transcript_sentiment_positive', [0.0, 0.3], [0.0, 1.0],
+        "Transcript Sentiment by state (neutral vs positive)"
+    ),
+    'twitter_bubble_positive_negative': bubble_chart(
+        "avr_positive_tweet_sentiment", 'avr_negative_tweet_sentiment', [0.1, 1.0], [0.1, 1.0],
+        "Twitter Sentiment by state", orientation='h'
+    ),
+    'twitter_bubble_neutral_negative': bubble_chart(
+        "avr_neutral_tweet_sentiment", 'avr_negative_tweet_sentiment', [0.0, 0.3], [0.0, 1.0],
+        "Twitter Sentiment by state (neutral vs negative)"
+    ),
+    'twitter_bubble_neutral_positive': bubble_chart(
+        "avr_neutral_tweet_sentiment", 'avr_positive_tweet_sentiment', [0.0, 0.3], [0.0, 1.0],
+        "Twitter Sentiment by state (neutral vs positive)"
+    )
+}
+
+#endregion
+
+#region Build & Load
+
+def figure_path(name):
+
+    return os.path.join(FIGURE_DIR, '{0}.json'.format(name))
+
+def figure_fingerprint(name, frames):
+
+    spec = FIGURES[name]
+
+    return fingerprint(*spec['inputs'](frames), spec['code'], spec['args'])
+
+def render(name, frames):
+
+    spec = FIGURES[name]
+
+    return spec['build'](*spec['inputs'](frames))
+
+def read_manifest():
+
+    if not os.path.exists(MANIFEST):
+        return {}
+
+    with open(MANIFEST) as file:
+        return json.load(file)
+
+def build(frames, force=False):
+
+    os.makedirs(FIGURE_DIR, exist_ok=True)
+
+    manifest = read_manifest()
+    rebuilt, skipped = [], []
+
+    for name in FIGURES:
+        key = figure_fingerprint(name, frames)
+        if not force and manifest.get(name) == key and os.path.exists(figure_path(name)):
+            skipped.append(name)
+            continue
+
+        with open(figure_path(name), 'w') as file:
+            file.write(render(name, frames).to_json())
+        manifest[name] = key
+        rebuilt.append(name)
+
+    with open(MANIFEST, 'w') as file:
+        json.dump(manifest, file, indent=4, sort_keys=True)
+
+    return rebuilt, skipped
+
+def load_figure(name, frames, manifest=None):
+
+    # figures come back as plain dicts, which dcc.Graph accepts as is
+    key = figure_fingerprint(name, frames)
+    manifest = read_manifest() if manifest is None else manifest
+
+    if manifest.get(name) == key and os.path.exists(figure_path(name)):
+        with open(figure_path(name)) as file:
+            return json.load(file), key
+
+    print('Figure {0} missing or out of date, rendering it (run `python figures.py` to rebuild)'.format(name))
+
+    return render(name, frames), key
+
+def load(frames):
+
+    manifest = read_manifest()
+
+    return {name: load_figure(name, frames, manifest)[0] for name in FIGURES}
+
+
+class StaticFigures:
+
+    '''
+    The static figures, each loaded (or rendered) on first use and kept with
+    the fingerprint of its inputs.
+    '''
+
+    def __init__(self, frames):
+
+        self.frames = frames
+        self.figures = {}
+        self.fingerprints = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+
+        with self.lock:
+            if name in self.figures:
+                return self.figures[name]
+
+        figure, key = load_figure(name, self.frames)
+
+        with self.lock:
+            self.fingerprints.setdefault(name, key)
+            return self.figures.setdefault(name, figure)
+
+    def refresh(self, frames):
+
+        '''
+        Switches to new frames and drops the loaded figures whose inputs
+        changed. Returns their names.
+        '''
+
+        with self.lock:
+            self.frames = frames
+            changed = [
+                name for name, key in self.fingerprints.items()
+                if figure_fingerprint(name, frames) != key
+            ]
+            for name in changed:
+                del self.figures[name]
+                del self.fingerprints[name]
+
+        return changed
+
+def load_frames():
+
+    data, geo_data, data_corr = store.load()
+
+    return {
+        'data': data,
+        'geo_data': geo_data,
+        'data_corr': data_corr,
+        'geojson': geometry.url()
+    }
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Build the static dashboard figures.')
+    parser.add_argument('--force', action='store_true', help='rebuild every figure')
+    args = parser.parse_args()
+
+    rebuilt, skipped = build(load_frames(), force=args.force)
+
+    print('Rebuilt {0} figure(s): {1}'.format(len(rebuilt), ', '.join(rebuilt) or '-'))
+    print('Skipped {0} up to date figure(s): {1}'.format(len(skipped), ', '.join(skipped) or '-'))
@@ -0,0 +1,54 @@
+'''
+
+Content fingerprints for build outputs.
+
+A fingerprint is a short hash over the inputs of a build step (frames, plain
+json-able values, files) and the source of the code that produces it. Build
+steps compare it with the fingerprint recorded next to their output to decide
+whether the output is stale.
+
+'''
+
+import hashlib
+import inspect
+import json
+
+import pandas as pd
+
+
+def update_with(hasher, part):
+
+    if isinstance(part, (pd.DataFrame, pd.Series)):
+        if isinstance(part, pd.DataFrame):
+            hasher.update(json.dumps([str(c) for c in part.columns]).encode())
+            hasher.update(json.dumps([str(t) for t in part.dtypes]).encode())
+        hasher.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+    elif isinstance(part, (list, tuple)):
+        for item in part:
+            update_with(hasher, item)
+            hasher.update(b'\x01')
+    elif callable(part):
+        hasher.update(inspect.getsource(part).encode())
+    elif isinstance(part, bytes):
+        hasher.update(part)
+    else:
+        hasher.update(json.dumps(part, sort_keys=True, default=str).encode())
+
+def fingerprint(*parts):
+
+    hasher = hashlib.sha1()
+    for part in parts:
+        update_with(hasher, part)
+        hasher.update(b'\x00')
+
+    return hasher.hexdigest()
+
+def file_fingerprint(path, block_size=1 << 20):
+
+    # streamed so large source files are never held in memory
+    hasher = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            hasher.update(block)
+
+    return hasher.hexdigest()
@@ -0,0 +1,242 @@
+'''
+
+Prebuilt map geometry for the choropleths.
+
+The geojson used to be loaded and rewound on every boot and embedded in each
+choropleth figure. This build step writes it once per simplification level,
+already rewound (clockwise outer rings, as plotly expects), simplified with
+Douglas-Peucker, quantized to a fixed number of decimals and stripped down to
+the property the maps join on, into ./assets/geo. The figures reference the
+file by url with a content hash, so the browser fetches it once and caches it.
+
+The files are only built by this script (the Docker image runs it at build
+time), never by the app at boot, so workers starting together do not write
+them at once; each file is written aside and renamed into place.
+
+Usage:
+    python geometry.py              rebuild stale levels
+    python geometry.py --force      rebuild every level
+
+Settings (environment):
+    DASH_GEOMETRY_LEVEL     level the choropleths use: full, medium or low (default medium)
+
+'''
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from fingerprint import fingerprint, file_fingerprint
+import store
+
+#region Paths & Levels
+
+GEOMETRY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'geo')
+# path of the files under the app's assets url
+GEOMETRY_PATH = 'geo/'
+MANIFEST = os.path.join(GEOMETRY_DIR, 'manifest.json')
+
+# geometry name: (source geojson, property the figures join on)
+SOURCES = {
+    'states': (store.STATES_GEOJSON, 'STE_NAME21')
+}
+
+# Douglas-Peucker tolerance and coordinate decimals (degrees) per level
+LEVELS = {
+    'full': {'tolerance': 0.0, 'decimals': 4},
+    'medium': {'tolerance': 0.05, 'decimals': 3},
+    'low': {'tolerance': 0.25, 'decimals': 2}
+}
+
+GEOMETRY_LEVEL = os.environ.get('DASH_GEOMETRY_LEVEL', 'medium')
+
+#endregion
+
+#region Simplify
+
+def douglas_peucker(points, tolerance):
+
+    # mask of the points kept, the first and last always are
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = start + 1 + farthest
+            keep[middle] = True
+            stack.extend([(start, middle), (middle, end)])
+
+    return keep
+
+def simplify_ring(ring, tolerance, decimals):
+
+    points = np.asarray(ring, dtype=float)
+    if tolerance > 0 and len(points) > 4:
+        simplified = points[douglas_peucker(points, tolerance)]
+        # a closed ring needs four points
+        if len(simplified) >= 4:
+            points = simplified
+
+    points = np.round(points, decimals)
+
+    # rounding can make neighbours equal
+    distinct = np.concatenate([[True], np.any(np.diff(points, axis=0) != 0, axis=1)])
+    if distinct.sum() >= 4:
+        points = points[distinct]
+
+    return points.tolist()
+
+def simplify_geometry(geometry, tolerance, decimals):
+
+    if geometry['type'] == 'Polygon':
+        coordinates = [simplify_ring(ring, tolerance, decimals) for ring in geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        coordinates = [
+            [simplify_ring(ring, tolerance, decimals) for ring in polygon]
+            for polygon in geometry['coordinates']
+        ]
+    else:
+        raise ValueError('Unsupported geometry type {0}'.format(geometry['type']))
+
+    return {'type': geometry['type'], 'coordinates': coordinates}
+
+def load_source(path):
+
+    # rewound once here instead of at every boot
+    import geojson
+    from geojson_rewind import rewind
+
+    with open(path) as file:
+        return rewind(geojson.load(file), rfc7946=False)
+
+def simplify(collection, key, level):
+
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'properties': {key: feature['properties'][key]},
+                'geometry': simplify_geometry(feature['geometry'], **LEVELS[level])
+            }
+            for feature in collection['features']
+        ]
+    }
+
+#endregion
+
+#region Build & Load
+
+def file_name(name, level):
+
+    return '{0}_{1}.geojson'.format(name, level)
+
+def geometry_fingerprint(name, level):
+
+    path, key = SOURCES[name]
+
+    return fingerprint(
+        file_fingerprint(path),
+        key,
+        LEVELS[level],
+        [load_source, simplify, simplify_geometry, simplify_ring, douglas_peucker]
+    )
+
+def read_manifest():
+
+    if not os.path.exists(MANIFEST):
+        return {}
+
+    with open(MANIFEST) as file:
+        return json.load(file)
+
+def write_json(path, value, **options):
+
+    # written aside and renamed, so a reader never sees a partly written file
+    staging = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(staging, 'w') as file:
+        json.dump(value, file, **options)
+    os.replace(staging, path)
+
+def build(force=False):
+
+    os.makedirs(GEOMETRY_DIR, exist_ok=True)
+
+    manifest = read_manifest()
+    rebuilt, skipped = [], []
+
+    for name, (path, key) in SOURCES.items():
+        collection = None
+        for level in LEVELS:
+            entry = file_name(name, level)
+            expected = geometry_fingerprint(name, level)
+            if not force and manifest.get(entry) == expected and os.path.exists(os.path.join(GEOMETRY_DIR, entry)):
+                skipped.append(entry)
+                continue
+
+            if collection is None:
+                collection = load_source(path)
+            write_json(os.path.join(GEOMETRY_DIR, entry), simplify(collection, key, level), separators=(',', ':'))
+
+            manifest[entry] = expected
+            rebuilt.append(entry)
+
+    write_json(MANIFEST, manifest, indent=4)
+
+    return rebuilt, skipped
+
+def asset_url(path):
+
+    # what app.get_asset_url gives for Dash's default assets path, for the
+    # builds that run without the app (figures.py)
+    prefix = os.environ.get('DASH_REQUESTS_PATHNAME_PREFIX') or os.environ.get('DASH_URL_BASE_PATHNAME') or '/'
+
+    return '{0}assets/{1}'.format(prefix, path)
+
+def url(name='states', level=GEOMETRY_LEVEL, asset_url=asset_url):
+
+    '''
+    Asset url of a geometry, with its fingerprint as the ?m= version Dash uses
+    for assets, so responses.py lets the browser cache it for good. The app
+    passes its get_asset_url, so the url follows requests_pathname_prefix.
+    An out of date file is still served, with the version it was built as.
+    '''
+
+    entry = file_name(name, level)
+    if not os.path.exists(os.path.join(GEOMETRY_DIR, entry)):
+        raise FileNotFoundError('Geometry {0} missing, run `python geometry.py` to build it'.format(entry))
+
+    built = read_manifest().get(entry, '')
+    if built != geometry_fingerprint(name, level):
+        print('Geometry {0} out of date (run `python geometry.py` to rebuild)'.format(entry))
+
+    return '{0}?m={1}'.format(asset_url(GEOMETRY_PATH + entry), built[:12])
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Build the simplified map geometry.')
+    parser.add_argument('--force', action='store_true', help='rebuild every level')
+    args = parser.parse_args()
+
+    rebuilt, skipped = build(force=args.force)
+
+    print('Rebuilt {0} geometry file(s): {1}'.format(len(rebuilt), ', '.join(rebuilt) or '-'))
+    print('Skipped {0} up to date file(s): {1}'.format(len(skipped), ', '.join(skipped) or '-'))
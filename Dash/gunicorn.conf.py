@@ -0,0 +1,51 @@
+'''
+
+Production serving config for the dashboard.
+
+    gunicorn --config gunicorn.conf.py app:server
+
+The app module (data, figures and warmed caches) is imported once in the master
+process and the workers are forked from it, so they share those pages
+copy-on-write instead of each loading their own copy.
+
+With DASH_SHARED_DATA=1 the master only publishes the data columns (see
+store.py) and every worker imports the app itself, attached read-only to the
+same mapped files. Workers can then be restarted or recycled independently
+without each holding a private copy of the data.
+
+Settings (environment):
+    DASH_BIND           address to listen on (default 0.0.0.0:80)
+    DASH_WORKERS        worker processes (default 2 x CPUs + 1)
+    DASH_THREADS        threads per worker (default 4)
+    DASH_TIMEOUT        seconds before a stuck worker is restarted (default 60)
+    DASH_SHARED_DATA    set to 1 to share the data columns through mapped files
+
+'''
+
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('DASH_BIND', '0.0.0.0:80')
+workers = int(os.environ.get('DASH_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('DASH_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('DASH_TIMEOUT', 60))
+
+SHARED_DATA = os.environ.get('DASH_SHARED_DATA', '0') == '1'
+
+# load the app (and its data) before forking the workers
+preload_app = not SHARED_DATA
+
+def on_starting(server):
+
+    # one loader publishes the columns, the workers attach to them
+    import store
+    if SHARED_DATA and store.store_is_current():
+        store.publish_shared()
+
+def pre_fork(server, worker):
+
+    # move everything loaded so far out of the collector's generations, so
+    # garbage collection in the workers does not touch (and copy) shared pages
+    gc.freeze()
@@ -0,0 +1,489 @@
+'''
+
+Streaming tweet ingestion into the dashboard store.
+
+The avr_*_tweet_sentiment and tweet_total columns used to come from the
+Twitter Merge R script, run in batch over the scored tweets. This stage reads
+scored tweets from a JSONL file as they arrive instead (one object per newline
+terminated line, `--follow` keeps reading as the file grows) and assigns each
+one to a (state, date) bucket. A bucket holds a count and three sums, so memory
+stays bounded by the number of open buckets rather than the number of tweets.
+
+On every flush the buckets are added to the tweet table
+(./data/store/tweets.feather, one row per state and day) together with the
+offset of the last line read, written atomically, so a restart resumes after
+the flushed lines without counting them twice. The table is then applied to
+the store: for every (state, date) row the table covers, tweet_total and the
+averages are replaced with the streamed values, and the twitter sentiment
+features, tweet counts of geo_data and correlations are updated to match, from
+the changed rows alone. `python store.py` applies the table to the merged rows
+before preparing the store from them.
+Days the store has no row for yet stay in the table and are applied once
+their row is appended.
+
+A tweet is a JSON object with:
+
+    state       state code, state name or capital city (or `city` / `location`)
+    date        dd/mm/yyyy or yyyy-mm-dd, or else `created_at` (ISO 8601 or
+                the Twitter API format), taken as a date in the state's
+                standard time
+    positive, neutral, negative
+                the scores (also read as twitter_sentiment_<label>, the
+                column names of the scored tweet files)
+
+Usage:
+    python ingest.py tweets.jsonl
+    python ingest.py tweets.jsonl --follow --flush-interval 10
+
+'''
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import aggregates
+import sentiment
+import store
+
+#region Settings
+
+TWEETS_FILE = os.path.join(store.STORE_DIR, 'tweets.feather')
+
+LABELS = ['positive', 'neutral', 'negative']
+
+# standard time UTC offsets in hours, daylight saving is not applied
+STATE_UTC_OFFSETS = {
+    'NSW': 10, 'VIC': 10, 'QLD': 10, 'ACT': 10, 'TAS': 10,
+    'SA': 9.5, 'NT': 9.5, 'WA': 8
+}
+
+FLUSH_INTERVAL = 10.0
+MAX_BUCKETS = 4096
+# batches of lines read ahead of the aggregation, and the bytes per batch
+QUEUE_SIZE = 64
+READ_SIZE = 1 << 16
+
+#endregion
+
+#region Parse
+
+def state_names():
+
+    # state code, state name and capital city, lower case, to the state code
+    cities = pd.read_csv(store.CITIES_CSV, encoding='utf-8-sig')
+    names = {}
+    for column in ['State', 'GeoMap', 'Name']:
+        names.update(zip(cities[column].str.lower(), cities['State']))
+
+    return names
+
+def parse_day(text):
+
+    for form in ['%Y-%m-%d', '%d/%m/%Y']:
+        try:
+            return datetime.datetime.strptime(text, form).date()
+        except ValueError:
+            pass
+
+    return None
+
+def parse_timestamp(text):
+
+    for form in ['%a %b %d %H:%M:%S %z %Y', '%Y-%m-%dT%H:%M:%S%z', '%Y-%m-%dT%H:%M:%S.%f%z']:
+        try:
+            return datetime.datetime.strptime(text.replace('Z', '+0000'), form)
+        except ValueError:
+            pass
+
+    return None
+
+def tweet_date(tweet, state):
+
+    if tweet.get('date'):
+        return parse_day(str(tweet['date']))
+
+    if tweet.get('created_at'):
+        moment = parse_timestamp(str(tweet['created_at']))
+        if moment is not None:
+            offset = datetime.timedelta(hours=STATE_UTC_OFFSETS.get(state, 10))
+            return (moment.astimezone(datetime.timezone.utc) + offset).date()
+
+    return None
+
+def tweet_scores(tweet):
+
+    scores = []
+    for label in LABELS:
+        value = tweet.get(label, tweet.get('twitter_sentiment_' + label))
+        if value is None:
+            return None
+        scores.append(float(value))
+
+    return scores
+
+def parse_tweet(line, names):
+
+    '''
+    (state, date, [positive, neutral, negative]) of a JSONL line, or None when
+    it has no recognisable state, date or scores.
+    '''
+
+    try:
+        tweet = json.loads(line)
+        place = tweet.get('state') or tweet.get('city') or tweet.get('location')
+        state = names.get(str(place).strip().lower()) if place else None
+        scores = tweet_scores(tweet)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    if state is None or scores is None:
+        return None
+
+    date = tweet_date(tweet, state)
+    if date is None:
+        return None
+
+    return state, date, scores
+
+#endregion
+
+#region Buckets
+
+class TweetBuckets:
+
+    '''
+    Running count and score sums per (state, date) since the last flush.
+    '''
+
+    def __init__(self):
+
+        self.buckets = {}
+
+    def __len__(self):
+
+        return len(self.buckets)
+
+    def add(self, state, date, scores):
+
+        bucket = self.buckets.get((state, date))
+        if bucket is None:
+            bucket = self.buckets[(state, date)] = [0, 0.0, 0.0, 0.0]
+
+        bucket[0] += 1
+        for i, score in enumerate(scores):
+            bucket[i + 1] += score
+
+    def frame(self):
+
+        keys = list(self.buckets)
+        values = np.array(list(self.buckets.values()), dtype=float).reshape(-1, len(LABELS) + 1)
+
+        return pd.DataFrame({
+            'state': [state for state, _ in keys],
+            'date': pd.to_datetime([date for _, date in keys]),
+            'tweet_total': values[:, 0],
+            **{label: values[:, i + 1] for i, label in enumerate(LABELS)}
+        })
+
+    def clear(self):
+
+        self.buckets = {}
+
+#endregion
+
+#region Tweet Table
+
+def read_table(source):
+
+    '''
+    The tweet table and the offset reached in the source file, 0 when the
+    table was built from another file.
+    '''
+
+    if not os.path.exists(TWEETS_FILE):
+        return TweetBuckets().frame(), 0
+
+    table = feather.read_table(TWEETS_FILE)
+    meta = json.loads(table.schema.metadata[b'ingest'])
+    offset = meta['offset'] if meta['source'] == os.path.abspath(source) else 0
+
+    return table.to_pandas(), offset
+
+def write_table(table, source, offset):
+
+    arrow = pa.Table.from_pandas(table, preserve_index=False)
+    arrow = arrow.replace_schema_metadata({
+        'ingest': json.dumps({'source': os.path.abspath(source), 'offset': offset})
+    })
+
+    # written aside and renamed, so the sums and the offset change together
+    os.makedirs(store.STORE_DIR, exist_ok=True)
+    feather.write_feather(arrow, TWEETS_FILE + '.tmp', compression='uncompressed')
+    os.replace(TWEETS_FILE + '.tmp', TWEETS_FILE)
+
+def merge_table(table, buckets):
+
+    return pd.concat([table, buckets.frame()], ignore_index=True).groupby(
+        ['state', 'date'], as_index=False, sort=True
+    ).sum()
+
+def table_keys(frame):
+
+    return pd.MultiIndex.from_arrays([frame['state'].astype(str), frame['date']])
+
+def apply_rows(data, table):
+
+    '''
+    The merged rows (merged_aug_updated.csv layout) with tweet_total and the
+    averages of every (state, date) the table covers replaced by the streamed
+    values, before the store is prepared from them.
+    '''
+
+    position = table_keys(table).get_indexer(table_keys(data))
+    hit = position >= 0
+    if not hit.any():
+        return data
+
+    streamed = table.iloc[position[hit]]
+    totals = streamed['tweet_total'].to_numpy()
+
+    data = data.copy()
+    data.loc[hit, 'tweet_total'] = totals
+    for label, column in zip(LABELS, sentiment.SOURCES['twitter']):
+        data.loc[hit, column] = streamed[label].to_numpy() / totals
+
+    return data
+
+def apply_stored(data):
+
+    # used when the store is rebuilt from the CSVs, so streamed days are kept
+    if not os.path.exists(TWEETS_FILE):
+        return data
+
+    return apply_rows(data, feather.read_table(TWEETS_FILE).to_pandas())
+
+
+class StoreTweets:
+
+    '''
+    Applies the tweet table to the stored frames from flush to flush.
+
+    geo_data counts the tweet totals of the merged rows, before back filling,
+    with the streamed days as of the last build or flush. Those totals are kept
+    per (state, date), so a flush adds the change of each streamed day to the
+    counts, and the correlations are updated from the pairwise moments of the
+    rows whose tweet columns changed instead of over the whole data.
+    '''
+
+    def __init__(self, data, data_corr, table):
+
+        rows = apply_rows(store.source_data(), table)
+        self.counted = pd.Series(
+            rows['tweet_total'].fillna(0).to_numpy(),
+            index=table_keys(rows)
+        ).groupby(level=[0, 1]).last()
+
+        self.moments = aggregates.PairwiseMoments(data_corr.columns).update(data)
+
+    def apply(self, data, geo_data, data_corr, table):
+
+        '''
+        The stored frames with the tweet columns of every (state, date) row the
+        table covers replaced by the streamed values. Returns the frames and the
+        number of rows that changed.
+        '''
+
+        keys = table_keys(data)
+        position = table_keys(table).get_indexer(keys)
+        hit = position >= 0
+        if not hit.any():
+            return data, geo_data, data_corr, 0
+
+        columns = ['tweet_total'] + sentiment.SOURCES['twitter']
+        streamed = table.iloc[position[hit]]
+        totals = streamed['tweet_total'].to_numpy()
+        values = np.column_stack(
+            [totals] + [streamed[label].to_numpy() / totals for label in LABELS]
+        )
+
+        # only rows with new values are touched
+        changed = ~np.isclose(data.loc[hit, columns].to_numpy(dtype=float), values, equal_nan=True).all(axis=1)
+        rows = np.flatnonzero(hit)[changed]
+        if len(rows) == 0:
+            return data, geo_data, data_corr, 0
+
+        keys = keys[rows]
+        totals = totals[changed]
+
+        # geo_data counts tweets per state: add the change of every updated day
+        change = pd.Series(
+            totals - self.counted.reindex(keys).fillna(0).to_numpy(),
+            index=keys.get_level_values(0)
+        ).groupby(level=0).sum()
+        geo_data = geo_data.copy()
+        geo_data.loc[change.index, 'count_tweets'] += change
+        self.counted = pd.Series(totals, index=keys).groupby(level=[0, 1]).last().combine_first(self.counted)
+
+        self.moments.remove(data.iloc[rows])
+
+        data = data.copy()
+        data.iloc[rows, [data.columns.get_loc(column) for column in columns]] = values[changed]
+        data = sentiment.add_sentiment_features(data, {'twitter': sentiment.SOURCES['twitter']})
+
+        data_corr = self.moments.update(data.iloc[rows]).corr()
+
+        return data, geo_data, data_corr, len(rows)
+
+#endregion
+
+#region Ingest
+
+class Ingestor:
+
+    '''
+    Reads a JSONL tweet file and flushes per-state daily aggregates into the
+    store, every `flush_interval` seconds or when `max_buckets` are open.
+    '''
+
+    def __init__(self, source, follow=False, flush_interval=FLUSH_INTERVAL, max_buckets=MAX_BUCKETS, queue_size=QUEUE_SIZE):
+
+        self.source = source
+        self.follow = follow
+        self.flush_interval = flush_interval
+        self.max_buckets = max_buckets
+        self.queue_size = queue_size
+
+        self.names = state_names()
+        self.buckets = TweetBuckets()
+        self.table, self.offset = read_table(source)
+        self.store_tweets = None
+        self.store_version = None
+        self.position = self.offset
+        self.stats = {'lines': 0, 'tweets': 0, 'skipped': 0, 'flushes': 0, 'rows_updated': 0}
+
+    async def read(self, queue):
+
+        # file reads run in the default executor, so parsing and flushing go on meanwhile
+        loop = asyncio.get_event_loop()
+        with open(self.source, 'rb') as file:
+            file.seek(self.offset)
+            position = self.offset
+            partial = b''
+            while True:
+                lines = await loop.run_in_executor(None, file.readlines, READ_SIZE)
+                if not lines:
+                    if not self.follow:
+                        break
+                    await asyncio.sleep(0.5)
+                    continue
+                lines[0] = partial + lines[0]
+                partial = b''
+                # a line still being written is kept until its newline arrives
+                if not lines[-1].endswith(b'\n'):
+                    partial = lines.pop()
+                position += sum(len(line) for line in lines)
+                if lines:
+                    await queue.put((lines, position))
+
+        await queue.put(None)
+
+    async def consume(self, queue):
+
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                item = ()
+
+            if item is None:
+                break
+
+            if item:
+                lines, position = item
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    self.stats['lines'] += 1
+                    tweet = parse_tweet(line, self.names)
+                    if tweet is None:
+                        self.stats['skipped'] += 1
+                    else:
+                        self.buckets.add(*tweet)
+                        self.stats['tweets'] += 1
+                self.position = position
+
+            if len(self.buckets) >= self.max_buckets or time.monotonic() - last_flush >= self.flush_interval:
+                self.flush()
+                last_flush = time.monotonic()
+
+        self.flush()
+
+    def flush(self):
+
+        if self.position == self.offset:
+            return
+
+        previous = self.table
+        self.table = merge_table(self.table, self.buckets)
+        write_table(self.table, self.source, self.position)
+        self.buckets.clear()
+        self.offset = self.position
+        self.stats['flushes'] += 1
+
+        if not store.store_is_current():
+            print('Data store missing or out of date, tweets kept in {0} (run `python store.py` to rebuild)'.format(TWEETS_FILE))
+            return
+
+        data, geo_data, data_corr = store.read_store()
+
+        # the store as of the previous table, unless another process rewrote it since
+        if self.store_tweets is None or store.store_version() != self.store_version:
+            self.store_tweets = StoreTweets(data, data_corr, previous)
+            self.store_version = store.store_version()
+
+        data, geo_data, data_corr, updated = self.store_tweets.apply(data, geo_data, data_corr, self.table)
+        if updated:
+            store.write_store(data, geo_data, data_corr)
+            self.store_version = store.store_version()
+
+        self.stats['rows_updated'] += updated
+
+    async def run(self):
+
+        # bounded, so a fast reader waits for the aggregation instead of buffering the file
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        await asyncio.gather(self.read(queue), self.consume(queue))
+
+        return self.stats
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Ingest scored tweets into the dashboard store.')
+    parser.add_argument('source', help='JSONL file of scored tweets')
+    parser.add_argument('--follow', action='store_true', help='keep reading as the file grows')
+    parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL, help='seconds between flushes')
+    parser.add_argument('--max-buckets', type=int, default=MAX_BUCKETS, help='open (state, date) buckets that force a flush')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help='batches of lines read ahead of the aggregation')
+    args = parser.parse_args()
+
+    ingestor = Ingestor(args.source, args.follow, args.flush_interval, args.max_buckets, args.queue_size)
+
+    start = time.perf_counter()
+    stats = asyncio.run(ingestor.run())
+    elapsed = time.perf_counter() - start
+
+    print('Read {0} line(s): {1} tweet(s), {2} skipped, in {3:.2f}s ({4:.0f} tweets/s)'.format(
+        stats['lines'], stats['tweets'], stats['skipped'], elapsed, stats['tweets'] / elapsed if elapsed else 0
+    ))
+    print('{0} flush(es), {1} store row update(s)'.format(stats['flushes'], stats['rows_updated']))
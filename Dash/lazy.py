@@ -0,0 +1,53 @@
+'''
+
+Deferred imports for the heavy modules only some figures need.
+
+plotly.express, plotly.subplots and the scipy modules behind the density grids
+and the regression bands take longer to import than the app takes to load its
+data. `module` and `function` hand out stand-ins that import the real thing on
+first use, so a cold start only pays for what the first requests touch.
+
+Settings (environment):
+    DASH_LAZY_IMPORTS   set to 0 to import everything at startup (default 1)
+
+'''
+
+import importlib
+import os
+
+LAZY_IMPORTS = os.environ.get('DASH_LAZY_IMPORTS', '1') == '1'
+
+
+class LazyModule:
+
+    def __init__(self, name):
+
+        self.__dict__['_name'] = name
+
+    def __getattr__(self, attribute):
+
+        # import_module is cached in sys.modules after the first call
+        return getattr(importlib.import_module(self._name), attribute)
+
+    def __repr__(self):
+
+        return '<lazy module {0}>'.format(self._name)
+
+def module(name):
+
+    if not LAZY_IMPORTS:
+        return importlib.import_module(name)
+
+    return LazyModule(name)
+
+def function(module_name, name):
+
+    if not LAZY_IMPORTS:
+        return getattr(importlib.import_module(module_name), name)
+
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module_name), name)(*args, **kwargs)
+
+    call.__name__ = name
+
+    return call
@@ -0,0 +1,90 @@
+'''
+
+Page layouts built on first request.
+
+Each page of the dashboard is a factory registered for its route. The first
+request to a route builds the page and keeps the component tree; later
+requests reuse it. Pages list the static figures (see figures.py) they embed,
+so a data refresh only drops the pages whose figures changed, and a page
+nobody visits is never built.
+
+'''
+
+import threading
+
+
+class PageCache:
+
+    def __init__(self):
+
+        # route: (factory, names of the static figures the page embeds)
+        self.factories = {}
+        self.pages = {}
+        self.lock = threading.Lock()
+        self.builds = 0
+
+    def route(self, path, figures=()):
+
+        '''
+        Registers the decorated factory for a pathname. The factory for
+        path None is used for every route that has none.
+        '''
+
+        def decorator(factory):
+
+            self.factories[path] = (factory, set(figures))
+            return factory
+
+        return decorator
+
+    def get(self, path):
+
+        if path not in self.factories:
+            path = None
+
+        with self.lock:
+            if path in self.pages:
+                return self.pages[path]
+
+        # built outside the lock so a slow page does not block the others
+        factory, _ = self.factories[path]
+        page = factory()
+
+        with self.lock:
+            self.builds += 1
+            return self.pages.setdefault(path, page)
+
+    def invalidate(self, figures=None):
+
+        '''
+        Drops the pages that embed any of the figures, or every page when no
+        figures are given. Returns the routes that were dropped.
+        '''
+
+        with self.lock:
+            dropped = [
+                path for path in self.pages
+                if figures is None or self.factories[path][1] & set(figures)
+            ]
+            for path in dropped:
+                del self.pages[path]
+
+        return dropped
+
+    def warm(self):
+
+        for path in self.factories:
+            self.get(path)
+
+        return len(self.factories)
+
+    def info(self):
+
+        with self.lock:
+            return {
+                'built': sorted(self.pages, key=str),
+                'builds': self.builds
+            }
+
+
+page_cache = PageCache()
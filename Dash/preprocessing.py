@@ -3,27 +3,50 @@
 Naming Convention:
 page_GraphType_plotname_sequence.csv??
 
+Usage:
+    python preprocessing.py                     load covid_data.csv in memory
+    python preprocessing.py --chunksize 100000  stream it in chunks, memory bounded by the chunk size
+    python preprocessing.py --force             rebuild every key, even when it is up to date
+
+Every h5 key records a fingerprint of covid_data.csv and of the code that
+produces it (and of the keys it is derived from). Keys whose fingerprint still
+matches are skipped.
+
 '''
 
+import argparse
+import os
+
 import pandas as pd
 import pathlib
 
-#region Load Base Data
+from fingerprint import fingerprint, file_fingerprint
 
-#covid_cur_clean = pd.read_csv('.\\data\\covid_data.csv')
-covid_cur_clean = pd.read_csv('./data/covid_data.csv')
-#covid_countries = pd.read_pickle('.\\data\\covid_countries.pkl')
-#covid_regions = pd.read_pickle('.\\data\\covid_regions.pkl')
+#region Paths
 
-#covid_cur_clean = pd.read_hdf('.\\data\\covid_data.h5', key='covid_all')
-#covid_countries = pd.read_hdf('.\\data\\covid_data.h5', key='covid_countries')
-#covid_regions = pd.read_hdf('.\\data\\covid_data.h5', key='covid_regions')
+COVID_CSV = './data/covid_data.csv'
+COVID_H5 = './data/covid_data.h5'
+PLOT_H5 = './data/plots/plot_data.h5'
 
 #endregion
 
-#region Split regions and countries
+#region Load Base Data
+
+def load_base_data():
+
+    #covid_cur_clean = pd.read_csv('.\\data\\covid_data.csv')
+    #covid_countries = pd.read_pickle('.\\data\\covid_countries.pkl')
+    #covid_regions = pd.read_pickle('.\\data\\covid_regions.pkl')
+
+    #covid_cur_clean = pd.read_hdf('.\\data\\covid_data.h5', key='covid_all')
+    #covid_countries = pd.read_hdf('.\\data\\covid_data.h5', key='covid_countries')
+    #covid_regions = pd.read_hdf('.\\data\\covid_data.h5', key='covid_regions')
 
+    return pd.read_csv(COVID_CSV)
 
+#endregion
+
+#region Split regions and countries
 
 # Define regions list (identified by irregular iso_code values)
 regions_list = [
@@ -38,68 +61,270 @@ regions_list = [
     'World'
 ]
 
-# Split countries
-covid_countries = covid_cur_clean.loc[~covid_cur_clean['location'].isin(regions_list)]
-# Split regions
-covid_regions = covid_cur_clean.loc[covid_cur_clean['location'].isin(regions_list)]
-
-# Write pickles
-#covid_countries.to_pickle(".\\data\\covid_countries.pkl")
-#covid_regions.to_pickle(".\\data\\covid_regions.pkl")
-#covid_countries.to_hdf('.\\data\\covid_data.h5', key='covid_countries', mode='a')
-#covid_regions.to_hdf('.\\data\\covid_data.h5', key='covid_regions', mode='a')
-#covid_cur_clean.to_hdf('.\\data\\covid_data.h5', key='covid_all', mode='a')
-covid_countries.to_hdf('./data/covid_data.h5', key='covid_countries', mode='a')
-covid_regions.to_hdf('./data/covid_data.h5', key='covid_regions', mode='a')
-covid_cur_clean.to_hdf('./data/covid_data.h5', key='covid_all', mode='a')
+def split_regions(covid_cur_clean):
 
+    # Split countries
+    covid_countries = covid_cur_clean.loc[~covid_cur_clean['location'].isin(regions_list)]
+    # Split regions
+    covid_regions = covid_cur_clean.loc[covid_cur_clean['location'].isin(regions_list)]
 
+    return covid_countries, covid_regions
 
 #endregion
 
 #region Home_Scatter_Testing_01
 
-plot_data = covid_countries.groupby(
-    [
-        'location'
-    ]
-).agg(
-    {
-        'stringency_index': 'mean',
+def home_scatter_test_01(covid_countries):
+
+    return covid_countries.groupby(
+        [
+            'location'
+        ]
+    ).agg(
+        {
+            'stringency_index': 'mean',
+            'total_deaths': 'max',
+            'population': 'max'
+        }
+    ).merge(
+        covid_countries[['continent','location']],
+        how='left',
+        on='location'
+    ).assign(
+        total_deaths_per_population = lambda row: row['total_deaths']/row['population']
+    )
+
+#endregion
+
+#region continent_scatter_marty_01
+
+def continent_scatter_marty_01(covid_countries):
+
+    return covid_countries.groupby(
+        [
+            'continent',
+            'date'
+        ]
+    ).agg(
+        {
+            'new_cases' : 'sum',
+            'stringency_index' : 'sum',
+            'total_cases' : 'sum'
+        }
+    )
+
+#endregion
+
+#region In Memory
+
+def run_in_memory(stale):
+
+    covid_cur_clean = load_base_data()
+    covid_countries, covid_regions = split_regions(covid_cur_clean)
+
+    # Write pickles
+    #covid_countries.to_pickle(".\\data\\covid_countries.pkl")
+    #covid_regions.to_pickle(".\\data\\covid_regions.pkl")
+    #plot_data.to_pickle(".\\data\\plots\\home_scatter_test_01.pkl")
+    #plot_data.to_pickle(".\\data\\plots\\continent_scatter_marty_01.pkl")
+    producers = {
+        'covid_all': lambda: covid_cur_clean,
+        'covid_countries': lambda: covid_countries,
+        'covid_regions': lambda: covid_regions,
+        'home_scatter_test_01': lambda: home_scatter_test_01(covid_countries),
+        'continent_scatter_marty_01': lambda: continent_scatter_marty_01(covid_countries)
+    }
+
+    for key in stale:
+        producers[key]().to_hdf(OUTPUTS[key], key=key, mode='a')
+
+#endregion
+
+#region Streaming
+
+# Columns read in streaming mode, with their declared types
+STREAM_DTYPES = {
+    'iso_code': 'object',
+    'continent': 'object',
+    'location': 'object',
+    'date': 'object',
+    'total_cases': 'float64',
+    'new_cases': 'float64',
+    'total_deaths': 'float64',
+    'stringency_index': 'float64',
+    'population': 'float64'
+}
+
+# Widest value expected in each text column of the streamed h5 tables
+STREAM_ITEMSIZE = {
+    'iso_code': 16,
+    'continent': 32,
+    'location': 64,
+    'date': 10
+}
+
+def partial_home_scatter(covid_countries):
+
+    # sums and counts rather than means, so chunks can be merged
+    return covid_countries.groupby('location').agg(
+        stringency_sum = ('stringency_index', 'sum'),
+        stringency_count = ('stringency_index', 'count'),
+        total_deaths = ('total_deaths', 'max'),
+        population = ('population', 'max'),
+        rows = ('location', 'size'),
+        continent = ('continent', 'first')
+    )
+
+def merge_home_scatter(left, right):
+
+    if left is None:
+        return right
+
+    return pd.concat([left, right]).groupby(level=0).agg({
+        'stringency_sum': 'sum',
+        'stringency_count': 'sum',
         'total_deaths': 'max',
-        'population': 'max'
+        'population': 'max',
+        'rows': 'sum',
+        'continent': 'first'
+    })
+
+def finish_home_scatter(partial):
+
+    # the in-memory merge repeats each location once per row it has in
+    # covid_countries, so the streamed result does the same
+    partial = partial.sort_index()
+    plot_data = pd.DataFrame({
+        'location': partial.index,
+        'stringency_index': partial['stringency_sum'] / partial['stringency_count'].where(partial['stringency_count'] > 0),
+        'total_deaths': partial['total_deaths'],
+        'population': partial['population'],
+        'continent': partial['continent']
+    }).reset_index(drop=True)
+
+    return plot_data.loc[
+        plot_data.index.repeat(partial['rows'].to_numpy())
+    ].reset_index(drop=True).assign(
+        total_deaths_per_population = lambda row: row['total_deaths']/row['population']
+    )
+
+def merge_continent_scatter(left, right):
+
+    if left is None:
+        return right
+
+    return pd.concat([left, right]).groupby(level=[0, 1]).sum()
+
+def run_streaming(chunksize, stale):
+
+    home_scatter = None
+    continent_scatter = None
+    tables = [key for key in ['covid_countries', 'covid_regions', 'covid_all'] if key in stale]
+
+    with pd.HDFStore(COVID_H5, mode='a') as covid_store:
+
+        for key in tables:
+            if key in covid_store:
+                covid_store.remove(key)
+
+        chunks = pd.read_csv(
+            COVID_CSV,
+            usecols=list(STREAM_DTYPES),
+            dtype=STREAM_DTYPES,
+            chunksize=chunksize
+        )
+
+        for chunk in chunks:
+            covid_countries, covid_regions = split_regions(chunk)
+
+            frames = {'covid_countries': covid_countries, 'covid_regions': covid_regions, 'covid_all': chunk}
+            for key in tables:
+                covid_store.append(key, frames[key], format='table', min_itemsize=STREAM_ITEMSIZE, index=False)
+
+            if 'home_scatter_test_01' in stale:
+                home_scatter = merge_home_scatter(home_scatter, partial_home_scatter(covid_countries))
+            if 'continent_scatter_marty_01' in stale:
+                continent_scatter = merge_continent_scatter(continent_scatter, continent_scatter_marty_01(covid_countries))
+
+    if 'home_scatter_test_01' in stale:
+        finish_home_scatter(home_scatter).to_hdf(PLOT_H5, key='home_scatter_test_01', mode='a')
+    if 'continent_scatter_marty_01' in stale:
+        continent_scatter.sort_index().to_hdf(PLOT_H5, key='continent_scatter_marty_01', mode='a')
+
+#endregion
+
+#region Fingerprints
+
+# Output keys and the h5 file each is written to
+OUTPUTS = {
+    'covid_all': COVID_H5,
+    'covid_countries': COVID_H5,
+    'covid_regions': COVID_H5,
+    'home_scatter_test_01': PLOT_H5,
+    'continent_scatter_marty_01': PLOT_H5
+}
+
+def expected_fingerprints(streaming):
+
+    # each key hashes its upstream key's fingerprint, so a change propagates to every dependent
+    if streaming:
+        mode = ['streaming', STREAM_DTYPES, run_streaming]
+        home_code = [partial_home_scatter, merge_home_scatter, finish_home_scatter]
+        continent_code = [merge_continent_scatter]
+    else:
+        mode = ['in memory', run_in_memory]
+        home_code = []
+        continent_code = []
+
+    covid_all = fingerprint('covid_all', file_fingerprint(COVID_CSV), mode, load_base_data)
+    covid_countries = fingerprint('covid_countries', covid_all, regions_list, split_regions)
+
+    return {
+        'covid_all': covid_all,
+        'covid_countries': covid_countries,
+        'covid_regions': fingerprint('covid_regions', covid_all, regions_list, split_regions),
+        'home_scatter_test_01': fingerprint('home_scatter_test_01', covid_countries, home_scatter_test_01, *home_code),
+        'continent_scatter_marty_01': fingerprint('continent_scatter_marty_01', covid_countries, continent_scatter_marty_01, *continent_code)
     }
-).merge(
-    covid_countries[['continent','location']],
-    how='left',
-    on='location'
-).assign(
-    total_deaths_per_population = lambda row: row['total_deaths']/row['population']
-)
-
-#plot_data.to_pickle(".\\data\\plots\\home_scatter_test_01.pkl")
-#plot_data.to_csv(".\\data\\plots\\home_scatter_test_01.csv")
-plot_data.to_hdf('./data/plots/plot_data.h5', key='home_scatter_test_01', mode='a')
-#a = pd.read_hdf('.\\data\\plots\\plot_data.h5', key='home_scatter_test_01')
+
+def read_fingerprint(key):
+
+    if not os.path.exists(OUTPUTS[key]):
+        return None
+
+    with pd.HDFStore(OUTPUTS[key], mode='r') as h5:
+        if key not in h5:
+            return None
+        return getattr(h5.get_storer(key).attrs, 'fingerprint', None)
+
+def write_fingerprint(key, value):
+
+    with pd.HDFStore(OUTPUTS[key], mode='a') as h5:
+        h5.get_storer(key).attrs.fingerprint = value
+
 #endregion
 
-#region continent_scatter_marty_01
+if __name__ == "__main__":
 
-plot_data = covid_countries.groupby(
-    [
-        'continent',
-        'date'
+    parser = argparse.ArgumentParser(description='Preprocess covid_data.csv into the h5 plot data.')
+    parser.add_argument('--chunksize', type=int, help='stream the csv in chunks of this many rows')
+    parser.add_argument('--force', action='store_true', help='rebuild every key')
+    args = parser.parse_args()
+
+    expected = expected_fingerprints(streaming=bool(args.chunksize))
+    stale = [
+        key for key in OUTPUTS
+        if args.force or read_fingerprint(key) != expected[key]
     ]
-).agg(
-    {
-        'new_cases' : 'sum',
-        'stringency_index' : 'sum',
-        'total_cases' : 'sum'
-    }
-)
+    skipped = [key for key in OUTPUTS if key not in stale]
 
-#plot_data.to_pickle(".\\data\\plots\\continent_scatter_marty_01.pkl")
-#plot_data.to_csv(".\\data\\plots\\marty_scatter_01.csv")
-plot_data.to_hdf('./data/plots/plot_data.h5', key='continent_scatter_marty_01', mode='a')
+    if stale:
+        if args.chunksize:
+            run_streaming(args.chunksize, stale)
+        else:
+            run_in_memory(stale)
+        for key in stale:
+            write_fingerprint(key, expected[key])
 
-#endregion
\ No newline at end of file
+    print('Rebuilt {0} key(s): {1}'.format(len(stale), ', '.join(stale) or '-'))
+    print('Skipped {0} up to date key(s): {1}'.format(len(skipped), ', '.join(skipped) or '-'))
@@ -0,0 +1,192 @@
+'''
+
+Precomputed OLS trendlines for the sentiment vs sentiment scatter plots.
+
+`px.scatter(..., trendline="ols")` fitted a statsmodels model on every
+request. The fits only depend on the state and the two columns, so every
+(state, x, y) pair of the sentiment columns is solved in closed form at load
+time from the pairwise sums of aggregates.PairwiseMoments (rows where both
+values are present, as the OLS fit drops the others). Each fit keeps the slope,
+intercept, R² and what is needed for the 95% confidence band of the mean.
+
+'''
+
+import numpy as np
+
+from aggregates import PairwiseMoments
+import lazy
+import sentiment
+
+stats = lazy.module('scipy.stats')
+
+# default colour of a single px.scatter trace and its trendline
+TRENDLINE_COLOUR = '#636efa'
+BAND_POINTS = 50
+
+def pair_ranges(values):
+
+    # pairwise complete ranges of x: x_min[i, j] is the smallest x_i where x_j is present
+    k = values.shape[1]
+    if len(values) == 0:
+        return np.full((k, k), np.inf), np.full((k, k), -np.inf)
+
+    present = ~np.isnan(values)
+    both = present[:, :, None] & present[:, None, :]
+
+    return (
+        np.where(both, values[:, :, None], np.inf).min(axis=0),
+        np.where(both, values[:, :, None], -np.inf).max(axis=0)
+    )
+
+def fit_pairs(frame, columns):
+
+    '''
+    OLS fits of y on x for every ordered pair of the columns, as
+    {(x, y): fit}.
+    '''
+
+    x_min, x_max = pair_ranges(frame[columns].to_numpy(dtype=float))
+
+    return solve(PairwiseMoments(columns).update(frame), x_min, x_max)
+
+def solve(moments, x_min, x_max):
+
+    # the fits of every pair from its pairwise sums and x range
+    columns = moments.columns
+    shift = moments.shift if moments.shift is not None else np.zeros(len(columns))
+
+    n = moments.n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # centered sums; sx[i, j] is the (shifted) sum of column i where j is present
+        sxx = moments.sxx - moments.sx ** 2 / n
+        syy = sxx.T
+        sxy = moments.sxy - moments.sx * moments.sx.T / n
+        slope = sxy / sxx
+        x_mean = moments.sx / n + shift[:, None]
+        y_mean = moments.sx.T / n + shift[None, :]
+        intercept = y_mean - slope * x_mean
+        r2 = sxy ** 2 / (sxx * syy)
+        residual = np.sqrt(np.clip(syy - slope * sxy, 0.0, None) / (n - 2))
+
+    fits = {}
+    for i, x in enumerate(columns):
+        for j, y in enumerate(columns):
+            if i == j or n[i, j] < 2 or not np.isfinite(slope[i, j]):
+                continue
+            fits[(x, y)] = {
+                'n': int(n[i, j]),
+                'slope': float(slope[i, j]),
+                'intercept': float(intercept[i, j]),
+                'r2': float(r2[i, j]),
+                'x_mean': float(x_mean[i, j]),
+                'sxx': float(sxx[i, j]),
+                'residual': float(residual[i, j]),
+                'x_min': float(x_min[i, j]),
+                'x_max': float(x_max[i, j])
+            }
+
+    return fits
+
+def band(fit, x):
+
+    # 95% confidence band of the fitted mean at x
+    y = fit['intercept'] + fit['slope'] * x
+    if fit['n'] < 3:
+        return y, y, y
+
+    t = stats.t.ppf(0.975, fit['n'] - 2)
+    half = t * fit['residual'] * np.sqrt(1.0 / fit['n'] + (x - fit['x_mean']) ** 2 / fit['sxx'])
+
+    return y, y - half, y + half
+
+
+class Regressions:
+
+    '''
+    OLS fits for every state and ordered pair of the sentiment columns.
+    '''
+
+    def __init__(self, partitions, columns=None):
+
+        self.columns = columns or [
+            column for source in sentiment.SOURCES.values() for column in source
+        ]
+        self.moments = {}
+        self.ranges = {}
+        self.fits = {}
+        for state in partitions.slices:
+            self.add(state, partitions.get(state))
+
+    def add(self, state, frame):
+
+        self.add_values(state, frame[self.columns].to_numpy(dtype=float))
+
+    def add_values(self, state, values):
+
+        '''
+        Adds rows of a state to its pairwise sums and x ranges and solves its
+        fits again, so appended rows cost their own size, not the history's.
+        '''
+
+        moments = self.moments.setdefault(state, PairwiseMoments(self.columns))
+        moments.update_values(values)
+
+        x_min, x_max = pair_ranges(values)
+        if state in self.ranges:
+            x_min = np.fmin(self.ranges[state][0], x_min)
+            x_max = np.fmax(self.ranges[state][1], x_max)
+        self.ranges[state] = (x_min, x_max)
+
+        self.fits[state] = solve(moments, x_min, x_max)
+
+    def append(self, rows):
+
+        states = rows['state'].astype(str).to_numpy()
+        values = rows[self.columns].to_numpy(dtype=float)
+        for state in np.unique(states):
+            self.add_values(state, values[states == state])
+
+    def get(self, state, x, y):
+
+        return self.fits.get(state, {}).get((x, y))
+
+def add_trendline(fig, fit, colour=TRENDLINE_COLOUR):
+
+    '''
+    Adds the fitted line and its confidence band to a scatter figure, with the
+    hover text of px's OLS trendline.
+    '''
+
+    import plotly.graph_objects as go
+
+    if fit is None:
+        return fig
+
+    x = np.linspace(fit['x_min'], fit['x_max'], BAND_POINTS)
+    y, lower, upper = band(fit, x)
+
+    hover = 'OLS trendline<br>y = {0:.6g} * x + {1:.6g}<br>R<sup>2</sup>={2:.6f}<br><br>x=%{{x}}<br>y=%{{y}} <b>(trend)</b><extra></extra>'.format(
+        fit['slope'], fit['intercept'], fit['r2']
+    )
+
+    return fig.add_trace(
+        go.Scatter(
+            x=np.concatenate([x, x[::-1]]),
+            y=np.concatenate([upper, lower[::-1]]),
+            fill='toself',
+            fillcolor=colour,
+            opacity=0.15,
+            line_width=0,
+            hoverinfo='skip',
+            showlegend=False
+        )
+    ).add_trace(
+        go.Scatter(
+            x=x[[0, -1]],
+            y=y[[0, -1]],
+            mode='lines',
+            line_color=colour,
+            hovertemplate=hover,
+            showlegend=False
+        )
+    )
@@ -0,0 +1,110 @@
+'''
+
+Compression and cache validation for the dashboard's HTTP responses.
+
+    _dash-layout, _dash-dependencies
+                    brotli or gzip, with a weak ETag over the uncompressed body.
+                    A request whose If-None-Match still matches gets an empty
+                    304 instead of the layout.
+    _dash-update-component
+                    brotli or gzip. Callbacks are POSTs the renderer never
+                    revalidates, so they get no ETag.
+    assets/, static/
+                    brotli or gzip. Dash fingerprints asset urls with the file's
+                    modification time (?m=...), so those are cached for a year;
+                    the others are revalidated against their ETag.
+
+ETags are weak because the same body is sent in several encodings.
+
+Settings (environment):
+    DASH_COMPRESS           set to 0 to turn compression off (default 1)
+    DASH_ASSET_MAX_AGE      seconds fingerprinted assets are cached (default one year)
+
+'''
+
+import hashlib
+import mimetypes
+import os
+
+import flask
+
+COMPRESS = os.environ.get('DASH_COMPRESS', '1') == '1'
+ASSET_MAX_AGE = int(os.environ.get('DASH_ASSET_MAX_AGE', 365 * 24 * 60 * 60))
+
+COMPRESS_MIMETYPES = [
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/html',
+    'image/svg+xml',
+    'application/geo+json'
+]
+
+# paths (after the routes prefix) validated with an ETag
+VALIDATED_PATHS = ['_dash-layout', '_dash-dependencies']
+CACHED_PREFIXES = ('assets/', 'static/')
+
+def not_modified(response):
+
+    return flask.Response(
+        status=304,
+        headers={
+            key: value for key, value in response.headers.items()
+            if key in ['ETag', 'Cache-Control', 'Vary']
+        }
+    )
+
+def validate(response, path):
+
+    if path.startswith(CACHED_PREFIXES):
+        if flask.request.args.get('m'):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = ASSET_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        # Flask-Compress appends the encoding to strong ETags
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    if path not in VALIDATED_PATHS or response.status_code != 200 or response.is_streamed:
+        return response
+
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest(), weak=True)
+    response.cache_control.no_cache = True
+
+    # Dash builds these responses itself, so nothing else evaluates If-None-Match
+    if flask.request.if_none_match.contains_weak(response.get_etag()[0]):
+        return not_modified(response)
+
+    return response
+
+def configure(server, routes_prefix='/'):
+
+    # the map geometry (see geometry.py), which older Pythons serve as octet-stream
+    mimetypes.add_type('application/geo+json', '.geojson')
+
+    if COMPRESS:
+        from flask_compress import Compress
+
+        server.config.update(
+            COMPRESS_ALGORITHM=['br', 'gzip'],
+            # files from send_file are streamed responses
+            COMPRESS_ALGORITHM_STREAMING=['br', 'gzip'],
+            COMPRESS_MIMETYPES=COMPRESS_MIMETYPES,
+            COMPRESS_MIN_SIZE=500
+        )
+        Compress(server)
+
+    # after_request functions run in reverse order, so registering this after
+    # Compress lets it hash the body before it is compressed
+    @server.after_request
+    def validate_response(response):
+        path = flask.request.path
+        if path.startswith(routes_prefix):
+            path = path[len(routes_prefix):]
+        return validate(response, path)
@@ -0,0 +1,271 @@
+'''
+
+Local sentiment scoring of tweets and other short documents.
+
+The scores in the data were produced by the cognitiveservices Java tool, one
+blocking Azure Text Analytics call per document. This scorer runs offline with
+a lexicon (./sentiment_lexicon.csv, word and valence from -4 to 4, or any
+VADER style lexicon file) and emits the same schema: a summary label and
+positive, neutral and negative confidences that sum to one.
+
+Valences are adjusted for the words before them, as in VADER: boosters
+("very", "slightly") scale them, a negation within three words flips and damps
+them, and after "but" the clause counts more than the one before it. Each
+sentiment word then adds its weight to the positive or negative mass and every
+other word adds one to the neutral mass.
+
+Documents are scored in batches on a process pool, with a bounded number of
+batches in flight, so files of any size stream through in order.
+
+Usage:
+    python scoring.py tweets.csv --column clean_tweet -o tweetresult.csv
+    python scoring.py tweets.jsonl --field text -o scored.jsonl --workers 8
+
+Settings (environment):
+    DASH_SENTIMENT_LEXICON  lexicon file (default ./sentiment_lexicon.csv)
+
+'''
+
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+#region Lexicon
+
+SENTIMENT_LEXICON = os.environ.get(
+    'DASH_SENTIMENT_LEXICON',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_lexicon.csv')
+)
+
+LABELS = ['positive', 'neutral', 'negative']
+
+TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+NEGATIONS = {
+    'not', 'no', 'never', 'none', 'nobody', 'nothing', 'neither', 'nor', 'without', 'cannot'
+}
+NEGATION_SCALAR = -0.74
+
+BOOSTERS = {
+    'absolutely': 0.293, 'extremely': 0.293, 'highly': 0.293, 'incredibly': 0.293,
+    'really': 0.293, 'so': 0.293, 'totally': 0.293, 'very': 0.293, 'most': 0.293,
+    'barely': -0.293, 'hardly': -0.293, 'slightly': -0.293, 'somewhat': -0.293, 'little': -0.293
+}
+
+# weight of the words before and after "but"
+BUT_WEIGHTS = (0.5, 1.5)
+
+BATCH_SIZE = 256
+
+@functools.lru_cache(maxsize=None)
+def load_lexicon(path=SENTIMENT_LEXICON):
+
+    '''
+    {word: valence} from a "word,valence" csv, or a VADER lexicon (word, mean
+    valence and further columns, tab separated).
+    '''
+
+    lexicon = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            fields = line.rstrip('\n').split('\t' if '\t' in line else ',')
+            try:
+                lexicon[fields[0].strip().lower()] = float(fields[1])
+            except (IndexError, ValueError):
+                # the csv header
+                continue
+
+    return lexicon
+
+#endregion
+
+#region Score
+
+def is_negation(token):
+
+    return token in NEGATIONS or token.endswith("n't")
+
+def valences(tokens, lexicon):
+
+    values = []
+    for i, token in enumerate(tokens):
+        valence = lexicon.get(token, 0.0)
+        if valence:
+            # the three words before, nearest first, count less the further they are
+            for distance, before in enumerate(reversed(tokens[max(0, i - 3):i])):
+                scale = 1.0 - 0.05 * distance
+                if before in BOOSTERS:
+                    # away from zero for boosters, towards it for dampeners
+                    boost = BOOSTERS[before] * scale
+                    valence += -boost if valence < 0 else boost
+                if is_negation(before):
+                    valence *= NEGATION_SCALAR
+        values.append(valence)
+
+    if 'but' in tokens:
+        but = tokens.index('but')
+        values = [
+            value * BUT_WEIGHTS[0] if i < but else value * BUT_WEIGHTS[1] if i > but else value
+            for i, value in enumerate(values)
+        ]
+
+    return values
+
+def score(text, lexicon):
+
+    '''
+    (positive, neutral, negative) confidences of a document. A document with
+    no words is neutral.
+    '''
+
+    tokens = TOKEN.findall(str(text).lower())
+    values = valences(tokens, lexicon)
+
+    positive = sum(value + 1 for value in values if value > 0)
+    negative = sum(1 - value for value in values if value < 0)
+    neutral = sum(1 for value in values if value == 0)
+
+    total = positive + neutral + negative
+    if total == 0:
+        return 0.0, 1.0, 0.0
+
+    return positive / total, neutral / total, negative / total
+
+def summary(scores):
+
+    # the label of the largest confidence, as the Java tool's first string
+    return LABELS[max(range(len(LABELS)), key=lambda i: scores[i])]
+
+def score_batch(texts, path=SENTIMENT_LEXICON, decimals=2):
+
+    # runs in the pool workers, each loads the lexicon once
+    lexicon = load_lexicon(path)
+
+    return [
+        tuple(round(value, decimals) for value in score(text, lexicon))
+        for text in texts
+    ]
+
+def score_batches(batches, workers=None, path=SENTIMENT_LEXICON, decimals=2):
+
+    '''
+    Scores an iterable of document batches on a process pool and yields the
+    scores of each batch in order. At most two batches per worker are in
+    flight, so the input is read no further ahead than that.
+    '''
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        for texts in batches:
+            yield score_batch(texts, path, decimals)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for texts in batches:
+            pending.append(executor.submit(score_batch, texts, path, decimals))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+#endregion
+
+#region Files
+
+def score_csv(source, target, column, workers=None, batch_size=BATCH_SIZE, path=SENTIMENT_LEXICON, decimals=2):
+
+    '''
+    Writes the rows of a csv with the sentiment_summary, positive, neutral and
+    negative columns the Java tool adds. Returns the number of documents.
+    '''
+
+    chunks = pd.read_csv(source, chunksize=batch_size)
+    frames = deque()
+
+    def batches():
+        for chunk in chunks:
+            frames.append(chunk)
+            yield chunk[column].fillna('').tolist()
+
+    count = 0
+    for i, scores in enumerate(score_batches(batches(), workers, path, decimals)):
+        chunk = frames.popleft()
+        chunk = chunk.assign(
+            sentiment_summary=[summary(triple) for triple in scores],
+            **{label: [triple[j] for triple in scores] for j, label in enumerate(LABELS)}
+        )
+        chunk.to_csv(target, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        count += len(chunk)
+
+    return count
+
+def score_jsonl(source, target, field, workers=None, batch_size=BATCH_SIZE, path=SENTIMENT_LEXICON, decimals=2):
+
+    '''
+    Writes every JSON line of the source with the sentiment, positive, neutral
+    and negative fields added, ready for ingest.py. Returns the number of
+    documents.
+    '''
+
+    records = deque()
+
+    def batches():
+        with open(source, encoding='utf-8') as file:
+            batch = []
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                batch.append(record)
+                if len(batch) == batch_size:
+                    records.append(batch)
+                    yield [record.get(field) or '' for record in batch]
+                    batch = []
+            if batch:
+                records.append(batch)
+                yield [record.get(field) or '' for record in batch]
+
+    count = 0
+    with open(target, 'w', encoding='utf-8') as file:
+        for scores in score_batches(batches(), workers, path, decimals):
+            for record, triple in zip(records.popleft(), scores):
+                record['sentiment'] = summary(triple)
+                record.update(zip(LABELS, triple))
+                file.write(json.dumps(record) + '\n')
+                count += 1
+
+    return count
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Score the sentiment of documents offline.')
+    parser.add_argument('source', help='csv or jsonl file of documents')
+    parser.add_argument('-o', '--output', required=True, help='scored csv or jsonl file')
+    parser.add_argument('--column', default='clean_tweet', help='csv column holding the text')
+    parser.add_argument('--field', default='text', help='jsonl field holding the text')
+    parser.add_argument('--workers', type=int, default=None, help='scoring processes (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='documents per batch')
+    parser.add_argument('--lexicon', default=SENTIMENT_LEXICON, help='lexicon file')
+    parser.add_argument('--decimals', type=int, default=2, help='decimals of the confidences')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.source.endswith('.jsonl'):
+        count = score_jsonl(args.source, args.output, args.field, args.workers, args.batch_size, args.lexicon, args.decimals)
+    else:
+        count = score_csv(args.source, args.output, args.column, args.workers, args.batch_size, args.lexicon, args.decimals)
+    elapsed = time.perf_counter() - start
+
+    print('Scored {0} document(s) in {1:.2f}s ({2:.0f} documents/s) to {3}'.format(
+        count, elapsed, count / elapsed if elapsed else 0, args.output
+    ))
@@ -0,0 +1,83 @@
+'''
+
+Net sentiment features for every sentiment source.
+
+A source is a (positive, neutral, negative) column triple. For each one the
+engine adds, from a single argmax over the triple:
+
+    net_<source>_sentiment            Positive / Neutral / Negative (categorical)
+    net_<source>_sentiment_colour     blue / yellow / red (categorical)
+    net_<source>_sentiment_margin     largest minus second largest proportion
+    net_<source>_sentiment_entropy    entropy of the triple, 0 (one-sided) to 1 (even)
+
+Rows where the whole triple is missing get missing features. New sources are
+added with `register_source`.
+
+'''
+
+import numpy as np
+import pandas as pd
+
+LABELS = ['Positive', 'Neutral', 'Negative']
+COLOURS = ['blue', 'yellow', 'red']
+
+# source name: (positive, neutral, negative) columns
+SOURCES = {
+    'transcript': ['transcript_sentiment_positive', 'transcript_sentiment_neutral', 'transcript_sentiment_negative'],
+    'twitter': ['avr_positive_tweet_sentiment', 'avr_neutral_tweet_sentiment', 'avr_negative_tweet_sentiment']
+}
+
+def register_source(name, columns):
+
+    if len(columns) != len(LABELS):
+        raise ValueError('A sentiment source needs {0} columns (positive, neutral, negative), got {1}'.format(len(LABELS), len(columns)))
+
+    SOURCES[name] = list(columns)
+
+def source_features(values):
+
+    '''
+    Label codes, margin and entropy of an (n, 3) array of proportions. Codes
+    are -1 where the row is all missing; like idxmax, missing values are
+    skipped and ties go to the first column.
+    '''
+
+    present = ~np.isnan(values)
+    any_present = present.any(axis=1)
+    filled = np.where(present, values, -np.inf)
+
+    codes = np.where(any_present, filled.argmax(axis=1), -1)
+
+    ranked = np.sort(filled, axis=1)
+    with np.errstate(invalid='ignore'):
+        margin = ranked[:, -1] - ranked[:, -2]
+    margin[~np.isfinite(margin)] = np.nan
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = np.where(present, values, 0.0)
+        p = p / p.sum(axis=1, keepdims=True)
+        entropy = -np.where(p > 0, p * np.log(p), 0.0).sum(axis=1) / np.log(values.shape[1])
+    entropy[~any_present] = np.nan
+
+    return codes, margin, entropy
+
+def sentiment_features(data, sources=None):
+
+    features = {}
+    for name, columns in (sources or SOURCES).items():
+        if not all(column in data for column in columns):
+            continue
+
+        codes, margin, entropy = source_features(data[columns].to_numpy(dtype=float))
+        prefix = 'net_{0}_sentiment'.format(name)
+
+        features[prefix] = pd.Categorical.from_codes(codes, categories=LABELS)
+        features[prefix + '_colour'] = pd.Categorical.from_codes(codes, categories=COLOURS)
+        features[prefix + '_margin'] = margin
+        features[prefix + '_entropy'] = entropy
+
+    return features
+
+def add_sentiment_features(data, sources=None):
+
+    return data.assign(**sentiment_features(data, sources))
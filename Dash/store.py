@@ -0,0 +1,527 @@
+'''
+
+Typed columnar store for the dashboard data.
+
+The app used to parse the raw CSVs and rebuild every derived frame on each boot.
+This module does that work once and writes the results as uncompressed Feather
+files (categorical state, datetime64 date) which the app memory-maps at startup.
+
+Reading Feather still gives every process its own copy of the columns. In the
+shared mode the prepared data is also published as one .npy file per column
+(categories as their codes). Server processes map those files read-only and
+wrap them in a frame without copying, so the columns sit once in the page
+cache however many workers attach to them.
+
+Usage:
+    python store.py                 build ./data/store from the raw CSVs
+    python store.py --shared        also publish the shared columns
+    python store.py --benchmark     compare the CSV boot path with the store
+
+Settings (environment):
+    DASH_SHARED_DATA    set to 1 to attach to the shared columns (default 0)
+    DASH_SHARED_DIR     where they are published (default ./data/store/shared,
+                        /dev/shm keeps them in memory)
+
+'''
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import sentiment
+
+#region Paths
+
+DATA_DIR = os.environ.get('DASH_DATA_DIR', './data')
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+CITIES_CSV = os.path.join(DATA_DIR, 'australian_cities.csv')
+MERGED_CSV = os.path.join(DATA_DIR, 'merged_aug_updated.csv')
+STATES_GEOJSON = os.path.join(DATA_DIR, 'australia_states_simple_final.geojson')
+
+STORE_FILES = {
+    'data': os.path.join(STORE_DIR, 'data.feather'),
+    'geo_data': os.path.join(STORE_DIR, 'geo_data.feather'),
+    'data_corr': os.path.join(STORE_DIR, 'data_corr.feather')
+}
+
+# the output of datamerge.py, read in place of the merged CSV when present
+MERGED_FILE = os.path.join(STORE_DIR, 'merged.feather')
+
+# rows appended since the merged rows were written (see aggregates.py)
+ROWS_FILE = os.path.join(STORE_DIR, 'rows.feather')
+
+SHARED_DATA = os.environ.get('DASH_SHARED_DATA', '0') == '1'
+SHARED_DIR = os.environ.get('DASH_SHARED_DIR', os.path.join(STORE_DIR, 'shared'))
+SHARED_CURRENT = os.path.join(SHARED_DIR, 'current.json')
+
+#endregion
+
+#region Build from CSV
+
+def parse_dates(dates):
+
+    # ISO dates first: with dayfirst, a batch holding a single ISO date such as
+    # 2021-09-06 is otherwise read as the 9th of June
+    parsed = pd.to_datetime(dates, format='%Y-%m-%d', errors='coerce')
+    others = parsed.isna() & dates.notna()
+    if others.any():
+        parsed[others] = pd.to_datetime(dates[others], infer_datetime_format=True, dayfirst=True )
+
+    return parsed
+
+def read_cities():
+
+    return pd.read_csv(CITIES_CSV, index_col='State')
+
+def read_csv():
+
+    cities = read_cities()
+    data = pd.read_csv(MERGED_CSV)
+    data.date = parse_dates(data.date)
+
+    return cities, data
+
+def press_rows(data):
+
+    '''
+    The rows holding the scores of a press conference on their own day. A
+    merge with --press-tolerance (see datamerge.py) records in press_date the
+    day the scores of a row come from; rows given an earlier day's scores are
+    not press conferences.
+    '''
+
+    held = data[sentiment.SOURCES['transcript']].notna().any(axis=1)
+    if 'press_date' in data:
+        held &= data['press_date'].isna() | (data['press_date'] == data['date'])
+
+    return held
+
+def build_geo_data(data, cities):
+
+    return pd.DataFrame().assign(
+        count_press = data[press_rows(data)].groupby(
+            'state'
+        ).agg(
+            {
+                'date': 'count'
+            }
+        ).rename(
+            columns={
+                'date': 'count_press'
+            }
+        ),
+        count_tweets = data.groupby(
+            'state'
+        ).agg(
+            {
+                'tweet_total': 'sum'
+            }
+        ).rename(
+            columns={
+                'tweet_total': 'count_tweets'
+            }
+        ),
+        total_doses = data.groupby(
+            'state'
+        ).agg(
+            {
+                'total_doses': 'max'
+            }
+        )
+    ).merge(
+        cities[['Population','Lat','Long','GeoMap']],
+        how='left',
+        left_index=True,
+        right_index=True
+    )
+
+def prepare(data, cities):
+
+    # geo data counts press conferences before the gaps are back filled
+    geo_data = build_geo_data(data, cities)
+    data = data.drop(columns='press_date', errors='ignore')
+
+    #back filling missing values
+    data = data.bfill(axis = 0)
+
+    # Correlations (of the measured columns, before the derived sentiment features)
+    data_corr = data.corr(method='pearson')
+
+    # Net sentiment labels, colours, margins and entropies (see sentiment.py)
+    data = sentiment.add_sentiment_features(data)
+
+    # stored as contiguous, date sorted blocks per state (see StatePartitions)
+    data = data.astype(
+        {'state': 'category'}
+    ).sort_values(
+        ['state', 'date'],
+        kind='mergesort'
+    ).reset_index(drop=True)
+
+    return data, geo_data, data_corr
+
+def read_merged():
+
+    if not os.path.exists(MERGED_FILE):
+        _, data = read_csv()
+        return data
+
+    return feather.read_table(MERGED_FILE).to_pandas()
+
+def write_merged(data):
+
+    # the rows of a merge (see datamerge.py), kept as the source of every build
+    os.makedirs(STORE_DIR, exist_ok=True)
+    write_feather(data, MERGED_FILE)
+
+def read_rows():
+
+    if not os.path.exists(ROWS_FILE):
+        return None
+
+    return feather.read_table(ROWS_FILE).to_pandas()
+
+def append_rows(rows):
+
+    '''
+    Adds rows in the merged_aug_updated.csv layout to the appended rows, which
+    every build of the store includes.
+    '''
+
+    rows = rows.assign(date=parse_dates(rows['date']))
+    appended = read_rows()
+    if appended is not None:
+        rows = pd.concat([appended, rows], ignore_index=True)
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    write_feather(rows, ROWS_FILE)
+
+def source_data(data=None):
+
+    '''
+    The merged rows the store is built from: those of the last datamerge.py
+    run, else the merged CSV, or an already merged frame in their layout,
+    followed by the appended rows.
+    '''
+
+    if data is None:
+        data = read_merged()
+
+    appended = read_rows()
+    if appended is not None:
+        data = pd.concat([data, appended], ignore_index=True)
+
+    return data
+
+def source_rows(data=None):
+
+    # days streamed in by ingest.py keep their tweet columns, days rescored
+    # by transcripts.py their transcript columns
+    import ingest
+    import transcripts
+
+    return transcripts.apply_stored(ingest.apply_stored(source_data(data)))
+
+def load_csv():
+
+    return prepare(source_rows(), read_cities())
+
+#endregion
+
+#region Store
+
+def write_feather(frame, path):
+
+    # uncompressed so the file can be memory-mapped without decoding; written
+    # aside and renamed, so a reader never sees a partly written file
+    staging = '{0}.{1}.tmp'.format(path, os.getpid())
+    feather.write_feather(
+        pa.Table.from_pandas(frame, preserve_index=False),
+        staging,
+        compression='uncompressed'
+    )
+    os.replace(staging, path)
+
+def write_store(data, geo_data, data_corr):
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+    frames = {
+        'data': data,
+        'geo_data': geo_data.rename_axis('state').reset_index(),
+        'data_corr': data_corr.rename_axis('metric').reset_index()
+    }
+
+    for name, frame in frames.items():
+        write_feather(frame, STORE_FILES[name])
+
+    # workers started from now on attach to the new columns
+    if SHARED_DATA:
+        publish_shared(data)
+
+def read_frame(name):
+
+    frame = feather.read_table(STORE_FILES[name], memory_map=True).to_pandas()
+
+    if name == 'geo_data':
+        return frame.set_index('state')
+    if name == 'data_corr':
+        return frame.set_index('metric').rename_axis(None)
+
+    return frame
+
+def read_store():
+
+    return read_frame('data'), read_frame('geo_data'), read_frame('data_corr')
+
+def store_is_current():
+
+    if not all(os.path.exists(path) for path in STORE_FILES.values()):
+        return False
+
+    built = min(os.path.getmtime(path) for path in STORE_FILES.values())
+    source = max(os.path.getmtime(path) for path in [CITIES_CSV, MERGED_CSV, MERGED_FILE, ROWS_FILE] if os.path.exists(path))
+
+    return built >= source
+
+def build(data=None):
+
+    '''
+    Writes the store from the merged rows (see source_data), or from an
+    already merged frame in their layout, and the appended rows.
+    '''
+
+    write_store(*prepare(source_rows(data), read_cities()))
+
+def load():
+
+    if store_is_current():
+        if SHARED_DATA:
+            return read_shared()
+        return read_store()
+
+    print('Data store missing or out of date, loading from CSV (run `python store.py` to rebuild)')
+    return load_csv()
+
+#endregion
+
+#region Shared Columns
+
+def store_version():
+
+    # changes whenever the store is rewritten
+    stat = os.stat(STORE_FILES['data'])
+
+    return '{0}-{1}'.format(stat.st_mtime_ns, stat.st_size)
+
+def shared_version():
+
+    if not os.path.exists(SHARED_CURRENT):
+        return None
+
+    with open(SHARED_CURRENT) as file:
+        return json.load(file)['version']
+
+def write_columns(path, data):
+
+    os.makedirs(path)
+
+    columns = []
+    for i, (name, column) in enumerate(data.items()):
+        entry = {'name': name, 'file': '{0}.npy'.format(i)}
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            entry['categories'] = column.cat.categories.tolist()
+            entry['ordered'] = bool(column.cat.ordered)
+            values = column.cat.codes.to_numpy()
+        else:
+            values = column.to_numpy()
+        if values.dtype == object:
+            raise ValueError('Column {0} has no fixed width dtype to share'.format(name))
+        np.save(os.path.join(path, entry['file']), values)
+        columns.append(entry)
+
+    with open(os.path.join(path, 'columns.json'), 'w') as file:
+        json.dump({'rows': len(data), 'columns': columns}, file, indent=4)
+
+def publish_shared(data=None):
+
+    '''
+    Publishes the columns of the stored data for the current store version,
+    unless they already are. Safe to call from every worker: the first one
+    writes them under a file lock, the others find them published.
+    '''
+
+    import fcntl
+
+    os.makedirs(SHARED_DIR, exist_ok=True)
+
+    with open(os.path.join(SHARED_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        version = store_version()
+        if shared_version() == version and os.path.isdir(os.path.join(SHARED_DIR, version)):
+            return version
+
+        if data is None:
+            data = read_frame('data')
+
+        # written aside and renamed, so a worker never maps a partial version
+        staging = os.path.join(SHARED_DIR, '.staging-{0}'.format(os.getpid()))
+        shutil.rmtree(staging, ignore_errors=True)
+        write_columns(staging, data)
+        os.replace(staging, os.path.join(SHARED_DIR, version))
+
+        with open(SHARED_CURRENT + '.tmp', 'w') as file:
+            json.dump({'version': version}, file)
+        os.replace(SHARED_CURRENT + '.tmp', SHARED_CURRENT)
+
+        # older versions can go: processes still mapping them keep their pages
+        for entry in os.listdir(SHARED_DIR):
+            if entry != version and not entry.startswith('.') and os.path.isdir(os.path.join(SHARED_DIR, entry)):
+                shutil.rmtree(os.path.join(SHARED_DIR, entry), ignore_errors=True)
+
+    return version
+
+def attach_shared(version):
+
+    path = os.path.join(SHARED_DIR, version)
+    with open(os.path.join(path, 'columns.json')) as file:
+        layout = json.load(file)
+
+    columns = {}
+    for entry in layout['columns']:
+        values = np.load(os.path.join(path, entry['file']), mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(
+                values,
+                dtype=pd.CategoricalDtype(entry['categories'], ordered=entry['ordered'])
+            )
+        columns[entry['name']] = values
+
+    # copy=False keeps one block per column, each a view of its mapped file
+    return pd.DataFrame(columns, copy=False)
+
+def read_shared():
+
+    '''
+    The stored frames, with data attached read-only to the shared columns.
+    geo_data and data_corr hold a row per state and per metric, so they are
+    read from the store as usual.
+    '''
+
+    return attach_shared(publish_shared()), read_frame('geo_data'), read_frame('data_corr')
+
+#endregion
+
+#region Partitions
+
+class StatePartitions:
+
+    '''
+    Per-state index over data sorted by (state, date).
+
+    Each state occupies one contiguous run of rows, so its rows are a plain
+    positional slice: `get` is a dictionary lookup plus an iloc view, instead of
+    a boolean mask scan and copy of the whole frame.
+    '''
+
+    def __init__(self, data):
+
+        codes = data['state'].cat.codes.to_numpy()
+        if np.any(np.diff(codes) < 0):
+            data = data.sort_values(['state', 'date'], kind='mergesort').reset_index(drop=True)
+            codes = data['state'].cat.codes.to_numpy()
+
+        states = data['state'].cat.categories
+        bounds = np.searchsorted(codes, np.arange(len(states) + 1))
+
+        self.data = data
+        self.slices = {
+            state: slice(bounds[i], bounds[i + 1])
+            for i, state in enumerate(states)
+        }
+
+    def get(self, state):
+
+        return self.data.iloc[self.slices.get(state, slice(0, 0))]
+
+    def append(self, rows):
+
+        '''
+        New partitions with the rows added after the run of their state.
+        Appended days come after those already held, so the runs only need
+        interleaving rather than a sort of the whole data; rows dated inside
+        a state's history fall back to the full sort.
+        '''
+
+        data = self.data
+        states = data['state'].cat.categories.union(pd.Index(rows['state'].astype(str).unique()))
+        dtype = pd.CategoricalDtype(states)
+        if len(states) > len(data['state'].cat.categories):
+            data = data.astype({'state': dtype})
+
+        rows = rows.astype({'state': dtype}).sort_values(['state', 'date'], kind='mergesort')
+        combined = pd.concat([data, rows], ignore_index=True)
+
+        # the last day held by each state that received rows
+        dates = data['date'].to_numpy()
+        first = rows.groupby('state', observed=True)['date'].min()
+        for state, day in first.items():
+            held = self.slices.get(state)
+            if held is not None and held.stop > held.start and day <= dates[held.stop - 1]:
+                return StatePartitions(combined.sort_values(['state', 'date'], kind='mergesort').reset_index(drop=True))
+
+        # both halves are sorted by state, so a stable sort of the codes interleaves the runs
+        order = np.argsort(combined['state'].cat.codes.to_numpy(), kind='stable')
+
+        return StatePartitions(combined.take(order).reset_index(drop=True))
+
+#endregion
+
+#region Benchmark
+
+def benchmark(repeat=20):
+
+    build()
+
+    results = {}
+    for name, loader in [('csv', load_csv), ('store', read_store)]:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            loader()
+            timings.append(time.perf_counter() - start)
+        results[name] = sorted(timings)[len(timings) // 2]
+
+    print('Startup data load, median of {0} runs'.format(repeat))
+    for name, seconds in results.items():
+        print('  {0:<6} {1:8.2f} ms'.format(name, seconds * 1000))
+    print('  speedup {0:.1f}x'.format(results['csv'] / results['store']))
+
+    return results
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Build the dashboard data store.')
+    parser.add_argument('--shared', action='store_true', help='publish the shared columns (see DASH_SHARED_DATA)')
+    parser.add_argument('--benchmark', action='store_true', help='compare CSV and store load times')
+    parser.add_argument('--repeat', type=int, default=20, help='benchmark runs per loader')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.repeat)
+    else:
+        build()
+        print('Wrote data store to {0}'.format(STORE_DIR))
+        if args.shared:
+            print('Published shared columns {0} to {1}'.format(publish_shared(), SHARED_DIR))
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the dashboard modules import each other by name, as when run from Dash
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def frame():
+
+    '''
+    Two states of 60 days of correlated metrics and sentiment triples, with
+    gaps, sorted by (state, date) as in the store.
+    '''
+
+    rng = np.random.default_rng(7)
+    frames = []
+    for state in ['NSW', 'VIC']:
+        days = 60
+        base = rng.normal(size=days)
+        triples = rng.dirichlet([2, 3, 1], size=(2, days))
+        state_frame = pd.DataFrame({
+            'state': state,
+            'date': pd.date_range('2021-08-01', periods=days),
+            'daily_newcase': 100 + 20 * base + rng.normal(size=days),
+            'daily_doses': 5000 - 800 * base + 300 * rng.normal(size=days),
+            'transcript_sentiment_positive': triples[0, :, 0],
+            'transcript_sentiment_neutral': triples[0, :, 1],
+            'transcript_sentiment_negative': triples[0, :, 2],
+            'avr_positive_tweet_sentiment': triples[1, :, 0],
+            'avr_neutral_tweet_sentiment': triples[1, :, 1],
+            'avr_negative_tweet_sentiment': triples[1, :, 2]
+        })
+        frames.append(state_frame)
+
+    frame = pd.concat(frames, ignore_index=True)
+
+    # gaps, as on the days without a press conference
+    gaps = rng.random(len(frame)) < 0.2
+    frame.loc[gaps, ['transcript_sentiment_positive', 'transcript_sentiment_neutral', 'transcript_sentiment_negative']] = np.nan
+    frame.loc[rng.random(len(frame)) < 0.1, 'daily_doses'] = np.nan
+
+    return frame.astype({'state': 'category'})
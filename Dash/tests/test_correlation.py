@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+import correlation
+import store
+
+COLUMNS = ['daily_newcase', 'daily_doses', 'transcript_sentiment_positive', 'avr_negative_tweet_sentiment']
+
+
+@pytest.fixture
+def engine(frame):
+
+    return correlation.CorrelationEngine(store.StatePartitions(frame), COLUMNS)
+
+
+@pytest.mark.parametrize('window', [None] + correlation.WINDOWS)
+def test_state_matrix_matches_pandas(frame, engine, window):
+
+    rows = frame[frame['state'] == 'VIC']
+    if window:
+        rows = rows[rows['date'] > rows['date'].max() - np.timedelta64(window, 'D')]
+
+    expected = rows[COLUMNS].corr(method='pearson')
+
+    np.testing.assert_allclose(engine.matrix('VIC', window).to_numpy(), expected.to_numpy(), atol=1e-10)
+
+def test_all_states_matrix_matches_pandas(frame, engine):
+
+    np.testing.assert_allclose(engine.matrix(None).to_numpy(), frame[COLUMNS].corr().to_numpy(), atol=1e-10)
+
+def test_rolling_matches_pandas(frame, engine):
+
+    rows = frame[frame['state'] == 'NSW'].reset_index(drop=True)
+    dates, matrices = engine.rolling('NSW', 14)
+
+    for end in [5, 20, len(rows) - 1]:
+        window = rows[(rows['date'] > rows['date'][end] - np.timedelta64(14, 'D')) & (rows.index <= end)]
+        np.testing.assert_allclose(matrices[end], window[COLUMNS].corr().to_numpy(), atol=1e-10)
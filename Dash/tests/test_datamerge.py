@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datamerge
+
+
+def source(tmp_path, name, text):
+
+    path = tmp_path / name
+    path.write_text(text)
+
+    return datamerge.read_source(str(path))
+
+@pytest.fixture
+def cases(tmp_path):
+
+    # dd/mm/yyyy and ISO dates, lower case states, and a repeated day
+    return datamerge.cases_daily(source(tmp_path, 'cases.csv', '\n'.join([
+        '"",state,date,daily_newcase,total_doses,daily_doses',
+        '1,nsw,01/08/2021,10,100,5',
+        '2,NSW,2021-08-02,11,110,6',
+        '3,NSW,03/08/2021,12,120,7',
+        '4,NSW,2021-08-04,13,130,8',
+        '5,vic,2021-08-01,20,200,9',
+        '6,VIC,02/08/2021,21,210,10',
+        '7,VIC,02/08/2021,22,220,11'
+    ])))
+
+@pytest.fixture
+def transcripts(tmp_path):
+
+    # two segments on NSW 01/08, averaged into one day
+    return datamerge.transcripts_daily(source(tmp_path, 'transcripts.csv', '\n'.join([
+        'state,date,positive,neutral,negative',
+        'NSW,01/08/2021,0.2,0.6,0.2',
+        'NSW,2021-08-01,0.4,0.4,0.2',
+        'NSW,2021-08-03,0.1,0.3,0.6',
+        'VIC,2021-07-31,0.5,0.4,0.1'
+    ])))
+
+@pytest.fixture
+def tweets(tmp_path):
+
+    return datamerge.tweets_daily(source(tmp_path, 'tweets.csv', '\n'.join([
+        'state,date,twitter_sentiment_positive,twitter_sentiment_neutral,twitter_sentiment_negative',
+        'NSW,2021-08-02,0.6,0.3,0.1',
+        'NSW,02/08/2021,0.2,0.5,0.3',
+        'VIC,2021-08-01,0.1,0.1,0.8'
+    ])))
+
+def column(merged, name):
+
+    return merged.set_index(['state', 'date'])[name]
+
+def day(state, date):
+
+    return (state, pd.Timestamp(date))
+
+def test_dates_and_duplicate_days(cases):
+
+    assert list(cases.index) == [
+        day('NSW', '2021-08-01'), day('NSW', '2021-08-02'), day('NSW', '2021-08-03'), day('NSW', '2021-08-04'),
+        day('VIC', '2021-08-01'), day('VIC', '2021-08-02')
+    ]
+    # a repeated day keeps its last row
+    assert cases.loc[day('VIC', '2021-08-02'), 'daily_newcase'] == 22
+
+def test_exact_join(cases, transcripts, tweets):
+
+    merged = datamerge.merge(cases, transcripts, tweets)
+
+    assert list(merged.columns) == datamerge.MERGED_COLUMNS
+    assert len(merged) == len(cases)
+
+    positive = column(merged, 'transcript_sentiment_positive')
+    assert positive[day('NSW', '2021-08-01')] == pytest.approx(0.3)
+    assert positive[day('NSW', '2021-08-03')] == pytest.approx(0.1)
+    assert np.isnan(positive[day('NSW', '2021-08-02')])
+    assert np.isnan(positive[day('VIC', '2021-08-01')])
+
+    # scored tweets are averaged and counted per day
+    assert column(merged, 'avr_positive_tweet_sentiment')[day('NSW', '2021-08-02')] == pytest.approx(0.4)
+    assert column(merged, 'tweet_total')[day('NSW', '2021-08-02')] == 2
+    assert np.isnan(column(merged, 'tweet_total')[day('NSW', '2021-08-01')])
+
+def test_as_of_join(cases, transcripts):
+
+    merged = datamerge.merge(cases, transcripts, press_tolerance=1)
+
+    positive = column(merged, 'transcript_sentiment_positive')
+    press_date = column(merged, 'press_date')
+
+    # the day after a press conference takes its scores, two days after does not
+    assert positive[day('NSW', '2021-08-02')] == pytest.approx(0.3)
+    assert press_date[day('NSW', '2021-08-02')] == pd.Timestamp('2021-08-01')
+    assert positive[day('NSW', '2021-08-04')] == pytest.approx(0.1)
+    assert positive[day('VIC', '2021-08-01')] == pytest.approx(0.5)
+    assert np.isnan(positive[day('VIC', '2021-08-02')])
+
+    # the press conferences themselves keep their own day
+    assert press_date[day('NSW', '2021-08-03')] == pd.Timestamp('2021-08-03')
+
+def test_as_of_join_wider_tolerance(cases, transcripts):
+
+    merged = datamerge.merge(cases, transcripts, press_tolerance=30)
+
+    positive = column(merged, 'transcript_sentiment_positive')
+    assert positive[day('VIC', '2021-08-02')] == pytest.approx(0.5)
+    assert positive.notna().all()
+
+def test_zero_tolerance_is_exact_join(cases, transcripts):
+
+    merged = datamerge.merge(cases, transcripts, press_tolerance=0)
+
+    assert 'press_date' not in merged
+    assert column(merged, 'transcript_sentiment_positive').notna().sum() == 2
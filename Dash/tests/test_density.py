@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import density
+
+stats = pytest.importorskip('scipy.stats')
+
+
+@pytest.fixture
+def sample():
+
+    rng = np.random.default_rng(11)
+    x = rng.normal(0.0, 1.0, size=2000)
+    # a different centre and spread per axis, so a transposed grid shows
+    y = 3.0 + 0.5 * x + rng.normal(0.0, 2.0, size=2000)
+
+    return x, y
+
+def test_marginals_match_histograms(sample):
+
+    x, y = sample
+    grid = density.binned_kde(x, y, density.extent(x), density.extent(y), bins=40)
+
+    edges = np.linspace(*density.extent(x), 41)
+    np.testing.assert_array_equal(grid['x_counts'], np.histogram(x, bins=edges)[0])
+    assert grid['rows'] == len(x)
+
+def test_binned_kde_matches_gaussian_kde(sample):
+
+    x, y = sample
+    x_extent, y_extent = density.extent(x), density.extent(y)
+    grid = density.binned_kde(x, y, x_extent, y_extent, bins=40)
+
+    # the exact product kernel estimate with the same per-axis bandwidths
+    bin_widths = (grid['x'][1] - grid['x'][0], grid['y'][1] - grid['y'][0])
+    bandwidths = [density.scott_bandwidth(values, width) for values, width in zip([x, y], bin_widths)]
+    xx, yy = np.meshgrid(grid['x'], grid['y'])
+    exact = stats.norm.pdf((xx[..., None] - x) / bandwidths[0]) * stats.norm.pdf((yy[..., None] - y) / bandwidths[1])
+    exact = exact.sum(axis=-1) / (bandwidths[0] * bandwidths[1])
+
+    # smoothed counts per bin, as a density; binning costs about 2% at the peak
+    estimate = grid['z'] / (bin_widths[0] * bin_widths[1])
+
+    assert np.abs(estimate - exact).max() < 0.05 * exact.max()
+
+def test_missing_rows_are_dropped(sample):
+
+    x, y = sample
+    x = x.copy()
+    x[:10] = np.nan
+
+    grid = density.binned_kde(x, y, density.extent(x), density.extent(y), bins=40)
+
+    assert grid['rows'] == len(x) - 10
+    assert grid['x_counts'].sum() == len(x) - 10
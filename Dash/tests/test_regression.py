@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import regression
+
+sm = pytest.importorskip('statsmodels.api')
+
+X = 'transcript_sentiment_positive'
+Y = 'avr_negative_tweet_sentiment'
+
+
+@pytest.fixture
+def fit_and_ols(frame):
+
+    rows = frame[frame['state'] == 'VIC']
+    fit = regression.fit_pairs(rows, [X, Y, 'daily_doses'])[(X, Y)]
+
+    # the rows where both values are present, as the px trendline fit them
+    both = rows[[X, Y]].dropna()
+    ols = sm.OLS(both[Y], sm.add_constant(both[X])).fit()
+
+    return fit, ols
+
+def test_fit_matches_statsmodels(fit_and_ols):
+
+    fit, ols = fit_and_ols
+
+    assert fit['n'] == int(ols.nobs)
+    assert fit['intercept'] == pytest.approx(ols.params['const'], abs=1e-10)
+    assert fit['slope'] == pytest.approx(ols.params[X], abs=1e-10)
+    assert fit['r2'] == pytest.approx(ols.rsquared, abs=1e-10)
+
+def test_band_matches_statsmodels(fit_and_ols):
+
+    fit, ols = fit_and_ols
+
+    x = np.linspace(fit['x_min'], fit['x_max'], 7)
+    y, lower, upper = regression.band(fit, x)
+    interval = ols.get_prediction(sm.add_constant(x, has_constant='add')).conf_int(alpha=0.05)
+
+    np.testing.assert_allclose(y, ols.predict(sm.add_constant(x, has_constant='add')), atol=1e-10)
+    np.testing.assert_allclose(lower, interval[:, 0], atol=1e-10)
+    np.testing.assert_allclose(upper, interval[:, 1], atol=1e-10)
+
+def test_append_matches_refit(frame):
+
+    import store
+
+    columns = [X, Y, 'daily_doses']
+    head = frame[frame['date'] < '2021-09-20']
+    tail = frame[frame['date'] >= '2021-09-20']
+
+    appended = regression.Regressions(store.StatePartitions(head), columns)
+    appended.append(tail)
+    refit = regression.Regressions(store.StatePartitions(frame), columns)
+
+    for state in ['NSW', 'VIC']:
+        assert appended.fits[state].keys() == refit.fits[state].keys()
+        for pair, fit in refit.fits[state].items():
+            assert appended.fits[state][pair] == pytest.approx(fit, rel=1e-9, abs=1e-12)
@@ -0,0 +1,45 @@
+import pytest
+
+import scoring
+
+
+@pytest.fixture(scope='module')
+def lexicon():
+
+    return scoring.load_lexicon()
+
+
+def valence(text, lexicon):
+
+    return scoring.valences(text.split(), lexicon)[-1]
+
+
+@pytest.mark.parametrize('word', ['good', 'bad'])
+def test_dampener_reduces_valence(word, lexicon):
+
+    plain = valence(word, lexicon)
+    for dampener in ['barely', 'hardly', 'slightly', 'somewhat', 'little']:
+        damped = valence(dampener + ' ' + word, lexicon)
+        assert abs(damped) < abs(plain)
+        assert damped * plain > 0
+
+
+@pytest.mark.parametrize('word', ['good', 'bad'])
+def test_booster_increases_valence(word, lexicon):
+
+    plain = valence(word, lexicon)
+    boosted = valence('very ' + word, lexicon)
+
+    assert abs(boosted) > abs(plain)
+    assert boosted * plain > 0
+
+
+def test_dampened_scores_below_boosted(lexicon):
+
+    assert scoring.score('slightly good', lexicon)[0] < scoring.score('very good', lexicon)[0]
+    assert scoring.score('slightly bad', lexicon)[2] < scoring.score('very bad', lexicon)[2]
+
+
+def test_negation_flips_valence(lexicon):
+
+    assert valence('not good', lexicon) < 0 < valence('good', lexicon)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import sentiment
+
+stats = pytest.importorskip('scipy.stats')
+
+COLUMNS = sentiment.SOURCES['transcript']
+
+
+@pytest.fixture
+def features(frame):
+
+    # a row with one missing score among the complete and empty ones
+    frame.loc[3, COLUMNS[1]] = np.nan
+
+    return frame, sentiment.add_sentiment_features(frame, {'transcript': COLUMNS})
+
+def test_labels_match_idxmax(features):
+
+    frame, result = features
+    present = frame[COLUMNS].notna().any(axis=1)
+
+    expected = frame.loc[present, COLUMNS].idxmax(axis=1).map(dict(zip(COLUMNS, sentiment.LABELS)))
+
+    assert (result.loc[present, 'net_transcript_sentiment'].astype(str) == expected).all()
+    assert result.loc[~present, 'net_transcript_sentiment'].isna().all()
+
+def test_margin_matches_sorted_scores(features):
+
+    frame, result = features
+    complete = frame[COLUMNS].notna().all(axis=1)
+
+    ranked = np.sort(frame.loc[complete, COLUMNS].to_numpy(), axis=1)
+
+    np.testing.assert_allclose(result.loc[complete, 'net_transcript_sentiment_margin'], ranked[:, -1] - ranked[:, -2], atol=1e-12)
+    assert result.loc[~frame[COLUMNS].notna().any(axis=1), 'net_transcript_sentiment_margin'].isna().all()
+
+def test_entropy_matches_scipy(features):
+
+    frame, result = features
+    present = frame[COLUMNS].notna().any(axis=1)
+
+    # missing scores count as zero, the rest is normalised to sum to one
+    expected = [
+        stats.entropy(np.nan_to_num(row), base=len(COLUMNS))
+        for row in frame.loc[present, COLUMNS].to_numpy()
+    ]
+
+    np.testing.assert_allclose(result.loc[present, 'net_transcript_sentiment_entropy'], expected, atol=1e-12)
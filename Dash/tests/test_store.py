@@ -0,0 +1,43 @@
+import pandas as pd
+
+import store
+
+
+def sorted_partitions(frame):
+
+    return store.StatePartitions(frame.sort_values(['state', 'date'], kind='mergesort').reset_index(drop=True))
+
+def assert_same(partitions, expected):
+
+    pd.testing.assert_frame_equal(partitions.data, expected.data)
+    assert partitions.slices == expected.slices
+
+def test_append_later_days(frame):
+
+    head = frame[frame['date'] < '2021-09-20']
+    tail = frame[frame['date'] >= '2021-09-20']
+
+    assert_same(store.StatePartitions(head).append(tail), sorted_partitions(frame))
+
+def test_append_overlapping_days(frame):
+
+    # rows dated inside a state's history take the full sort
+    rows = frame[frame['date'] < '2021-08-10']
+
+    assert_same(
+        store.StatePartitions(frame).append(rows),
+        sorted_partitions(pd.concat([frame, rows], ignore_index=True))
+    )
+
+def test_append_new_state(frame):
+
+    rows = frame[frame['state'] == 'VIC'].assign(state='ACT')
+
+    partitions = store.StatePartitions(frame).append(rows)
+
+    assert list(partitions.slices) == ['ACT', 'NSW', 'VIC']
+    pd.testing.assert_frame_equal(
+        partitions.get('ACT').drop(columns='state').reset_index(drop=True),
+        rows.drop(columns='state').reset_index(drop=True)
+    )
+    assert len(partitions.get('VIC')) == len(rows)
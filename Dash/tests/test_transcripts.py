@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+import pytest
+
+import store
+import transcripts
+
+DASH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RECORDS = {
+    'vic.txt': [
+        '2021-08-02\nCases are down today. We are very pleased with the progress. Mr. Smith will speak next.',
+        '2021-08-02\nThe outbreak is a terrible setback! Hospitals are under pressure.',
+        '03/08/2021\nVaccination rates are good. Please book your appointment.',
+        'not a date\nThis record has no date and is skipped.',
+        '2021-08-04\nWe are not happy with the numbers. Stay home, stay safe.'
+    ],
+    'nsw.txt': [
+        '2021-08-02\nRestrictions will ease slightly. That is great news for business.',
+        '2021-08-03\nThere were sad losses overnight. Our thoughts are with the families.',
+        '2021-08-05\nTesting numbers are strong. Thank you all.'
+    ]
+}
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+
+    # state names from the bundled cities, wherever the tests are run from
+    monkeypatch.setattr(store, 'CITIES_CSV', os.path.join(DASH, 'data', 'australian_cities.csv'))
+
+    paths = []
+    for name, records in RECORDS.items():
+        path = tmp_path / name
+        path.write_text(' **\n'.join(records), encoding='utf-8')
+        paths.append(str(path))
+
+    return paths
+
+def scorer(paths, folder):
+
+    # a checkpoint after every finished record
+    return transcripts.TranscriptScorer(
+        paths,
+        checkpoint=str(folder / 'checkpoint.json'),
+        sentences=str(folder / 'sentences.csv'),
+        workers=1,
+        batch_size=3,
+        interval=0.0
+    )
+
+def uninterrupted(paths, folder):
+
+    folder.mkdir()
+    daily = scorer(paths, folder).run()
+
+    return daily, pd.read_csv(folder / 'sentences.csv')
+
+def test_resume_matches_uninterrupted_run(paths, tmp_path, monkeypatch):
+
+    expected_daily, expected_sentences = uninterrupted(paths, tmp_path / 'full')
+
+    finish_record = transcripts.TranscriptScorer.finish_record
+    finished = []
+
+    def interrupted(self, meta, record):
+        if len(finished) == 2:
+            raise KeyboardInterrupt
+        finished.append(meta['record'])
+        finish_record(self, meta, record)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(transcripts.TranscriptScorer, 'finish_record', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            scorer(paths, tmp_path).run()
+
+    # sentences written after the last checkpoint, as by a run killed mid-write
+    with open(tmp_path / 'sentences.csv', 'a', encoding='utf-8') as file:
+        file.write(paths[0] + ',2,0,VIC,2021-08-03,4,0.1')
+
+    resumed = scorer(paths, tmp_path)
+    daily = resumed.run()
+
+    assert resumed.stats['records'] == sum(len(records) for records in RECORDS.values()) - 2
+    pd.testing.assert_frame_equal(daily, expected_daily)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'sentences.csv'), expected_sentences)
+
+def test_changed_file_is_scored_again(paths, tmp_path):
+
+    scorer(paths, tmp_path).run()
+
+    # nsw.txt loses a record and gets a new one
+    records = RECORDS['nsw.txt'][:1] + ['2021-08-06\nThe case numbers are awful. This is a difficult week.']
+    with open(paths[1], 'w', encoding='utf-8') as file:
+        file.write(' **\n'.join(records))
+
+    expected_daily, expected_sentences = uninterrupted(paths, tmp_path / 'full')
+
+    daily = scorer(paths, tmp_path).run()
+    sentences = pd.read_csv(tmp_path / 'sentences.csv')
+
+    pd.testing.assert_frame_equal(daily, expected_daily)
+    pd.testing.assert_frame_equal(sentences, expected_sentences)
+    assert '2021-08-05' not in set(sentences['date'])
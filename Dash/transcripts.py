@@ -0,0 +1,483 @@
+'''
+
+Sentence level scoring of press conference transcripts.
+
+The transcript columns used to come from the cognitiveservices Java tool,
+which sent each transcript to Azure in 5000 character segments and averaged
+the segment scores. Here transcripts are read as a stream in the same .txt
+layout (records separated by `**`, the date on the first line of each
+record), split into sentences and scored in parallel batches with scoring.py.
+The sentence scores of every state and day are averaged weighted by the number
+of words in each sentence, so a long statement counts for more than a short
+aside, into the transcript_sentiment_positive/neutral/negative columns.
+
+Progress is checkpointed: every few seconds the number of records finished
+and the sums of their scores per file, and the length of the sentence output,
+are written atomically to the checkpoint file. A run started again with the
+same checkpoint skips the finished records and carries on from there. A file
+that changed since is scored again from the start, its sums and sentences
+dropped.
+
+The state of a file comes from --state, or else from its name (vic.txt,
+NSW_pressers.txt, queensland-2021.txt).
+
+With --apply the daily columns are kept in ./data/store/transcripts.feather,
+which `python store.py` applies to the merged rows before preparing the
+store, and written into the current store as well.
+
+Usage:
+    python transcripts.py transcripts/ -o transcript_daily.csv
+    python transcripts.py transcripts/*.txt -o transcript_daily.csv --sentences sentences.csv --apply
+
+'''
+
+import argparse
+from collections import deque
+import glob
+import json
+import os
+import re
+import time
+
+import pandas as pd
+import pyarrow.feather as feather
+
+import ingest
+import scoring
+import sentiment
+import store
+
+#region Settings
+
+CHECKPOINT = os.path.join(store.DATA_DIR, 'transcripts.checkpoint.json')
+DAILY_FILE = os.path.join(store.STORE_DIR, 'transcripts.feather')
+CHECKPOINT_INTERVAL = 30.0
+
+RECORD_SEPARATOR = '**'
+READ_SIZE = 1 << 16
+
+# a sentence ends at . ! or ? followed by space, unless the word is a title
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+TITLES = {'mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'st.', 'no.', 'vs.', 'e.g.', 'i.e.'}
+
+SENTENCE_COLUMNS = ['file', 'record', 'sentence', 'state', 'date', 'words', 'positive', 'neutral', 'negative']
+
+#endregion
+
+#region Read
+
+def read_records(path, skip=0):
+
+    '''
+    Yields (index, text) of the `**` separated records of a transcript file,
+    reading it in chunks, from record `skip` on.
+    '''
+
+    index = 0
+    buffer = ''
+    with open(path, encoding='utf-8') as file:
+        while True:
+            chunk = file.read(READ_SIZE)
+            buffer += chunk
+            parts = buffer.split(RECORD_SEPARATOR)
+            # the last part may continue in the next chunk
+            buffer = parts.pop() if chunk else ''
+            for part in parts:
+                if part.strip():
+                    if index >= skip:
+                        yield index, part
+                    index += 1
+            if not chunk:
+                return
+
+def parse_record(text):
+
+    # the first line is the date, as in the Java tool
+    header, _, body = text.strip().partition('\n')
+
+    return ingest.parse_day(header.strip()), body
+
+def split_sentences(text):
+
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        candidate = text[start:match.start()].strip()
+        words = candidate.split()
+        if words and words[-1].lower() in TITLES:
+            continue
+        if candidate:
+            sentences.append(candidate)
+        start = match.end()
+
+    rest = text[start:].strip()
+    if rest:
+        sentences.append(rest)
+
+    return sentences
+
+def file_state(path, names):
+
+    for token in re.split(r'[^a-z]+', os.path.splitext(os.path.basename(path))[0].lower()):
+        if token in names:
+            return names[token]
+
+    return None
+
+#endregion
+
+#region Checkpoint
+
+def read_checkpoint(path):
+
+    if not path or not os.path.exists(path):
+        return {'files': {}, 'sentences_bytes': 0}
+
+    with open(path) as file:
+        return json.load(file)
+
+def write_checkpoint(path, checkpoint):
+
+    # written aside and renamed, so an interrupted write leaves the last one
+    with open(path + '.tmp', 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(path + '.tmp', path)
+
+def file_signature(path):
+
+    stat = os.stat(path)
+
+    return [stat.st_size, stat.st_mtime_ns]
+
+def new_file(path):
+
+    # records finished and the word weighted sums per 'STATE|date' of a file
+    return {'records': 0, 'signature': file_signature(path), 'sums': {}}
+
+#endregion
+
+#region Score
+
+class TranscriptScorer:
+
+    '''
+    Scores the sentences of transcript files and keeps word weighted sums of
+    the scores per (state, date), checkpointing after finished records.
+    '''
+
+    def __init__(self, paths, state=None, checkpoint=CHECKPOINT, sentences=None,
+                 workers=None, batch_size=scoring.BATCH_SIZE, interval=CHECKPOINT_INTERVAL):
+
+        self.paths = paths
+        self.state = state
+        self.checkpoint_path = checkpoint
+        self.sentences_path = sentences
+        self.workers = workers
+        self.batch_size = batch_size
+        self.interval = interval
+
+        self.names = ingest.state_names()
+        self.checkpoint = read_checkpoint(checkpoint)
+        self.pending_sentences = []
+        self.stats = {'records': 0, 'sentences': 0, 'skipped_records': 0}
+
+        # a changed file is scored again from its first record
+        changed = []
+        for path in paths:
+            done = self.checkpoint['files'].get(path)
+            if done and done['signature'] != file_signature(path):
+                print('{0} changed since the checkpoint, scoring it again'.format(path))
+                self.checkpoint['files'][path] = new_file(path)
+                changed.append(path)
+
+        if changed and self.sentences_path:
+            self.drop_sentences(changed)
+
+    def sentences(self):
+
+        '''
+        Yields (meta, sentence) for every sentence of the unfinished records.
+        The last sentence of a record is flagged, and a record without
+        sentences yields one empty, weightless sentence so it is still marked
+        as finished.
+        '''
+
+        for path in self.paths:
+            state = self.state or file_state(path, self.names)
+            if state is None:
+                print('No state for {0}, pass --state or name the file after the state'.format(path))
+                continue
+
+            done = self.checkpoint['files'].setdefault(path, new_file(path))
+            for index, text in read_records(path, skip=done['records']):
+                date, body = parse_record(text)
+                sentences = split_sentences(body) if date is not None else []
+                if date is None:
+                    self.stats['skipped_records'] += 1
+                for i, sentence in enumerate(sentences or ['']):
+                    meta = {
+                        'file': path,
+                        'record': index,
+                        'sentence': i,
+                        'state': state,
+                        'date': date.isoformat() if date else None,
+                        'words': len(sentence.split()),
+                        'last': i == max(len(sentences) - 1, 0)
+                    }
+                    yield meta, sentence
+
+    def batches(self, metas):
+
+        batch = []
+        for meta, sentence in self.sentences():
+            metas.append(meta)
+            batch.append(sentence)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self):
+
+        metas = deque()
+        record = [0.0, 0.0, 0.0, 0.0]
+        last_checkpoint = time.monotonic()
+
+        # full precision here, the averages are rounded on output
+        for scores in scoring.score_batches(self.batches(metas), self.workers, decimals=6):
+            for triple in scores:
+                meta = metas.popleft()
+                weight = meta['words']
+                record[0] += weight
+                for i, value in enumerate(triple):
+                    record[i + 1] += weight * value
+
+                if weight:
+                    self.stats['sentences'] += 1
+                    if self.sentences_path:
+                        self.pending_sentences.append(
+                            [meta[column] for column in SENTENCE_COLUMNS[:6]] + list(triple)
+                        )
+
+                if meta['last']:
+                    self.finish_record(meta, record)
+                    record = [0.0, 0.0, 0.0, 0.0]
+                    if time.monotonic() - last_checkpoint >= self.interval:
+                        self.save()
+                        last_checkpoint = time.monotonic()
+
+        self.save()
+
+        return self.daily()
+
+    def finish_record(self, meta, record):
+
+        self.stats['records'] += 1
+        self.checkpoint['files'][meta['file']]['records'] = meta['record'] + 1
+
+        if meta['date'] is None or record[0] == 0:
+            return
+
+        key = '{0}|{1}'.format(meta['state'], meta['date'])
+        sums = self.checkpoint['files'][meta['file']]['sums'].setdefault(key, [0.0, 0.0, 0.0, 0.0])
+        for i, value in enumerate(record):
+            sums[i] += value
+
+    def drop_sentences(self, paths):
+
+        # the sentences written up to the checkpoint, less those of the changed files
+        if not os.path.exists(self.sentences_path):
+            return
+
+        with open(self.sentences_path, 'r+', encoding='utf-8', newline='') as file:
+            file.truncate(self.checkpoint['sentences_bytes'])
+            file.seek(0)
+            kept = pd.read_csv(file) if self.checkpoint['sentences_bytes'] else pd.DataFrame(columns=SENTENCE_COLUMNS)
+            kept = kept[~kept['file'].isin(paths)]
+            file.seek(0)
+            file.truncate()
+            kept.to_csv(file, index=False)
+            self.checkpoint['sentences_bytes'] = file.tell()
+
+    def save(self):
+
+        if self.sentences_path:
+            # drop sentences written after the last checkpoint by an interrupted run
+            exists = os.path.exists(self.sentences_path)
+            with open(self.sentences_path, 'a+', encoding='utf-8', newline='') as file:
+                file.truncate(self.checkpoint['sentences_bytes'] if exists else 0)
+                file.seek(0, os.SEEK_END)
+                pd.DataFrame(self.pending_sentences, columns=SENTENCE_COLUMNS).to_csv(
+                    file, header=file.tell() == 0, index=False
+                )
+                self.checkpoint['sentences_bytes'] = file.tell()
+            self.pending_sentences = []
+
+        if self.checkpoint_path:
+            write_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def daily(self):
+
+        '''
+        The per-state, per-day transcript columns from the weighted sums.
+        '''
+
+        sums = {}
+        for done in self.checkpoint['files'].values():
+            for key, values in done['sums'].items():
+                total = sums.setdefault(key, [0.0, 0.0, 0.0, 0.0])
+                for i, value in enumerate(values):
+                    total[i] += value
+
+        rows = []
+        for key, (weight, positive, neutral, negative) in sorted(sums.items()):
+            state, date = key.split('|')
+            rows.append([state, pd.Timestamp(date), positive / weight, neutral / weight, negative / weight])
+
+        return pd.DataFrame(rows, columns=['state', 'date'] + sentiment.SOURCES['transcript'])
+
+#endregion
+
+#region Store
+
+def write_daily(daily):
+
+    # the days of earlier runs are kept, days scored again take the new values
+    table = pd.concat([read_daily(), daily], ignore_index=True).drop_duplicates(
+        ['state', 'date'], keep='last'
+    ).sort_values(['state', 'date'], kind='mergesort').reset_index(drop=True)
+
+    os.makedirs(store.STORE_DIR, exist_ok=True)
+    store.write_feather(table, DAILY_FILE)
+
+def read_daily():
+
+    if not os.path.exists(DAILY_FILE):
+        return pd.DataFrame(columns=['state', 'date'] + sentiment.SOURCES['transcript'])
+
+    return feather.read_table(DAILY_FILE).to_pandas()
+
+def apply_rows(data, daily):
+
+    '''
+    The merged rows (merged_aug_updated.csv layout) with the transcript columns
+    of every (state, date) in daily replaced, before the store is prepared
+    from them.
+    '''
+
+    columns = sentiment.SOURCES['transcript']
+    position = ingest.table_keys(daily).get_indexer(ingest.table_keys(data))
+    hit = position >= 0
+    if not hit.any():
+        return data
+
+    data = data.copy()
+    data.loc[hit, columns] = daily[columns].to_numpy()[position[hit]]
+
+    # a rescored day holds its own press conference, not one carried forward
+    if 'press_date' in data:
+        data.loc[hit, 'press_date'] = data.loc[hit, 'date']
+
+    return data
+
+def apply_stored(data):
+
+    # used when the store is rebuilt from the CSVs, so rescored days are kept
+    if not os.path.exists(DAILY_FILE):
+        return data
+
+    return apply_rows(data, read_daily())
+
+def press_days():
+
+    '''
+    The (state, date) keys geo_data counts a press conference for: the merged
+    rows with a transcript score, with the stored days applied, before they
+    are back filled.
+    '''
+
+    rows = store.source_rows()
+
+    return ingest.table_keys(rows[store.press_rows(rows)])
+
+def apply_daily(data, geo_data, data_corr, daily, counted):
+
+    '''
+    The stored frames with the transcript columns of every (state, date) row
+    in daily replaced, where counted are the press_days() of the store.
+    Returns the frames and the number of rows updated.
+    '''
+
+    columns = sentiment.SOURCES['transcript']
+    rows = ingest.table_keys(data)
+    position = ingest.table_keys(daily).get_indexer(rows)
+    hit = position >= 0
+    if not hit.any():
+        return data, geo_data, data_corr, 0
+
+    # geo_data counts the days with a press conference per state
+    added = pd.Series(
+        (~rows[hit].isin(counted)).astype(int),
+        index=rows[hit].get_level_values(0)
+    ).groupby(level=0).sum()
+    geo_data = geo_data.copy()
+    geo_data.loc[added.index, 'count_press'] += added
+
+    data = data.copy()
+    data.loc[hit, columns] = daily[columns].to_numpy()[position[hit]]
+
+    data = sentiment.add_sentiment_features(data, {'transcript': columns})
+    data_corr = data[data_corr.columns].corr(method='pearson')
+
+    return data, geo_data, data_corr, int(hit.sum())
+
+#endregion
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Score press conference transcripts sentence by sentence.')
+    parser.add_argument('paths', nargs='+', help='transcript .txt files or folders of them')
+    parser.add_argument('-o', '--output', required=True, help='csv of the per-state, per-day transcript columns')
+    parser.add_argument('--state', help='state of every transcript (default: from the file name)')
+    parser.add_argument('--sentences', help='csv of the sentence scores')
+    parser.add_argument('--checkpoint', default=CHECKPOINT, help='checkpoint file to resume from')
+    parser.add_argument('--checkpoint-interval', type=float, default=CHECKPOINT_INTERVAL, help='seconds between checkpoints')
+    parser.add_argument('--workers', type=int, default=None, help='scoring processes (default: one per CPU)')
+    parser.add_argument('--batch-size', type=int, default=scoring.BATCH_SIZE, help='sentences per batch')
+    parser.add_argument('--apply', action='store_true', help='write the transcript columns into the data store')
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths:
+        paths.extend(sorted(glob.glob(os.path.join(path, '*.txt'))) if os.path.isdir(path) else [path])
+
+    scorer = TranscriptScorer(
+        paths, args.state, args.checkpoint, args.sentences, args.workers, args.batch_size, args.checkpoint_interval
+    )
+
+    start = time.perf_counter()
+    daily = scorer.run()
+    elapsed = time.perf_counter() - start
+
+    daily.assign(date=daily['date'].dt.strftime('%d/%m/%Y')).to_csv(args.output, index=False, float_format='%.6g')
+
+    print('Scored {0} sentence(s) of {1} record(s) in {2:.2f}s ({3:.0f} sentences/s), {4} record(s) without a date'.format(
+        scorer.stats['sentences'], scorer.stats['records'], elapsed,
+        scorer.stats['sentences'] / elapsed if elapsed else 0, scorer.stats['skipped_records']
+    ))
+    print('Wrote {0} state day(s) to {1}'.format(len(daily), args.output))
+
+    if args.apply:
+        current = store.store_is_current()
+        if current:
+            counted = press_days()
+        write_daily(daily)
+
+        if not current:
+            print('Data store missing or out of date, transcript days kept in {0} (run `python store.py` to rebuild)'.format(DAILY_FILE))
+        else:
+            data, geo_data, data_corr, updated = apply_daily(*store.read_store(), daily, counted)
+            if updated:
+                store.write_store(data, geo_data, data_corr)
+            print('Updated the transcript columns of {0} store row(s)'.format(updated))
@@ -0,0 +1,36 @@
+'''
+
+WebGL trace selection for the scatter and line plots.
+
+SVG scatter traces draw one DOM node per point and stall the browser with a
+few tens of thousands of points. Figures with more points than the threshold
+use the WebGL variants (scattergl), which keep the same styling, sizes and
+hover data.
+
+Settings (environment):
+    DASH_WEBGL_THRESHOLD    points above which WebGL is used (default 1000)
+
+'''
+
+import os
+
+WEBGL_THRESHOLD = int(os.environ.get('DASH_WEBGL_THRESHOLD', 1000))
+
+def use_webgl(points):
+
+    return points > WEBGL_THRESHOLD
+
+def render_mode(points):
+
+    # render_mode argument of px.scatter and px.line
+    return 'webgl' if use_webgl(points) else 'svg'
+
+def scatter(points, **kwargs):
+
+    # go.Scatter, or go.Scattergl above the threshold
+    import plotly.graph_objects as go
+
+    if use_webgl(points):
+        return go.Scattergl(**kwargs)
+
+    return go.Scatter(**kwargs)